@@ -0,0 +1,73 @@
+import copy
+import hashlib
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.constants import AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TIMEOUT
+
+from .local_cache import LRUCache
+from .versions import bump_version, get_version
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+TOKEN_VERSION_KEY = "token-version:{digest}"
+
+authenticated_tokens = LRUCache(
+    AUTH_TOKEN_CACHE_SIZE,
+    timeout=AUTH_TOKEN_CACHE_TIMEOUT,
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that skips the token query on repeat reads.
+
+    Safe requests are answered from a per-process cache of
+    ``key -> (user, token, version)``; writes always load the user from
+    the database so they never save a stale copy, and refresh the entry.
+    ``api.signals`` bump the token's version in the shared cache when it
+    is deleted (logout) or its user is saved (password change,
+    deactivation), and a hit counts only while the version it was stored
+    with is current, so every worker stops accepting a revoked token at
+    once.
+    """
+
+    def authenticate(self, request):
+        self._method = request.method
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        if getattr(self, "_method", None) in SAFE_METHODS:
+            cached = authenticated_tokens.get(key)
+            if cached is not None:
+                user, token, version = cached
+                if version == get_version(token_version_key(key)):
+                    return copy.copy(user), copy.copy(token)
+        # Read before the database: a revocation committed after the read
+        # bumps the version again, so the entry is never current for long.
+        version = get_version(token_version_key(key))
+        user, token = super().authenticate_credentials(key)
+        authenticated_tokens.set(
+            key,
+            (copy.copy(user), copy.copy(token), version),
+        )
+        return user, token
+
+
+def token_version_key(key):
+    # Token keys are credentials, so only their digest goes to the cache.
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return TOKEN_VERSION_KEY.format(digest=digest)
+
+
+def forget_token(key):
+    authenticated_tokens.pop(key)
+    bump_version(token_version_key(key))
+
+
+def forget_user_tokens(user_id):
+    authenticated_tokens.discard_values(lambda entry: entry[0].pk == user_id)
+    for key in Token.objects.filter(user_id=user_id).values_list(
+        "key",
+        flat=True,
+    ):
+        bump_version(token_version_key(key))
@@ -0,0 +1,301 @@
+"""Read-only ingredient catalog snapshot shared by all worker processes.
+
+The catalog is written once to a compact binary file and memory-mapped by
+every worker, so the pages are shared through the OS page cache instead of
+being copied into each process. Records are sorted by the UTF-8 bytes of
+``search_name`` and prefix lookups are answered by bisection; every record
+keeps its JSON fragment, so responses are assembled without
+re-serializing anything.
+
+File layout (native byte order)::
+
+    header       magic, format version, record count, content digest
+    key offsets  (count + 1) x uint32 into the keys blob
+    json offsets (count + 1) x uint32 into the JSON blob
+    id order     count x uint32, record positions sorted by id
+    ids          count x uint64, ingredient ids in ascending order
+    keys blob    UTF-8 ``search_name`` values
+    json blob    UTF-8 JSON objects as rendered by the API, each followed
+                 by a comma so that any run of them forms an array body
+
+The trigram inverted index used by fuzzy search is derived from the keys
+lazily, once per snapshot and process.
+
+Writes to ``Ingredient`` remove the file; the next request in any worker
+notices the missing or replaced file and rebuilds or remaps it.
+"""
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from menu.models import Ingredient, normalize_search_name
+
+MAGIC = b"FGIC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHxxI16s")
+
+_lock = threading.Lock()
+_current = None
+
+
+def trigrams(value):
+    """Trigrams of every word padded like ``pg_trgm`` does."""
+    grams = set()
+    for word in value.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class _Keys:
+    """Sequence view over the keys blob, suitable for ``bisect``."""
+
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return bytes(self._blob[start:end])
+
+
+class IngredientCatalog:
+    def __init__(self, buffer, identity):
+        self.identity = identity
+        self._buffer = buffer
+        magic, version, count, digest = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Unsupported ingredient catalog format")
+        self.etag = f'"{digest.hex()}"'
+        self.last_modified = identity[1] // 1_000_000_000
+        view = memoryview(buffer)
+        offset = HEADER.size
+        sections = []
+        for typecode, length in (
+            ("I", count + 1),
+            ("I", count + 1),
+            ("I", count),
+            ("Q", count),
+        ):
+            size = array(typecode).itemsize * length
+            sections.append(view[offset:offset + size].cast(typecode))
+            offset += size
+        key_offsets, json_offsets, self._id_order, self._ids = sections
+        keys_end = offset + key_offsets[-1]
+        self._keys = _Keys(view[offset:keys_end], key_offsets)
+        self._json = view[keys_end:keys_end + json_offsets[-1]]
+        self._json_offsets = json_offsets
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search_prefix(self, query):
+        prefix = normalize_search_name(query).encode()
+        if not prefix:
+            return range(len(self))
+        # UTF-8 never contains 0xFF, so bumping the last byte gives the
+        # smallest key that no longer starts with the prefix.
+        upper_bound = prefix[:-1] + bytes([prefix[-1] + 1])
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, upper_bound, lo=start)
+        return range(start, end)
+
+    @cached_property
+    def _trigram_index(self):
+        postings = defaultdict(lambda: array("I"))
+        sizes = array("I")
+        for position in range(len(self)):
+            grams = trigrams(self._keys[position].decode())
+            sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(position)
+        return dict(postings), sizes
+
+    def search_fuzzy(self, query, limit, threshold):
+        """Prefix matches first, then the closest names by trigram overlap.
+
+        Similarity is the Jaccard index of the trigram sets, the same
+        measure ``pg_trgm`` uses; matches below ``threshold`` are dropped.
+        """
+        prefix_matches = self.search_prefix(query)
+        results = list(prefix_matches[:limit])
+        grams = trigrams(normalize_search_name(query))
+        if len(results) >= limit or not grams:
+            return results
+        postings, sizes = self._trigram_index
+        shared = Counter()
+        for gram in grams:
+            shared.update(postings.get(gram, ()))
+        candidates = []
+        for position, common in shared.items():
+            if position in prefix_matches:
+                continue
+            similarity = common / (len(grams) + sizes[position] - common)
+            if similarity >= threshold:
+                candidates.append((-similarity, position))
+        results.extend(
+            position
+            for _, position in heapq.nsmallest(
+                limit - len(results),
+                candidates,
+            )
+        )
+        return results
+
+    def find(self, ingredient_id):
+        index = bisect_left(self._ids, ingredient_id)
+        if index < len(self._ids) and self._ids[index] == ingredient_id:
+            return self._id_order[index]
+        return None
+
+    def render_one(self, position):
+        start = self._json_offsets[position]
+        end = self._json_offsets[position + 1]
+        return bytes(self._json[start:end - 1])
+
+    def render(self, positions):
+        """Render records as a JSON array, contiguous ranges in one slice."""
+        if not positions:
+            return b"[]"
+        if not isinstance(positions, range):
+            return b"[" + b",".join(map(self.render_one, positions)) + b"]"
+        start = self._json_offsets[positions.start]
+        end = self._json_offsets[positions.stop]
+        return b"[" + bytes(self._json[start:end - 1]) + b"]"
+
+
+def _catalog_path():
+    return Path(settings.INGREDIENT_CATALOG_PATH)
+
+
+def build_catalog(path):
+    rows = Ingredient.objects.values(
+        "id",
+        "name",
+        "measurement_unit",
+        "search_name",
+    )
+    # Bisection compares raw UTF-8 bytes; database collations may order
+    # spaces and punctuation differently, so the keys are sorted here.
+    records = sorted(
+        (
+            (ingredient.pop("search_name").encode(), ingredient)
+            for ingredient in rows.iterator()
+        ),
+        key=lambda record: (
+            record[0],
+            record[1]["name"],
+            record[1]["id"],
+        ),
+    )
+    keys = []
+    fragments = []
+    ids = []
+    for key, ingredient in records:
+        keys.append(key)
+        fragment = json.dumps(
+            ingredient,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        fragments.append(fragment.encode() + b",")
+        ids.append(ingredient["id"])
+
+    key_offsets = array("I", [0])
+    for key in keys:
+        key_offsets.append(key_offsets[-1] + len(key))
+    json_offsets = array("I", [0])
+    for fragment in fragments:
+        json_offsets.append(json_offsets[-1] + len(fragment))
+    id_order = array("I", sorted(range(len(ids)), key=ids.__getitem__))
+    sorted_ids = array("Q", (ids[position] for position in id_order))
+
+    body = b"".join(
+        (
+            key_offsets.tobytes(),
+            json_offsets.tobytes(),
+            id_order.tobytes(),
+            sorted_ids.tobytes(),
+            *keys,
+            *fragments,
+        )
+    )
+    digest = hashlib.blake2b(body, digest_size=16).digest()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(ids), digest)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent,
+        prefix=f".{path.name}.",
+        delete=False,
+    ) as tmp:
+        tmp.write(header)
+        tmp.write(body)
+    os.chmod(tmp.name, 0o644)
+    os.replace(tmp.name, path)
+
+
+def _load(path):
+    with path.open("rb") as file:
+        stat = os.fstat(file.fileno())
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    return IngredientCatalog(buffer, identity)
+
+
+def _identity(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def get_ingredient_catalog():
+    global _current
+    path = _catalog_path()
+    catalog = _current
+    if catalog is not None and catalog.identity == _identity(path):
+        return catalog
+    with _lock:
+        identity = _identity(path)
+        if _current is not None and _current.identity == identity:
+            return _current
+        if identity is None:
+            build_catalog(path)
+        try:
+            _current = _load(path)
+        except (FileNotFoundError, ValueError):
+            build_catalog(path)
+            _current = _load(path)
+        return _current
+
+
+def _remove_catalog():
+    _catalog_path().unlink(missing_ok=True)
+
+
+def invalidate_ingredient_catalog():
+    """Drop the snapshot now and once more after the transaction commits.
+
+    The second removal discards a snapshot that another worker may have
+    rebuilt from not yet committed data in between.
+    """
+    _remove_catalog()
+    transaction.on_commit(_remove_catalog)
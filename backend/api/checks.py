@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from PIL import Image, ImageDraw, ImageFont
+
+from .exports import PDF_FONT_SIZE
+
+# Outside every font's repertoire, so it renders as the .notdef glyph.
+MISSING_GLYPH = "\U0010fffd"
+
+PROCESS_LOCAL_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Cache versions are only bumped where the change is made.
+
+    With a per-process cache other gunicorn workers and management
+    commands never see the bump and keep serving stale payloads, counts
+    and 304 responses.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend != PROCESS_LOCAL_CACHE:
+        return []
+    return [
+        Warning(
+            f"The default cache ({backend}) is not shared between "
+            "processes.",
+            hint="Set REDIS_URL or CACHE_DIR.",
+            id="api.W001",
+        )
+    ]
+
+
+def _render_glyph(font, char):
+    image = Image.new("L", (PDF_FONT_SIZE * 2, PDF_FONT_SIZE * 2))
+    ImageDraw.Draw(image).text((0, 0), char, font=font, fill=255)
+    return image.tobytes()
+
+
+@register()
+def check_pdf_font(app_configs, **kwargs):
+    """PDF shopping lists are drawn with a TrueType font with Cyrillic.
+
+    There is no fallback: Pillow's built-in font has no Cyrillic glyphs
+    and would export lists of empty boxes.
+    """
+    path = settings.SHOPPING_LIST_PDF_FONT
+    try:
+        font = ImageFont.truetype(path, PDF_FONT_SIZE)
+    except OSError as error:
+        problem = f"cannot be loaded: {error}"
+    else:
+        if _render_glyph(font, "Ж") != _render_glyph(font, MISSING_GLYPH):
+            return []
+        problem = "has no Cyrillic glyphs"
+    return [
+        Error(
+            f"The shopping list PDF font {path} {problem}.",
+            hint=(
+                "Install fonts-dejavu-core or point SHOPPING_LIST_PDF_FONT "
+                "to a TrueType font with Cyrillic glyphs."
+            ),
+            id="api.E001",
+        )
+    ]
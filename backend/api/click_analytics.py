@@ -0,0 +1,116 @@
+"""Buffered short link click counters.
+
+Redirects only increment an in-memory counter. A daemon thread per
+worker process writes the accumulated deltas to ``ShortLinkClicks`` in
+one transaction every ``SHORT_LINK_CLICKS_FLUSH_INTERVAL`` seconds, or
+sooner once ``SHORT_LINK_CLICKS_FLUSH_THRESHOLD`` clicks are pending, so
+the redirect path never waits for a row lock. Pending clicks are also
+written when the process exits; a worker that is killed loses at most
+the clicks of one interval.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from menu.models import Recipe, ShortLinkClicks
+
+logger = logging.getLogger(__name__)
+
+
+def save_click_deltas(deltas):
+    """Add ``{recipe_id: clicks}`` to the stored totals in one batch."""
+    with transaction.atomic():
+        recipe_ids = list(
+            Recipe.objects.filter(pk__in=deltas).values_list("pk", flat=True)
+        )
+        if not recipe_ids:
+            return
+        ShortLinkClicks.objects.bulk_create(
+            [ShortLinkClicks(recipe_id=recipe_id) for recipe_id in recipe_ids],
+            ignore_conflicts=True,
+        )
+        ShortLinkClicks.objects.filter(recipe_id__in=recipe_ids).update(
+            clicks=F("clicks")
+            + Case(
+                *(
+                    When(recipe_id=recipe_id, then=Value(deltas[recipe_id]))
+                    for recipe_id in recipe_ids
+                ),
+                default=Value(0),
+            ),
+            updated_at=timezone.now(),
+        )
+
+
+class ClickBuffer:
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._pending_total = 0
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, recipe_id):
+        if self._pid != os.getpid():
+            # Forked after the parent recorded clicks: those belong to
+            # the parent, and its lock and thread are not ours.
+            self._reset()
+        with self._lock:
+            self._pending[recipe_id] += 1
+            self._pending_total += 1
+            pending_total = self._pending_total
+            if self._thread is None:
+                self._start()
+        if pending_total >= settings.SHORT_LINK_CLICKS_FLUSH_THRESHOLD:
+            self._wakeup.set()
+
+    def _start(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name="short-link-clicks",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.SHORT_LINK_CLICKS_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+    def take(self):
+        """Remove and return the pending ``{recipe_id: clicks}``."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._pending_total = 0
+        return pending
+
+    def flush(self):
+        pending = self.take()
+        if not pending:
+            return
+        try:
+            save_click_deltas(pending)
+        except Exception:
+            logger.exception("Could not save short link clicks")
+            with self._lock:
+                self._pending.update(pending)
+                self._pending_total += sum(pending.values())
+
+
+click_buffer = ClickBuffer()
+atexit.register(click_buffer.flush)
@@ -0,0 +1,58 @@
+"""ETag and Last-Modified validators for conditional GET requests.
+
+Validators are derived from version tokens in ``api.versions`` and from
+stored timestamps only, so a request carrying a matching validator is
+answered with 304 before any queryset is evaluated or serialized.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .versions import VIEWER_VERSION_KEY, get_version, version_timestamp
+
+
+def make_etag(*parts):
+    payload = "|".join(str(part) for part in parts)
+    return f'"{hashlib.md5(payload.encode()).hexdigest()}"'
+
+
+def viewer_validators(request, parts, timestamps):
+    """Validators of a response rendered for the requesting user.
+
+    The viewer version covers the user's favorites, cart and
+    subscriptions; the origin and media type cover absolute URLs and the
+    renderer.
+    """
+    parts = [
+        request.scheme,
+        request.get_host(),
+        request.accepted_media_type,
+        *parts,
+    ]
+    timestamps = list(timestamps)
+    user = request.user
+    if user.is_authenticated:
+        version = get_version(VIEWER_VERSION_KEY.format(pk=user.pk))
+        parts += [user.pk, version]
+        timestamps.append(version_timestamp(version))
+    return make_etag(*parts), max(timestamps)
+
+
+def not_modified(request, etag, last_modified, vary=()):
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified, vary)
+    return response
+
+
+def set_validators(response, etag, last_modified, vary=()):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    if vary:
+        patch_vary_headers(response, vary)
+    return response
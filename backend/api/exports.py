@@ -0,0 +1,272 @@
+"""Streaming shopping list exports.
+
+Every exporter takes an iterator of ``(name, amount, unit)`` rows and
+yields encoded chunks, so a response never holds more than one chunk of
+rows (or one PDF page) in memory regardless of the list size.
+
+PDF pages are rasterized with Pillow, which is already a dependency and
+renders Cyrillic with the configured TrueType font (``api.E001`` reports
+a missing one). Each page also carries the same lines as invisible text
+with a Unicode mapping, so the list stays selectable and searchable.
+The document is written object by object and the cross-reference table
+is emitted last.
+"""
+import csv
+import itertools
+import json
+import zlib
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+
+EMPTY_LIST_MESSAGE = "Список пуст"
+PDF_TITLE = "Список покупок"
+CSV_HEADER = ("Ингредиент", "Количество", "Единица измерения")
+
+PDF_PAGE_SIZE = (595, 842)  # A4 in points
+PDF_DPI = 150
+PDF_MARGIN = 90
+PDF_FONT_SIZE = 28
+PDF_LINE_HEIGHT = 44
+# Characters whose advance widths are written into the text layer font;
+# others take the average width.
+PDF_TEXT_RANGES = ((0x20, 0x7E), (0x0401, 0x0451), (0x2014, 0x2014))
+
+
+def _line(name, amount, unit):
+    return f"{name} — {amount} {unit}"
+
+
+def export_txt(rows):
+    empty = True
+    for name, amount, unit in rows:
+        yield ("" if empty else "\n") + _line(name, amount, unit)
+        empty = False
+    if empty:
+        yield EMPTY_LIST_MESSAGE
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the value back."""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def export_json(rows):
+    separator = "["
+    for name, amount, unit in rows:
+        item = {"name": name, "amount": amount, "measurement_unit": unit}
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+def _load_font():
+    return ImageFont.truetype(settings.SHOPPING_LIST_PDF_FONT, PDF_FONT_SIZE)
+
+
+def _paginate(lines, lines_per_page):
+    page = []
+    for line in lines:
+        page.append(line)
+        if len(page) == lines_per_page:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+class _PdfWriter:
+    """Tracks object numbers and byte offsets of a PDF being streamed."""
+
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+        self.next_number = self.PAGES + 1
+
+    def allocate(self, count):
+        first = self.next_number
+        self.next_number += count
+        return range(first, first + count)
+
+    def chunk(self, data):
+        self.position += len(data)
+        return data
+
+    def object(self, number, body, stream=None):
+        self.offsets[number] = self.position
+        data = b"%d 0 obj\n" % number + body
+        if stream is not None:
+            data += b"\nstream\n" + stream + b"\nendstream"
+        return self.chunk(data + b"\nendobj\n")
+
+    def trailer(self):
+        count = self.next_number
+        table = [b"xref\n0 %d\n" % count, b"0000000000 65535 f \n"]
+        table.extend(
+            b"%010d 00000 n \n" % self.offsets[number]
+            for number in range(1, count)
+        )
+        table.append(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\n" % (count, self.CATALOG)
+        )
+        table.append(b"startxref\n%d\n%%%%EOF\n" % self.position)
+        return b"".join(table)
+
+
+def _render_page(lines, font, size):
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        top = PDF_MARGIN + index * PDF_LINE_HEIGHT
+        draw.text((PDF_MARGIN, top), line, font=font, fill=0)
+    return image
+
+
+def _text_widths(font):
+    """``/W`` array of the text layer font in thousandths of an em."""
+    ranges = []
+    for first, last in PDF_TEXT_RANGES:
+        widths = b" ".join(
+            b"%d" % round(font.getlength(chr(code)) * 1000 / PDF_FONT_SIZE)
+            for code in range(first, last + 1)
+        )
+        ranges.append(b"%d [%s]" % (first, widths))
+    return b"[%s]" % b" ".join(ranges)
+
+
+def _text_unicode_map():
+    """ToUnicode CMap mapping every two-byte code to the same code point."""
+    ranges = b"".join(
+        b"<%02X00> <%02XFF> <%02X00>\n" % (high, high, high)
+        for high in range(256)
+    )
+    return (
+        b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap\n"
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) "
+        b"/Supplement 0 >> def\n"
+        b"/CMapName /Adobe-Identity-UCS def /CMapType 2 def\n"
+        b"1 begincodespacerange <0000> <FFFF> endcodespacerange\n"
+        b"256 beginbfrange\n%sendbfrange\n"
+        b"endcmap CMapName currentdict /CMap defineresource pop end end"
+        % ranges
+    )
+
+
+def _text_layer(lines, font):
+    """Content stream drawing ``lines`` as invisible, selectable text."""
+    scale = 72 / PDF_DPI
+    ascent, _ = font.getmetrics()
+    commands = [b"BT 3 Tr /F0 %.2f Tf" % (PDF_FONT_SIZE * scale)]
+    for index, line in enumerate(lines):
+        baseline = PDF_MARGIN + index * PDF_LINE_HEIGHT + ascent
+        # Two-byte codes are BMP code points; others cannot be mapped.
+        text = "".join(
+            char if ord(char) <= 0xFFFF else "\ufffd" for char in line
+        )
+        commands.append(
+            b"1 0 0 1 %.2f %.2f Tm <%s> Tj"
+            % (
+                PDF_MARGIN * scale,
+                PDF_PAGE_SIZE[1] - baseline * scale,
+                text.encode("utf-16-be").hex().upper().encode(),
+            )
+        )
+    commands.append(b"ET")
+    return b"\n".join(commands)
+
+
+def export_pdf(rows):
+    # Loaded before streaming starts, so a broken font fails the request
+    # instead of truncating the download.
+    return _stream_pdf(rows, _load_font())
+
+
+def _stream_pdf(rows, font):
+    width, height = (
+        round(points * PDF_DPI / 72) for points in PDF_PAGE_SIZE
+    )
+    lines_per_page = (height - 2 * PDF_MARGIN) // PDF_LINE_HEIGHT
+    lines = (_line(*row) for row in rows)
+    first_line = next(lines, EMPTY_LIST_MESSAGE)
+    lines = itertools.chain((PDF_TITLE, "", first_line), lines)
+
+    pdf = _PdfWriter()
+    yield pdf.chunk(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    yield pdf.object(
+        pdf.CATALOG,
+        b"<< /Type /Catalog /Pages %d 0 R >>" % pdf.PAGES,
+    )
+    type0, cid_font, descriptor, unicode_map = pdf.allocate(4)
+    yield pdf.object(
+        type0,
+        b"<< /Type /Font /Subtype /Type0 /BaseFont /ShoppingListText "
+        b"/Encoding /Identity-H /DescendantFonts [%d 0 R] "
+        b"/ToUnicode %d 0 R >>" % (cid_font, unicode_map),
+    )
+    yield pdf.object(
+        cid_font,
+        b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /ShoppingListText "
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) "
+        b"/Supplement 0 >> /FontDescriptor %d 0 R /DW 600 /W %s >>"
+        % (descriptor, _text_widths(font)),
+    )
+    yield pdf.object(
+        descriptor,
+        b"<< /Type /FontDescriptor /FontName /ShoppingListText /Flags 32 "
+        b"/FontBBox [0 -250 1000 900] /ItalicAngle 0 /Ascent 900 "
+        b"/Descent -250 /CapHeight 700 /StemV 80 >>",
+    )
+    cmap = _text_unicode_map()
+    yield pdf.object(unicode_map, b"<< /Length %d >>" % len(cmap), cmap)
+    draw_image = b"q %d 0 0 %d 0 0 cm /Im0 Do Q\n" % PDF_PAGE_SIZE
+    pages = []
+    for page_lines in _paginate(lines, lines_per_page):
+        image_number, content_number, page_number = pdf.allocate(3)
+        content = draw_image + _text_layer(page_lines, font)
+        image = _render_page(page_lines, font, (width, height))
+        pixels = zlib.compress(image.tobytes())
+        yield pdf.object(
+            image_number,
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+            b"/ColorSpace /DeviceGray /BitsPerComponent 8 "
+            b"/Filter /FlateDecode /Length %d >>"
+            % (width, height, len(pixels)),
+            stream=pixels,
+        )
+        yield pdf.object(
+            content_number,
+            b"<< /Length %d >>" % len(content),
+            stream=content,
+        )
+        yield pdf.object(
+            page_number,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /XObject << /Im0 %d 0 R >> "
+            b"/Font << /F0 %d 0 R >> >> /Contents %d 0 R >>"
+            % (
+                pdf.PAGES,
+                *PDF_PAGE_SIZE,
+                image_number,
+                type0,
+                content_number,
+            ),
+        )
+        pages.append(page_number)
+    kids = b" ".join(b"%d 0 R" % number for number in pages)
+    yield pdf.object(
+        pdf.PAGES,
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(pages)),
+    )
+    yield pdf.chunk(pdf.trailer())
@@ -0,0 +1,23 @@
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import ImageField
+
+
+class ImageUploadField(Base64ImageField):
+    """An image as a base64 data URI or as a multipart file upload.
+
+    Uploaded files are used as the upload handler left them (spooled to a
+    temporary file), validated by Pillow and renamed like decoded ones.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, UploadedFile):
+            return super().to_internal_value(data)
+        image = ImageField.to_internal_value(self, data)
+        extension = image.image.format.lower()
+        extension = "jpg" if extension == "jpeg" else extension
+        if extension not in self.ALLOWED_TYPES:
+            raise ValidationError(self.INVALID_TYPE_MESSAGE)
+        image.name = f"{self.get_file_name(image)}.{extension}"
+        return image
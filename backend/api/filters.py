@@ -1,15 +1,36 @@
 from django_filters import rest_framework as filters
 
+from menu.ingredient_index import MATCH_ALL, MATCH_ANY, filter_by_ingredients
 from menu.models import Recipe
+from menu.search import search_recipes
+
+from .ingredient_postings import cached_postings
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
 
 
 class RecipeFilter(filters.FilterSet):
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = filters.BooleanFilter(method="filter_is_in_cart")
+    search = filters.CharFilter(method="filter_search")
+    ingredients = NumberInFilter(method="filter_ingredients")
+    match = filters.ChoiceFilter(
+        choices=((MATCH_ALL, MATCH_ALL), (MATCH_ANY, MATCH_ANY)),
+        method="filter_match",
+    )
 
     class Meta:
         model = Recipe
-        fields = ("author", "is_favorited", "is_in_shopping_cart")
+        fields = (
+            "author",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "search",
+            "ingredients",
+            "match",
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         user = getattr(self.request, "user", None)
@@ -22,3 +43,25 @@ class RecipeFilter(filters.FilterSet):
         if value and user and user.is_authenticated:
             return queryset.filter(shopping_carts__user=user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value).order_by(
+            "-search_rank",
+            *Recipe._meta.ordering,
+        )
+
+    def filter_ingredients(self, queryset, name, value):
+        if not value:
+            return queryset
+        match = self.form.cleaned_data.get("match") or MATCH_ALL
+        return filter_by_ingredients(
+            queryset,
+            [int(ingredient_id) for ingredient_id in value],
+            match,
+            load=cached_postings,
+        )
+
+    def filter_match(self, queryset, name, value):
+        return queryset
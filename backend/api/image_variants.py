@@ -0,0 +1,231 @@
+"""Sized WebP and JPEG variants of recipe images and avatars.
+
+Requests only store the uploaded original. Once the transaction commits,
+the original is handed to a per-process pool of worker processes that
+render ``IMAGE_VARIANT_WIDTHS`` in every format of ``api.imaging``; the
+files are saved to the field's storage and listed in the model's JSON
+field together with the name of the original they were made from. A
+variant set made from another original is ignored, so responses fall
+back to the original until the new set is ready.
+
+The storage counts references to files, so an original is released when
+its row is deleted or its image replaced, and variants when a newer set
+replaces them or the row is deleted.
+"""
+import logging
+import multiprocessing
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from core.constants import IMAGE_VARIANT_QUALITY, IMAGE_VARIANT_WIDTHS
+from menu.models import Recipe
+from users.models import Profile
+
+from .imaging import FORMATS, render_variants
+from .recipe_cache import bump_author_version, bump_recipe_version
+from .versions import bump_content_version
+
+logger = logging.getLogger(__name__)
+
+# model -> (image field, variants field)
+IMAGE_FIELDS = {
+    Recipe: ("image", "image_variants"),
+    Profile: ("avatar", "avatar_variants"),
+}
+
+
+def current_variants(instance):
+    """Stored variants of the instance's current image, or ``None``."""
+    image_field, variants_field = IMAGE_FIELDS[type(instance)]
+    image = getattr(instance, image_field)
+    variants = getattr(instance, variants_field) or {}
+    if not image or variants.get("source") != image.name:
+        return None
+    return variants
+
+
+def variant_name(source, width, extension):
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(
+        directory,
+        "variants",
+        f"{stem}-{width}w.{extension}",
+    )
+
+
+def storage_of(model):
+    image_field, _ = IMAGE_FIELDS[model]
+    return model._meta.get_field(image_field).storage
+
+
+def delete_variants(model, variants):
+    storage = storage_of(model)
+    for extension in FORMATS:
+        for name, _ in (variants or {}).get(extension, ()):
+            storage.delete(name)
+
+
+def release_images(model, image, variants):
+    """Drop the references of a removed original and its variants."""
+    delete_variants(model, variants)
+    storage_of(model).delete(image)
+
+
+def invalidate(model, pk):
+    if model is Recipe:
+        bump_recipe_version(pk)
+    else:
+        bump_author_version(
+            Profile.objects.filter(pk=pk)
+            .values_list("user_id", flat=True)
+            .first()
+        )
+    bump_content_version()
+
+
+def store_variants(model, pk, source, rendered):
+    """Save rendered variants unless the image was replaced meanwhile."""
+    image_field, variants_field = IMAGE_FIELDS[model]
+    storage = storage_of(model)
+    variants = {"source": source}
+    for extension, width, content in rendered:
+        name = storage.save(
+            variant_name(source, width, extension),
+            ContentFile(content),
+        )
+        variants.setdefault(extension, []).append((name, width))
+    with transaction.atomic():
+        rows = model.objects.select_for_update().filter(
+            pk=pk,
+            **{image_field: source},
+        )
+        previous = rows.values_list(variants_field, flat=True).first()
+        updated = rows.update(**{variants_field: variants})
+    if not updated:
+        delete_variants(model, variants)
+        return False
+    delete_variants(model, previous)
+    invalidate(model, pk)
+    return True
+
+
+def generate_variants(model, pk, source, render=render_variants):
+    rendered = render(
+        storage_of(model).path(source),
+        IMAGE_VARIANT_WIDTHS,
+        IMAGE_VARIANT_QUALITY,
+    )
+    return store_variants(model, pk, source, rendered)
+
+
+def run_safely(model, pk, source, render=render_variants):
+    try:
+        generate_variants(model, pk, source, render=render)
+    except Exception:
+        logger.exception(
+            "Could not render variants of %s %s", model.__name__, pk
+        )
+
+
+class VariantQueue:
+    """Worker processes for rendering, threads to wait for them and save.
+
+    Both pools are created lazily and again after a fork. Worker
+    processes are spawned, not forked, so they do not inherit the
+    server's threads and connections.
+    """
+
+    def __init__(self):
+        self._pid = None
+
+    def _start(self):
+        self._pid = os.getpid()
+        workers = settings.IMAGE_VARIANT_WORKERS
+        self._processes = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._threads = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="image-variants",
+        )
+
+    def submit(self, model, pk, source):
+        if self._pid != os.getpid():
+            self._start()
+        self._threads.submit(self._run, model, pk, source)
+
+    def _render(self, *args):
+        return self._processes.submit(render_variants, *args).result()
+
+    def _run(self, model, pk, source):
+        try:
+            run_safely(model, pk, source, render=self._render)
+        finally:
+            connection.close()
+
+
+variant_queue = VariantQueue()
+
+
+def schedule_variants(instance):
+    """Render variants of the instance's image after commit if missing."""
+    model = type(instance)
+    image_field, _ = IMAGE_FIELDS[model]
+    image = getattr(instance, image_field)
+    if not image or current_variants(instance) is not None:
+        return
+    if settings.IMAGE_VARIANTS_IN_BACKGROUND:
+        run = partial(variant_queue.submit, model, instance.pk, image.name)
+    else:
+        run = partial(run_safely, model, instance.pk, image.name)
+    transaction.on_commit(run)
+
+
+def remember_replaced_image(instance, update_fields=None):
+    """Note the stored image that this save of ``instance`` replaces."""
+    model = type(instance)
+    image_field, _ = IMAGE_FIELDS[model]
+    instance._replaced_image = None
+    if instance._state.adding or (
+        update_fields is not None and image_field not in update_fields
+    ):
+        return
+    previous = (
+        model.objects.filter(pk=instance.pk)
+        .values_list(image_field, flat=True)
+        .first()
+    )
+    if previous and previous != getattr(instance, image_field).name:
+        instance._replaced_image = previous
+
+
+def release_replaced_image(instance):
+    """Release the image noted by ``remember_replaced_image`` on commit."""
+    previous = getattr(instance, "_replaced_image", None)
+    if previous:
+        instance._replaced_image = None
+        transaction.on_commit(
+            partial(storage_of(type(instance)).delete, previous)
+        )
+
+
+def release_deleted_images(instance):
+    model = type(instance)
+    image_field, variants_field = IMAGE_FIELDS[model]
+    image = getattr(instance, image_field)
+    transaction.on_commit(
+        partial(
+            release_images,
+            model,
+            image.name,
+            getattr(instance, variants_field),
+        )
+    )
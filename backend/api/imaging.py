@@ -0,0 +1,52 @@
+"""Resizing and encoding of image variants.
+
+Runs in worker processes of ``api.image_variants``, so it only depends on
+Pillow and never imports Django.
+"""
+import io
+
+from PIL import Image, ImageOps
+
+FORMATS = {
+    "webp": ("WEBP", {"method": 4}),
+    "jpeg": ("JPEG", {"optimize": True, "progressive": True}),
+}
+
+
+def variant_widths(width, widths):
+    """Target widths capped at the original width, without duplicates."""
+    return sorted({min(target, width) for target in widths})
+
+
+def _flatten(image):
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def render_variants(path, widths, quality):
+    """Encode ``path`` at every width in every format.
+
+    Returns ``[(format, width, bytes), ...]``.
+    """
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    image = _flatten(image)
+    rendered = []
+    for width in variant_widths(image.width, widths):
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for name, (pillow_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(
+                buffer,
+                pillow_format,
+                quality=quality,
+                **options,
+            )
+            rendered.append((name, width, buffer.getvalue()))
+    return rendered
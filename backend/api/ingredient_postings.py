@@ -0,0 +1,50 @@
+"""Decoded ingredient index rows memoized per worker.
+
+``menu.ingredient_index`` keeps the recipe ids of an ingredient as packed
+arrays split into buckets. Reading and decoding them on every filtered
+list is most of what an ingredient filter costs, so the decoded buckets
+of an ingredient are kept in a bounded in-process LRU together with the
+ingredient's index version. ``api.signals`` replace the version whenever
+one of its rows is rewritten, and only ingredients whose version moved
+are read from the database again.
+"""
+from django.core.cache import cache
+
+from core.constants import INGREDIENT_POSTINGS_CACHE_SIZE
+from menu.ingredient_index import load_postings
+
+from .local_cache import LRUCache
+from .versions import bump_version, get_version
+
+INDEX_VERSION_KEY = "ingredient-index-version:{pk}"
+
+decoded_postings = LRUCache(INGREDIENT_POSTINGS_CACHE_SIZE)
+
+
+def bump_index_version(ingredient_id):
+    bump_version(INDEX_VERSION_KEY.format(pk=ingredient_id))
+
+
+def cached_postings(ingredient_ids):
+    """``menu.ingredient_index.load_postings`` through the memo."""
+    keys = {
+        ingredient_id: INDEX_VERSION_KEY.format(pk=ingredient_id)
+        for ingredient_id in ingredient_ids
+    }
+    # Read before the database, see api.versions.
+    versions = cache.get_many(keys.values())
+    postings = {}
+    stale = {}
+    for ingredient_id, key in keys.items():
+        version = versions.get(key) or get_version(key)
+        entry = decoded_postings.get(ingredient_id)
+        if entry is not None and entry[0] == version:
+            postings[ingredient_id] = entry[1]
+        else:
+            stale[ingredient_id] = version
+    if stale:
+        for ingredient_id, buckets in load_postings(stale).items():
+            entry = (stale[ingredient_id], buckets)
+            decoded_postings.set(ingredient_id, entry)
+            postings[ingredient_id] = buckets
+    return postings
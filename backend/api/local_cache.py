@@ -0,0 +1,59 @@
+"""Small in-process caches shared by the threads of one worker."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used key.
+
+    With ``timeout`` set, entries also expire that many seconds after
+    they were stored.
+    """
+
+    def __init__(self, maxsize, timeout=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return default
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = None
+        if self.timeout is not None:
+            expires = time.monotonic() + self.timeout
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_values(self, predicate):
+        """Drop every entry whose value matches ``predicate``."""
+        with self._lock:
+            keys = [
+                key
+                for key, (_, value) in self._data.items()
+                if predicate(value)
+            ]
+            for key in keys:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
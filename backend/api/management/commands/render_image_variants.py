@@ -0,0 +1,71 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.image_variants import (
+    IMAGE_FIELDS,
+    current_variants,
+    storage_of,
+    store_variants,
+)
+from api.imaging import render_variants
+from core.constants import IMAGE_VARIANT_QUALITY, IMAGE_VARIANT_WIDTHS
+
+
+class Command(BaseCommand):
+    help = "Render missing variants of recipe images and avatars"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.IMAGE_VARIANT_WORKERS,
+            help="Number of rendering processes",
+        )
+
+    def handle(self, *args, **opts):
+        self.rendered = self.failed = 0
+        # At most two renders per worker are in flight, so memory stays
+        # flat however many images are missing variants.
+        window = opts["workers"] * 2
+        with ProcessPoolExecutor(max_workers=opts["workers"]) as pool:
+            for model, (image_field, variants_field) in IMAGE_FIELDS.items():
+                storage = storage_of(model)
+                rows = (
+                    model.objects.exclude(**{image_field: ""})
+                    .exclude(**{f"{image_field}__isnull": True})
+                    .only("pk", image_field, variants_field)
+                )
+                pending = {}
+                for instance in rows.iterator():
+                    if current_variants(instance) is not None:
+                        continue
+                    if len(pending) >= window:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        self.store(model, pending, done)
+                    source = getattr(instance, image_field).name
+                    future = pool.submit(
+                        render_variants,
+                        storage.path(source),
+                        IMAGE_VARIANT_WIDTHS,
+                        IMAGE_VARIANT_QUALITY,
+                    )
+                    pending[future] = (instance.pk, source)
+                self.store(model, pending, wait(pending).done)
+        style = self.style.WARNING if self.failed else self.style.SUCCESS
+        self.stdout.write(
+            style(f"Rendered {self.rendered} images, {self.failed} failed")
+        )
+
+    def store(self, model, pending, done):
+        """Save the variants of finished renders and forget them."""
+        for future in done:
+            pk, source = pending.pop(future)
+            try:
+                store_variants(model, pk, source, future.result())
+            except Exception as error:
+                self.failed += 1
+                self.stderr.write(f"{model.__name__} {pk}: {error}")
+            else:
+                self.rendered += 1
@@ -1,8 +1,216 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from core.constants import (
+    APPROXIMATE_COUNT_THRESHOLD,
+    COUNT_CACHE_TIMEOUT,
+    DEFAULT_PAGE_SIZE,
+)
+
+from .versions import bump_version, get_version
+
+COUNT_VERSION_KEY = "count-version:{table}"
+
+
+def bump_count_version(table):
+    bump_version(COUNT_VERSION_KEY.format(table=table))
+
 
-from core.constants import DEFAULT_PAGE_SIZE
+class CountingPaginator(Paginator):
+    """Paginator whose ``count`` avoids a fresh ``COUNT(*)`` when it can.
+
+    Unfiltered lists on PostgreSQL use the planner estimate from
+    ``pg_class.reltuples`` once the table is large enough; otherwise the
+    exact count is cached per table version, which ``api.signals`` bump
+    on every insert and delete. Filtered lists are always counted: their
+    keys would follow every search term and filter combination and fill
+    the shared cache.
+    """
+
+    @cached_property
+    def count(self):
+        self.count_exact = True
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        estimate = self._estimated_count(queryset)
+        if estimate is not None:
+            self.count_exact = False
+            return estimate
+        key = self._cache_key(queryset)
+        if key is None:
+            return queryset.count()
+        total = cache.get(key)
+        if total is None:
+            total = queryset.count()
+            cache.set(key, total, COUNT_CACHE_TIMEOUT)
+        return total
+
+    @staticmethod
+    def _cache_key(queryset):
+        if queryset.query.where:
+            return None
+        table = queryset.model._meta.db_table
+        version = get_version(COUNT_VERSION_KEY.format(table=table))
+        return f"count:{table}:{version}"
+
+    @staticmethod
+    def _estimated_count(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql" or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if not row or row[0] < APPROXIMATE_COUNT_THRESHOLD:
+            return None
+        return row[0]
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = "limit"
+    django_paginator_class = CountingPaginator
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_exact": self.page.paginator.count_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_exact"] = {
+            "type": "boolean",
+            "example": True,
+        }
+        return response_schema
+
+
+class LimitCursorPagination(LimitPageNumberPagination):
+    """Page/limit pagination with an opt-in keyset mode.
+
+    Passing ``?cursor=`` (empty for the first page) switches to keyset
+    pagination over ``(created_at, id)``: no COUNT and no OFFSET, so every
+    page costs the same regardless of depth.
+    """
+
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param]
+        )
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, pk__lt=pk)
+            )
+        items = list(queryset[: page_size + 1])
+        self.cursor_page = items[:page_size]
+        self.has_next = len(items) > page_size
+        return self.cursor_page
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.cursor_page[-1]
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(last.created_at, last.pk),
+        )
+
+    def get_previous_link(self):
+        if self.cursor_mode:
+            return None
+        return super().get_previous_link()
+
+    @staticmethod
+    def encode_cursor(created_at, pk):
+        raw = f"{created_at.isoformat()}|{pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, encoded):
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            raw = base64.urlsafe_b64decode(padded).decode()
+            created_at, pk = raw.split("|")
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class FeedPagination(LimitCursorPagination):
+    """Keyset pages of a feed that is read as ``(created_at, id)`` keys.
+
+    ``fetch_keys(position, limit)`` returns the keys of the next page;
+    the recipes are then loaded by primary key in the same order.
+    """
+
+    def paginate_keys(self, fetch_keys, queryset, request):
+        self.cursor_mode = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param, "")
+        )
+        keys = fetch_keys(position, page_size + 1)
+        self.has_next = len(keys) > page_size
+        recipe_ids = [pk for _, pk in keys[:page_size]]
+        self.cursor_page = list(
+            queryset.filter(pk__in=recipe_ids).order_by(*self.ordering)
+        )
+        return self.cursor_page
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                },
+                "results": schema,
+            },
+        }
@@ -0,0 +1,76 @@
+"""Cache of the viewer-independent part of recipe detail responses.
+
+A payload is stored under the recipe version together with the author
+id and the author version it was built with. ``api.signals`` replace the
+recipe version when the recipe or its ingredients change and the author
+version when the author or their profile changes; a payload built with
+an older author version is rebuilt on the next read.
+"""
+from datetime import datetime
+from typing import NamedTuple
+
+from django.core.cache import cache
+
+from core.constants import RECIPE_CACHE_TIMEOUT
+
+from .versions import bump_version, get_version
+
+RECIPE_VERSION_KEY = "recipe-version:{pk}"
+AUTHOR_VERSION_KEY = "author-version:{pk}"
+RECIPE_PAYLOAD_KEY = "recipe-payload:{pk}:{version}:{origin}"
+
+
+class RecipePayload(NamedTuple):
+    author_id: int
+    recipe_version: str
+    author_version: str
+    updated_at: datetime
+    data: dict
+
+
+def bump_recipe_version(recipe_id):
+    bump_version(RECIPE_VERSION_KEY.format(pk=recipe_id))
+
+
+def bump_author_version(user_id):
+    bump_version(AUTHOR_VERSION_KEY.format(pk=user_id))
+
+
+def get_recipe_payload(recipe_id, origin, build):
+    """Return the cached ``RecipePayload``, building it on a miss.
+
+    ``build`` returns ``(author_id, updated_at, data)`` for the current
+    database state and may raise to signal a missing recipe.
+    """
+    recipe_version = get_version(RECIPE_VERSION_KEY.format(pk=recipe_id))
+    payload_key = RECIPE_PAYLOAD_KEY.format(
+        pk=recipe_id,
+        version=recipe_version,
+        origin=origin,
+    )
+    entry = cache.get(payload_key)
+    if entry is not None:
+        author_id, author_version, updated_at, data = entry
+        current = cache.get(AUTHOR_VERSION_KEY.format(pk=author_id))
+        if current == author_version:
+            return RecipePayload(
+                author_id,
+                recipe_version,
+                author_version,
+                updated_at,
+                data,
+            )
+    author_id, updated_at, data = build()
+    author_version = get_version(AUTHOR_VERSION_KEY.format(pk=author_id))
+    cache.set(
+        payload_key,
+        (author_id, author_version, updated_at, data),
+        timeout=RECIPE_CACHE_TIMEOUT,
+    )
+    return RecipePayload(
+        author_id,
+        recipe_version,
+        author_version,
+        updated_at,
+        data,
+    )
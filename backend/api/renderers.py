@@ -0,0 +1,42 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .exports import export_csv, export_json, export_pdf, export_txt
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Declares a ``?format=`` of the shopping list export.
+
+    Exports are streamed by the view through ``exporter``; only error
+    payloads such as authentication failures are rendered here.
+    """
+
+    charset = "utf-8"
+    exporter = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = "text/plain"
+    format = "txt"
+    exporter = staticmethod(export_txt)
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    exporter = staticmethod(export_csv)
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = "application/json"
+    format = "json"
+    exporter = staticmethod(export_json)
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
+    charset = None
+    exporter = staticmethod(export_pdf)
@@ -1,8 +1,9 @@
+import json
+
 from django.conf import settings
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
-
-from drf_extra_fields.fields import Base64ImageField
+from rest_framework.utils import html
 
 from core.constants import (
     COOKING_TIME_MAX,
@@ -12,6 +13,7 @@ from core.constants import (
     INGREDIENT_AMOUNT_MAX,
     INGREDIENT_AMOUNT_MIN,
 )
+from menu import ingredient_index, shopping_list
 from menu.models import (
     Favorite,
     Ingredient,
@@ -21,6 +23,10 @@ from menu.models import (
 )
 from users.models import Profile, Subscription, User
 
+from .fields import ImageUploadField
+from .image_variants import current_variants
+from .imaging import FORMATS
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
@@ -55,6 +61,43 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+def media_url(request, url):
+    if request:
+        return request.build_absolute_uri(url)
+    return f"{settings.SITE_URL}{url}"
+
+
+def image_srcset(request, image, variants):
+    """``{format: srcset}`` of an image's variants.
+
+    Every format points at the original until its variants are ready.
+    """
+    if not image:
+        return None
+    if variants is None:
+        original = media_url(request, image.url)
+        return {extension: original for extension in FORMATS}
+    return {
+        extension: ", ".join(
+            f"{media_url(request, image.storage.url(name))} {width}w"
+            for name, width in variants.get(extension, ())
+        )
+        for extension in FORMATS
+    }
+
+
+def recipes_limit(request):
+    """Non-negative ``recipes_limit`` query parameter or ``None``."""
+    limit = request.query_params.get("recipes_limit") if request else None
+    try:
+        limit = int(limit) if limit is not None else None
+    except (TypeError, ValueError):
+        return None
+    if limit is None or limit < 0:
+        return None
+    return limit
+
+
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
@@ -64,34 +107,52 @@ class RecipeMinifiedSerializer(serializers.ModelSerializer):
 class UserSerializer(DjoserUserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
+    avatar_srcset = serializers.SerializerMethodField()
 
     class Meta(DjoserUserSerializer.Meta):
         model = User
-        fields = DjoserUserSerializer.Meta.fields + ("is_subscribed", "avatar")
+        fields = DjoserUserSerializer.Meta.fields + (
+            "is_subscribed",
+            "avatar",
+            "avatar_srcset",
+        )
 
     def get_is_subscribed(self, obj):
         request = self.context.get("request")
-        return bool(
-            request
-            and request.user.is_authenticated
-            and obj.subscribers.filter(user=request.user).exists()
-        )
+        if not (request and request.user.is_authenticated):
+            return False
+        viewer_subscriptions = getattr(obj, "viewer_subscriptions", None)
+        if viewer_subscriptions is not None:
+            return bool(viewer_subscriptions)
+        return obj.subscribers.filter(user=request.user).exists()
 
     def get_avatar(self, obj):
-        if not isinstance(obj, User):
+        profile = self._profile(obj)
+        if profile is None:
+            return None
+        return media_url(self.context.get("request"), profile.avatar.url)
+
+    def get_avatar_srcset(self, obj):
+        profile = self._profile(obj)
+        if profile is None:
             return None
+        return image_srcset(
+            self.context.get("request"),
+            profile.avatar,
+            current_variants(profile),
+        )
 
+    @staticmethod
+    def _profile(obj):
+        if not isinstance(obj, User):
+            return None
         try:
             profile = obj.profiles
         except (Profile.DoesNotExist, AttributeError):
-            profile = None
+            return None
         if not profile or not profile.avatar:
             return None
-        request = self.context.get("request")
-        url = profile.avatar.url
-        if request:
-            return request.build_absolute_uri(url)
-        return f"{settings.SITE_URL}{url}"
+        return profile
 
 
 class RecipeReadSerializer(serializers.ModelSerializer):
@@ -101,6 +162,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         many=True,
         read_only=True,
     )
+    image_srcset = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -110,6 +172,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "image",
+            "image_srcset",
             "text",
             "cooking_time",
             "author",
@@ -118,13 +181,32 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
         )
 
+    def get_image_srcset(self, obj):
+        return image_srcset(
+            self.context.get("request"),
+            obj.image,
+            current_variants(obj),
+        )
+
     def get_is_favorited(self, obj):
-        return self._is_user_related(obj, "favorites")
+        return self._is_user_related(obj, "favorites", "is_favorited")
 
     def get_is_in_shopping_cart(self, obj):
-        return self._is_user_related(obj, "shopping_carts")
+        return self._is_user_related(
+            obj,
+            "shopping_carts",
+            "is_in_shopping_cart",
+        )
 
-    def _is_user_related(self, obj, manager_name: str) -> bool:
+    def _is_user_related(
+        self,
+        obj,
+        manager_name: str,
+        annotation: str,
+    ) -> bool:
+        annotated = getattr(obj, annotation, None)
+        if annotated is not None:
+            return bool(annotated)
         request = self.context.get("request")
         user = getattr(request, "user", None)
         manager = getattr(obj, manager_name)
@@ -161,7 +243,7 @@ class ShoppingCartActionSerializer(serializers.Serializer):
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = ImageUploadField()
     ingredients = RecipeIngredientWriteSerializer(many=True)
 
     class Meta:
@@ -174,6 +256,25 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             "ingredients",
         )
 
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = self._from_multipart(data)
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def _from_multipart(data):
+        """Form fields of a multipart request; ingredients come as JSON."""
+        data = data.dict()
+        ingredients = data.get("ingredients")
+        if isinstance(ingredients, str):
+            try:
+                data["ingredients"] = json.loads(ingredients)
+            except ValueError:
+                raise serializers.ValidationError(
+                    {"ingredients": ["Ожидается список ингредиентов в JSON."]}
+                )
+        return data
+
     def validate_image(self, value):
         if not value:
             raise serializers.ValidationError("Это поле не может быть пустым.")
@@ -220,17 +321,50 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredients", [])
         recipe = Recipe.objects.create(**validated_data)
-        self._set_ingredients(recipe, ingredients)
+        # A new recipe is in nobody's cart, so shopping lists stay as is.
+        self._create_lines(recipe, ingredients)
+        ingredient_index.add_recipe(
+            recipe.pk,
+            [item["ingredient"].pk for item in ingredients],
+        )
         return recipe
 
     def update(self, instance, validated_data):
         ingredients = validated_data.pop("ingredients")
-        instance.recipe_ingredients.all().delete()
-        self._set_ingredients(instance, ingredients)
+        previous = dict(
+            instance.recipe_ingredients.values_list("ingredient_id", "amount")
+        )
+        current = {
+            item["ingredient"].pk: item["amount"] for item in ingredients
+        }
+        # Lines are replaced without per-row signals; the index and the
+        # shopping lists get one diff below and saving the recipe touches
+        # updated_at and its cache versions.
+        lines = RecipeIngredient.objects.filter(recipe=instance)
+        lines._raw_delete(lines.db)
+        self._create_lines(instance, ingredients)
+        ingredient_index.remove_recipe(
+            instance.pk,
+            previous.keys() - current.keys(),
+        )
+        ingredient_index.add_recipe(
+            instance.pk,
+            current.keys() - previous.keys(),
+        )
+        shopping_list.apply_recipe_change(
+            instance.pk,
+            {
+                ingredient_id: (
+                    current.get(ingredient_id, 0)
+                    - previous.get(ingredient_id, 0)
+                )
+                for ingredient_id in previous.keys() | current.keys()
+            },
+        )
         return super().update(instance, validated_data)
 
     @staticmethod
-    def _set_ingredients(recipe, ingredients):
+    def _create_lines(recipe, ingredients):
         RecipeIngredient.objects.bulk_create(
             [
                 RecipeIngredient(
@@ -251,21 +385,18 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
 class UserWithRecipesSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ("recipes", "recipes_count")
 
     def get_recipes(self, obj):
-        recipes_qs = obj.recipes.all()
-        request = self.context.get("request")
-        limit = request.query_params.get("recipes_limit") if request else None
-        try:
-            limit_value = int(limit) if limit is not None else None
-        except (TypeError, ValueError):
-            limit_value = None
-        if limit_value is not None and limit_value >= 0:
-            recipes_qs = recipes_qs[:limit_value]
+        recipes_qs = getattr(obj, "recipe_previews", None)
+        if recipes_qs is None:
+            recipes_qs = obj.recipes.all()
+            limit = recipes_limit(self.context.get("request"))
+            if limit is not None:
+                recipes_qs = recipes_qs[:limit]
         serializer = RecipeMinifiedSerializer(
             recipes_qs,
             many=True,
@@ -273,12 +404,9 @@ class UserWithRecipesSerializer(UserSerializer):
         )
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class SetAvatarSerializer(serializers.Serializer):
-    avatar = Base64ImageField()
+    avatar = ImageUploadField()
 
 
 class SubscriptionActionSerializer(serializers.Serializer):
@@ -0,0 +1,105 @@
+"""Short recipe codes and their resolution.
+
+A code is the recipe id run through a fixed permutation of 40-bit
+integers and written as seven base62 digits. The permutation only hides
+the sequence of ids; it is not a secret and must never change, or links
+already shared would point to other recipes.
+
+Codes stored in ``ShortLinkRecipe`` before codes were derived from ids
+keep working. A derived code only resolves while its recipe exists. Both
+kinds are looked up through a bounded in-process LRU that also remembers
+unknown codes, so repeated hits of a dead or made-up link do not reach
+the database either. Entries are stamped with the shared content
+version, which every recipe change bumps, and count only while it is
+current.
+"""
+import string
+
+from core.constants import SHORT_LINK_CACHE_SIZE
+from menu.models import Recipe, ShortLinkRecipe
+
+from .local_cache import LRUCache
+from .versions import CONTENT_VERSION_KEY, get_version
+
+ALPHABET = string.digits + string.ascii_letters
+CODE_LENGTH = 7
+ID_BITS = 40
+ID_MASK = (1 << ID_BITS) - 1
+ROTATION = 17
+MULTIPLIER = 0x9E3779B97F & ID_MASK
+MULTIPLIER_INVERSE = pow(MULTIPLIER, -1, 1 << ID_BITS)
+XOR_MASK = 0x5BD1E99532 & ID_MASK
+
+
+def _rotate_left(value, shift):
+    return ((value << shift) | (value >> (ID_BITS - shift))) & ID_MASK
+
+
+def encode_recipe_id(recipe_id):
+    if not 0 < recipe_id <= ID_MASK:
+        raise ValueError("Recipe id is out of the short code range")
+    value = (recipe_id * MULTIPLIER) & ID_MASK
+    value = _rotate_left(value, ROTATION) ^ XOR_MASK
+    value = (value * MULTIPLIER) & ID_MASK
+    digits = []
+    for _ in range(CODE_LENGTH):
+        value, digit = divmod(value, len(ALPHABET))
+        digits.append(ALPHABET[digit])
+    return "".join(reversed(digits))
+
+
+def decode_short_code(code):
+    """Return the recipe id of a derived code, ``None`` for anything else."""
+    if len(code) != CODE_LENGTH:
+        return None
+    value = 0
+    for char in code:
+        digit = ALPHABET.find(char)
+        if digit < 0:
+            return None
+        value = value * len(ALPHABET) + digit
+    if value > ID_MASK:
+        return None
+    value = (value * MULTIPLIER_INVERSE) & ID_MASK
+    value = _rotate_left(value ^ XOR_MASK, ID_BITS - ROTATION)
+    value = (value * MULTIPLIER_INVERSE) & ID_MASK
+    return value or None
+
+
+stored_codes = LRUCache(SHORT_LINK_CACHE_SIZE)
+
+
+def short_code_for(recipe_id):
+    """Short code of an existing recipe, ``None`` if there is none."""
+    version = get_version(CONTENT_VERSION_KEY)
+    if not Recipe.objects.filter(pk=recipe_id).exists():
+        return None
+    code = encode_recipe_id(recipe_id)
+    stored_codes.set(code, (recipe_id, version))
+    return code
+
+
+def resolve_short_code(code):
+    """Recipe id behind a short code or ``None`` if the code is unknown."""
+    # Read before the database, see api.versions.
+    version = get_version(CONTENT_VERSION_KEY)
+    cached = stored_codes.get(code)
+    if cached is not None and cached[1] == version:
+        return cached[0]
+    recipe_id = decode_short_code(code)
+    if recipe_id is not None:
+        if not Recipe.objects.filter(pk=recipe_id).exists():
+            recipe_id = None
+    else:
+        recipe_id = (
+            ShortLinkRecipe.objects.filter(code=code)
+            .values_list("recipe_id", flat=True)
+            .first()
+        )
+    stored_codes.set(code, (recipe_id, version))
+    return recipe_id
+
+
+def forget_short_code(code):
+    """Drop a stored code from this process' cache after it changed."""
+    stored_codes.pop(code)
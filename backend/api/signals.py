@@ -0,0 +1,158 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from rest_framework.authtoken.models import Token
+
+from menu.ingredient_index import index_changed
+from menu.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShortLinkRecipe,
+)
+from users.models import Profile, Subscription, User
+
+from .authentication import forget_token, forget_user_tokens
+from .catalog import invalidate_ingredient_catalog
+from .image_variants import (
+    release_deleted_images,
+    release_replaced_image,
+    remember_replaced_image,
+    schedule_variants,
+)
+from .ingredient_postings import bump_index_version
+from .pagination import bump_count_version
+from .recipe_cache import bump_author_version, bump_recipe_version
+from .short_links import forget_short_code
+from .versions import bump_content_version, bump_viewer_version
+
+COUNTED_MODELS = (Favorite, Recipe, ShoppingCart, Subscription, User)
+
+
+def invalidate_counts_on_save(sender, instance, created, **kwargs):
+    if created:
+        bump_count_version(sender._meta.db_table)
+
+
+def invalidate_counts_on_delete(sender, instance, **kwargs):
+    bump_count_version(sender._meta.db_table)
+
+
+for model in COUNTED_MODELS:
+    post_save.connect(invalidate_counts_on_save, sender=model)
+    post_delete.connect(invalidate_counts_on_delete, sender=model)
+
+
+def invalidate_ingredient_catalog_on_change(sender, instance, **kwargs):
+    invalidate_ingredient_catalog()
+
+
+post_save.connect(invalidate_ingredient_catalog_on_change, sender=Ingredient)
+post_delete.connect(invalidate_ingredient_catalog_on_change, sender=Ingredient)
+
+
+def invalidate_ingredient_postings(sender, ingredient_ids, **kwargs):
+    for ingredient_id in ingredient_ids:
+        bump_index_version(ingredient_id)
+
+
+def invalidate_postings_of_ingredient(sender, instance, **kwargs):
+    # Its index rows go with it through the cascade, not index_changed.
+    bump_index_version(instance.pk)
+
+
+index_changed.connect(invalidate_ingredient_postings)
+post_delete.connect(invalidate_postings_of_ingredient, sender=Ingredient)
+
+
+def invalidate_recipe(sender, instance, **kwargs):
+    bump_recipe_version(instance.pk)
+    bump_content_version()
+
+
+def invalidate_recipe_of_line(sender, instance, **kwargs):
+    bump_recipe_version(instance.recipe_id)
+    bump_content_version()
+
+
+def invalidate_recipes_of_ingredient(sender, instance, created, **kwargs):
+    if created:
+        return
+    recipe_ids = RecipeIngredient.objects.filter(
+        ingredient=instance
+    ).values_list("recipe_id", flat=True)
+    for recipe_id in recipe_ids.iterator():
+        bump_recipe_version(recipe_id)
+    bump_content_version()
+
+
+def invalidate_author(sender, instance, update_fields=None, **kwargs):
+    if update_fields == {"last_login"}:
+        return
+    bump_author_version(instance.pk)
+    bump_content_version()
+
+
+def invalidate_author_of_profile(sender, instance, **kwargs):
+    bump_author_version(instance.user_id)
+    bump_content_version()
+
+
+def invalidate_viewer(sender, instance, **kwargs):
+    bump_viewer_version(instance.user_id)
+
+
+for signal in (post_save, post_delete):
+    signal.connect(invalidate_recipe, sender=Recipe)
+    signal.connect(invalidate_recipe_of_line, sender=RecipeIngredient)
+    signal.connect(invalidate_author, sender=User)
+    signal.connect(invalidate_author_of_profile, sender=Profile)
+    for model in (Favorite, ShoppingCart, Subscription):
+        signal.connect(invalidate_viewer, sender=model)
+post_save.connect(invalidate_recipes_of_ingredient, sender=Ingredient)
+
+
+def forget_stored_short_code(sender, instance, **kwargs):
+    forget_short_code(instance.code)
+
+
+post_save.connect(forget_stored_short_code, sender=ShortLinkRecipe)
+post_delete.connect(forget_stored_short_code, sender=ShortLinkRecipe)
+
+
+def forget_deleted_token(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+def forget_tokens_of_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields == {"last_login"}:
+        return
+    forget_user_tokens(instance.pk)
+
+
+post_delete.connect(forget_deleted_token, sender=Token)
+post_save.connect(forget_tokens_of_user, sender=User)
+post_delete.connect(forget_tokens_of_user, sender=User)
+
+
+def render_image_variants(sender, instance, **kwargs):
+    schedule_variants(instance)
+
+
+def remember_image(sender, instance, update_fields=None, **kwargs):
+    remember_replaced_image(instance, update_fields)
+
+
+def release_image(sender, instance, **kwargs):
+    release_replaced_image(instance)
+
+
+def release_images_of_deleted(sender, instance, **kwargs):
+    release_deleted_images(instance)
+
+
+for model in (Recipe, Profile):
+    pre_save.connect(remember_image, sender=model)
+    post_save.connect(release_image, sender=model)
+    post_save.connect(render_image_variants, sender=model)
+    post_delete.connect(release_images_of_deleted, sender=model)
@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import authenticated_tokens
+from api.local_cache import LRUCache
+from users.models import User
+
+BENCHMARK_REQUESTS = 50
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com",
+            username="user",
+            password="user12345",
+        )
+
+    def setUp(self):
+        authenticated_tokens.clear()
+        self.addCleanup(authenticated_tokens.clear)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def count_queries(self, url="/api/users/me/"):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        return response, len(context.captured_queries)
+
+    def test_repeat_requests_skip_token_query(self):
+        """Benchmark: warm reads save the token query on every request."""
+        cold = warm = 0
+        for _ in range(BENCHMARK_REQUESTS):
+            authenticated_tokens.clear()
+            cold += self.count_queries()[1]
+        for _ in range(BENCHMARK_REQUESTS):
+            warm += self.count_queries()[1]
+        self.assertEqual(cold - warm, BENCHMARK_REQUESTS)
+
+    def test_logout_invalidates_token(self):
+        self.count_queries()
+        response = self.client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        response, _ = self.count_queries()
+        self.assertEqual(response.status_code, 401)
+
+    def test_password_change_invalidates_token(self):
+        _, cold = self.count_queries()
+        response = self.client.post(
+            "/api/users/set_password/",
+            {"current_password": "user12345", "new_password": "Sup3r-secret"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.count_queries()[1], cold)
+
+    def test_deactivation_invalidates_token(self):
+        self.count_queries()
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self.count_queries()
+        self.assertEqual(response.status_code, 401)
+
+    def test_writes_load_fresh_user(self):
+        self.count_queries()
+        User.objects.filter(pk=self.user.pk).update(first_name="Новое")
+        response = self.client.patch(
+            "/api/users/me/",
+            {"last_name": "Фамилия"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(
+            (self.user.first_name, self.user.last_name),
+            ("Новое", "Фамилия"),
+        )
+
+    def test_revocation_in_another_worker(self):
+        """Each worker has its own cache; a revocation reaches them all."""
+        other_worker = LRUCache(authenticated_tokens.maxsize)
+        self.count_queries()
+        with mock.patch(
+            "api.authentication.authenticated_tokens",
+            other_worker,
+        ):
+            self.count_queries()
+            response = self.client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNotNone(authenticated_tokens.get(self.token.key))
+        response, _ = self.count_queries()
+        self.assertEqual(response.status_code, 401)
+
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.count_queries()
+        with mock.patch(
+            "api.authentication.authenticated_tokens",
+            other_worker,
+        ):
+            self.user.is_active = False
+            self.user.save()
+        response, _ = self.count_queries()
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,74 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.click_analytics import click_buffer, save_click_deltas
+from api.short_links import encode_recipe_id, short_code_for, stored_codes
+from menu.models import Recipe, ShortLinkClicks
+from users.models import User
+
+
+class ClickAnalyticsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+            is_staff=True,
+            is_superuser=True,
+        )
+        cls.pancakes, cls.omelette = (
+            Recipe.objects.create(
+                author=cls.author,
+                name=name,
+                text="Описание",
+                cooking_time=10,
+            )
+            for name in ("Блинчики", "Омлет")
+        )
+
+    def setUp(self):
+        self.addCleanup(click_buffer.take)
+        click_buffer.take()
+        stored_codes.clear()
+        # Sharing a link checks the recipe once and warms the code cache.
+        for recipe in (self.pancakes, self.omelette):
+            short_code_for(recipe.pk)
+        self.client = APIClient()
+
+    def follow(self, recipe, times=1):
+        url = f"/s/{encode_recipe_id(recipe.pk)}/"
+        for _ in range(times):
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 302)
+
+    def clicks(self):
+        return dict(
+            ShortLinkClicks.objects.values_list("recipe__name", "clicks")
+        )
+
+    def test_clicks_are_buffered_and_flushed_in_batches(self):
+        self.follow(self.pancakes, times=3)
+        self.follow(self.omelette)
+        self.assertEqual(self.clicks(), {})
+
+        with self.assertNumQueries(5):
+            click_buffer.flush()
+        self.assertEqual(self.clicks(), {"Блинчики": 3, "Омлет": 1})
+
+        self.follow(self.omelette, times=2)
+        click_buffer.flush()
+        self.assertEqual(self.clicks(), {"Блинчики": 3, "Омлет": 3})
+
+    def test_unknown_recipes_are_skipped(self):
+        save_click_deltas({self.pancakes.pk: 2, 10**9: 5})
+        self.assertEqual(self.clicks(), {"Блинчики": 2})
+
+    def test_admin_shows_totals(self):
+        save_click_deltas({self.pancakes.pk: 7})
+        self.client.force_login(self.author)
+        response = self.client.get("/admin/menu/recipe/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'class="field-clicks">7<')
+        response = self.client.get("/admin/menu/shortlinkclicks/")
+        self.assertContains(response, "Блинчики")
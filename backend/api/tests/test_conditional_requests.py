@@ -0,0 +1,160 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.catalog import invalidate_ingredient_catalog
+from menu.models import Favorite, Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+from .utils import CatalogTestCase, run_in_other_process, shared_cache
+
+
+class ConditionalRequestsTestCase(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+        )
+        cls.viewer = User.objects.create_user(
+            email="viewer@example.com",
+            username="viewer",
+            password="viewer12345",
+        )
+        cls.viewer_token = Token.objects.create(user=cls.viewer)
+        cls.egg = Ingredient.objects.create(name="Яйцо", measurement_unit="шт")
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Омлет",
+            text="Описание",
+            cooking_time=10,
+        )
+        cls.line = RecipeIngredient.objects.create(
+            recipe=cls.recipe,
+            ingredient=cls.egg,
+            amount=3,
+        )
+
+    def setUp(self):
+        cache.clear()
+        invalidate_ingredient_catalog()
+        self.client = APIClient()
+        self.detail_url = f"/api/recipes/{self.recipe.pk}/"
+
+    def authenticate(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {self.viewer_token.key}"
+        )
+
+    def revalidate(self, url, response, queries=None):
+        headers = {
+            "HTTP_IF_NONE_MATCH": response["ETag"],
+            "HTTP_IF_MODIFIED_SINCE": response["Last-Modified"],
+        }
+        if queries is None:
+            return self.client.get(url, **headers)
+        with self.assertNumQueries(queries):
+            return self.client.get(url, **headers)
+
+    def test_recipe_detail(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Authorization", response["Vary"])
+
+        not_modified = self.revalidate(self.detail_url, response, queries=0)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+
+        self.line.amount = 4
+        self.line.save()
+        self.assertEqual(
+            self.revalidate(self.detail_url, response).status_code,
+            200,
+        )
+
+    def test_recipe_detail_follows_viewer_state(self):
+        self.authenticate()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(
+            self.revalidate(self.detail_url, response, queries=0).status_code,
+            304,
+        )
+
+        Favorite.objects.create(user=self.author, recipe=self.recipe)
+        self.assertEqual(
+            self.revalidate(self.detail_url, response).status_code,
+            304,
+        )
+        Favorite.objects.create(user=self.viewer, recipe=self.recipe)
+        changed = self.revalidate(self.detail_url, response)
+        self.assertEqual(changed.status_code, 200)
+        self.assertTrue(changed.data["is_favorited"])
+
+    def test_recipe_list(self):
+        url = "/api/recipes/?limit=6"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.revalidate(url, response, queries=0).status_code,
+            304,
+        )
+        self.assertEqual(
+            self.revalidate("/api/recipes/?limit=5", response).status_code,
+            200,
+        )
+
+        Recipe.objects.create(
+            author=self.author,
+            name="Салат",
+            text="Описание",
+            cooking_time=5,
+        )
+        changed = self.revalidate(url, response)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data["count"], 2)
+
+    def test_versions_bumped_by_another_process(self):
+        self.authenticate()
+        with shared_cache():
+            responses = {
+                url: self.client.get(url)
+                for url in ("/api/recipes/", self.detail_url)
+            }
+            run_in_other_process(
+                "from api.versions import bump_content_version, "
+                "bump_viewer_version; bump_content_version(); "
+                f"bump_viewer_version({self.viewer.pk})"
+            )
+            for url, response in responses.items():
+                self.assertEqual(
+                    self.revalidate(url, response).status_code,
+                    200,
+                    url,
+                )
+
+    def test_ingredient_rename_invalidates_recipes(self):
+        response = self.client.get(self.detail_url)
+        self.egg.name = "Яйцо куриное"
+        self.egg.save()
+        changed = self.revalidate(self.detail_url, response)
+        self.assertEqual(changed.status_code, 200)
+        ingredient = changed.data["ingredients"][0]
+        self.assertEqual(ingredient["name"], "Яйцо куриное")
+
+    def test_updated_at_follows_ingredient_changes(self):
+        updated_at = self.recipe.updated_at
+        self.line.amount = 5
+        self.line.save()
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+    def test_ingredient_catalog(self):
+        response = self.client.get("/api/ingredients/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Last-Modified", response)
+        response = self.client.get(
+            "/api/ingredients/",
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+        )
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,103 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from menu.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+
+class StoredCountersTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+        )
+        cls.readers = [
+            User.objects.create_user(
+                email=f"reader{index}@example.com",
+                username=f"reader{index}",
+                password="reader12345",
+            )
+            for index in range(3)
+        ]
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Омлет",
+            text="Описание",
+            cooking_time=10,
+        )
+
+    def assert_counters(self, favorites, carts, recipes, subscribers):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(
+            (
+                recipe.favorites_count,
+                recipe.in_carts_count,
+                author.recipes_count,
+                author.subscribers_count,
+            ),
+            (favorites, carts, recipes, subscribers),
+        )
+
+    def follow(self, readers):
+        for reader in readers:
+            Favorite.objects.create(user=reader, recipe=self.recipe)
+            ShoppingCart.objects.create(user=reader, recipe=self.recipe)
+            Subscription.objects.create(user=reader, author=self.author)
+
+    def test_create_and_delete(self):
+        self.assert_counters(0, 0, 1, 0)
+        self.follow(self.readers)
+        self.assert_counters(3, 3, 1, 3)
+
+        Favorite.objects.filter(user=self.readers[0]).delete()
+        ShoppingCart.objects.filter(user__in=self.readers[:2]).delete()
+        self.assert_counters(2, 1, 1, 3)
+
+        self.readers[1].delete()
+        self.assert_counters(1, 1, 1, 2)
+
+    def test_recipe_cascade(self):
+        self.follow(self.readers)
+        Recipe.objects.create(
+            author=self.author,
+            name="Салат",
+            text="Описание",
+            cooking_time=5,
+        )
+        self.assert_counters(3, 3, 2, 3)
+        self.recipe.delete()
+        self.assertEqual(User.objects.get(pk=self.author.pk).recipes_count, 1)
+
+    def test_stale_instance_keeps_counters(self):
+        stale_recipe = Recipe.objects.get(pk=self.recipe.pk)
+        stale_author = User.objects.get(pk=self.author.pk)
+        self.follow(self.readers)
+        stale_recipe.name = "Омлет с сыром"
+        stale_recipe.save()
+        stale_author.first_name = "Автор"
+        stale_author.save()
+        self.assert_counters(3, 3, 1, 3)
+
+    def test_recount_repairs_drift(self):
+        self.follow(self.readers)
+        Recipe.objects.update(favorites_count=0, in_carts_count=7)
+        User.objects.update(recipes_count=0, subscribers_count=0)
+        Favorite.objects.bulk_create(
+            [Favorite(user=self.author, recipe=self.recipe)]
+        )
+
+        output = StringIO()
+        call_command("recount_counters", "--dry-run", stdout=output)
+        self.assertIn("Found 4 drifted counters", output.getvalue())
+        self.assert_counters(0, 7, 0, 0)
+
+        call_command("recount_counters", stdout=StringIO())
+        self.assert_counters(4, 3, 1, 3)
+        output = StringIO()
+        call_command("recount_counters", "--dry-run", stdout=output)
+        self.assertIn("Found 0 drifted counters", output.getvalue())
@@ -0,0 +1,144 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from menu.models import FeedEntry, Recipe
+from users.models import Subscription, User
+
+
+@override_settings(FEED_FAN_OUT_IN_BACKGROUND=False)
+class FeedTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user(
+            email="viewer@example.com",
+            username="viewer",
+            password="viewer12345",
+        )
+        cls.token = Token.objects.create(user=cls.viewer)
+        cls.cook, cls.star, cls.stranger = (
+            User.objects.create_user(
+                email=f"{name}@example.com",
+                username=name,
+                password=f"{name}12345",
+            )
+            for name in ("cook", "star", "stranger")
+        )
+        for author in (cls.cook, cls.star, cls.stranger):
+            for number in range(4):
+                cls.create_recipe(author, number)
+        Subscription.objects.create(user=cls.viewer, author=cls.cook)
+        Subscription.objects.create(user=cls.viewer, author=cls.star)
+        Subscription.objects.create(user=cls.cook, author=cls.star)
+
+    @staticmethod
+    def create_recipe(author, number):
+        return Recipe.objects.create(
+            author=author,
+            name=f"Рецепт {author.username} {number}",
+            text="Описание",
+            cooking_time=10,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def expected_ids(self):
+        return list(
+            Recipe.objects.filter(
+                author__subscribers__user=self.viewer
+            ).values_list("pk", flat=True)
+        )
+
+    def read_feed(self, limit=3):
+        recipe_ids = []
+        url = f"/api/recipes/feed/?limit={limit}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), limit)
+            recipe_ids += [recipe["id"] for recipe in response.data["results"]]
+            url = response.data["next"]
+        return recipe_ids
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        response = self.client.get("/api/recipes/feed/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_subscribe_backfills(self):
+        self.assertEqual(len(self.expected_ids()), 8)
+        self.assertEqual(self.read_feed(), self.expected_ids())
+
+    def test_new_recipe_is_fanned_out(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe(self.cook, 5)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.viewer, recipe=recipe).exists()
+        )
+        self.assertEqual(self.read_feed()[0], recipe.pk)
+
+    def test_unsubscribe_trims(self):
+        Subscription.objects.filter(
+            user=self.viewer,
+            author=self.cook,
+        ).delete()
+        self.assertFalse(
+            FeedEntry.objects.filter(
+                user=self.viewer,
+                author=self.cook,
+            ).exists()
+        )
+        self.assertEqual(self.read_feed(), self.expected_ids())
+
+    @override_settings(FEED_FAN_OUT_MAX_FOLLOWERS=1)
+    def test_popular_author_is_read_on_demand(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe(self.star, 5)
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+        feed_ids = self.read_feed()
+        self.assertEqual(feed_ids, self.expected_ids())
+        self.assertEqual(feed_ids[0], recipe.pk)
+
+    @override_settings(FEED_FAN_OUT_MAX_FOLLOWERS=1)
+    def test_popular_author_is_not_backfilled(self):
+        Subscription.objects.create(user=self.stranger, author=self.star)
+        self.assertFalse(
+            FeedEntry.objects.filter(
+                user=self.stranger,
+                author=self.star,
+            ).exists()
+        )
+        self.client.credentials()
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(
+            self.read_feed(),
+            list(
+                Recipe.objects.filter(author=self.star).values_list(
+                    "pk",
+                    flat=True,
+                )
+            ),
+        )
+
+    def test_query_count_does_not_depend_on_depth(self):
+        first = self.client.get("/api/recipes/feed/?limit=2")
+        with self.assertNumQueries(5):
+            self.client.get("/api/recipes/feed/?limit=2")
+        with self.assertNumQueries(5):
+            self.client.get(first.data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/recipes/feed/?cursor=broken")
+        self.assertEqual(response.status_code, 404)
+
+    def test_rebuild(self):
+        FeedEntry.objects.all().delete()
+        output = StringIO()
+        call_command("rebuild_feeds", stdout=output)
+        self.assertIn("Rebuilt 12 feed entries", output.getvalue())
+        self.assertEqual(self.read_feed(), self.expected_ids())
@@ -0,0 +1,121 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from api.imaging import variant_widths
+from menu.models import Recipe
+from users.models import Profile
+
+from .utils import AuthorTestCase, png_data_uri
+
+
+def rgba_data_uri(width, height):
+    return png_data_uri(width, height, (200, 100, 50, 128), mode="RGBA")
+
+
+def srcset_widths(srcset):
+    return [int(item.rsplit(" ", 1)[1][:-1]) for item in srcset.split(", ")]
+
+
+@override_settings(
+    IMAGE_VARIANTS_IN_BACKGROUND=False,
+    FEED_FAN_OUT_IN_BACKGROUND=False,
+)
+class ImageVariantsTestCase(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def create_recipe(self, width, height):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/recipes/",
+                {
+                    "name": "Омлет",
+                    "text": "Описание",
+                    "cooking_time": 10,
+                    "image": rgba_data_uri(width, height),
+                    "ingredients": [{"id": self.egg.pk, "amount": 2}],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_variant_widths(self):
+        widths = (160, 480, 1280)
+        self.assertEqual(variant_widths(2000, widths), [160, 480, 1280])
+        self.assertEqual(variant_widths(300, widths), [160, 300])
+
+    def test_recipe_variants(self):
+        created = self.create_recipe(1600, 800)
+        srcset = created.data["image_srcset"]
+        self.assertEqual(srcset["webp"], created.data["image"])
+
+        recipe = Recipe.objects.get(pk=created.data["id"])
+        self.assertEqual(recipe.image_variants["source"], recipe.image.name)
+        data = self.client.get(f"/api/recipes/{recipe.pk}/").data
+        self.assertEqual(data["image"], created.data["image"])
+        for extension in ("webp", "jpeg"):
+            srcset = data["image_srcset"][extension]
+            self.assertEqual(srcset_widths(srcset), [160, 480, 1280])
+            self.assertIn(f".{extension} 480w", srcset)
+        name, _ = recipe.image_variants["webp"][1]
+        with default_storage.open(name) as file, Image.open(file) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (480, 240)))
+
+    def test_replaced_image_falls_back_to_original(self):
+        created = self.create_recipe(400, 400)
+        recipe = Recipe.objects.get(pk=created.data["id"])
+        stale = recipe.image_variants
+        self.client.patch(
+            f"/api/recipes/{recipe.pk}/",
+            {
+                "image": rgba_data_uri(200, 100),
+                "ingredients": [{"id": self.egg.pk, "amount": 2}],
+            },
+            format="json",
+        )
+        data = self.client.get(f"/api/recipes/{recipe.pk}/").data
+        self.assertEqual(data["image_srcset"]["jpeg"], data["image"])
+        self.assertTrue(default_storage.exists(stale["jpeg"][0][0]))
+
+    def test_avatar_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                "/api/users/me/avatar/",
+                {"avatar": rgba_data_uri(600, 600)},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        data = self.client.get("/api/users/me/").data
+        self.assertEqual(
+            srcset_widths(data["avatar_srcset"]["webp"]),
+            [160, 480, 600],
+        )
+
+        variants = Profile.objects.get(user=self.author).avatar_variants
+        self.client.delete("/api/users/me/avatar/")
+        for name, _ in variants["jpeg"]:
+            self.assertFalse(default_storage.exists(name))
+        self.assertIsNone(
+            self.client.get("/api/users/me/").data["avatar_srcset"]
+        )
+
+    def test_command_renders_missing_variants(self):
+        ids = [
+            self.create_recipe(200 + width, 200).data["id"]
+            for width in range(5)
+        ]
+        Recipe.objects.update(image_variants={})
+
+        output = StringIO()
+        call_command("render_image_variants", workers=1, stdout=output)
+        self.assertIn("Rendered 5 images, 0 failed", output.getvalue())
+        for recipe in Recipe.objects.filter(pk__in=ids):
+            variants = recipe.image_variants
+            self.assertEqual(variants["source"], recipe.image.name)
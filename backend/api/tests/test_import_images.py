@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+
+from menu.image_import import name_key
+from menu.models import MediaFile, Recipe
+from users.models import User
+
+from .utils import MediaTestCase
+
+
+class ImportImagesTestCase(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+        )
+
+    def setUp(self):
+        self.source = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.media = Path(settings.MEDIA_ROOT) / "recipes"
+        shutil.rmtree(self.media, ignore_errors=True)
+        for name, content in (("blinchiki.png", b"a" * 1000), ("7.png", b"b")):
+            (self.source / name).write_bytes(content)
+
+    def run_import(self, *args):
+        output = StringIO()
+        call_command(
+            "import_images",
+            "--dir",
+            str(self.source),
+            *args,
+            stdout=output,
+        )
+        return output.getvalue()
+
+    def test_name_key(self):
+        self.assertEqual(name_key("Блинчики"), "blinchiki")
+        self.assertEqual(name_key("Омлет с сыром!"), "omlet_s_syrom")
+
+    def test_unchanged_files_are_skipped(self):
+        self.assertIn("Copied 2, linked 0, skipped 0", self.run_import())
+        self.assertEqual(
+            (self.media / "blinchiki.png").read_bytes(),
+            b"a" * 1000,
+        )
+        self.assertIn("Copied 0, linked 0, skipped 2", self.run_import())
+
+        os.utime(self.media / "7.png", (0, 0))
+        (self.source / "blinchiki.png").write_bytes(b"c" * 1000)
+        self.assertIn("Copied 1, linked 0, skipped 1", self.run_import())
+        self.assertEqual(
+            (self.media / "blinchiki.png").read_bytes(),
+            b"c" * 1000,
+        )
+        self.assertEqual(
+            os.stat(self.media / "7.png").st_mtime_ns,
+            os.stat(self.source / "7.png").st_mtime_ns,
+        )
+
+    def test_link(self):
+        self.assertIn("Copied 0, linked 2", self.run_import("--link"))
+        self.assertTrue(
+            os.path.samefile(
+                self.source / "7.png",
+                self.media / "7.png",
+            )
+        )
+        self.assertIn("skipped 2", self.run_import("--link"))
+
+    def test_bind(self):
+        by_name, by_id, other = (
+            Recipe.objects.create(
+                author=self.author,
+                name=name,
+                text="Описание",
+                cooking_time=10,
+            )
+            for name in ("Блинчики", "Омлет", "Блинчики")
+        )
+        (self.source / f"{by_id.pk}.png").write_bytes(b"d")
+        Recipe.objects.filter(pk=other.pk).update(image="recipes/own.png")
+
+        self.assertIn("bound 2 recipes", self.run_import("--bind"))
+        self.assertEqual(
+            Recipe.objects.get(pk=by_name.pk).image.name,
+            "recipes/blinchiki.png",
+        )
+        self.assertEqual(
+            Recipe.objects.get(pk=by_id.pk).image.name,
+            f"recipes/{by_id.pk}.png",
+        )
+        self.assertEqual(
+            Recipe.objects.get(pk=other.pk).image.name,
+            "recipes/own.png",
+        )
+        self.assertEqual(
+            MediaFile.objects.get(pk="recipes/blinchiki.png").references,
+            1,
+        )
+        self.assertIn("bound 0 recipes", self.run_import("--bind"))
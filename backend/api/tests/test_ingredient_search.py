@@ -0,0 +1,123 @@
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api.catalog import get_ingredient_catalog
+from menu.models import Ingredient, normalize_search_name
+
+from .utils import CatalogTestCase
+
+
+class IngredientSearchTestCase(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name, unit in (
+            ("Ёлочные игрушки", "шт"),
+            ("Елочка", "шт"),
+            ("Мёд", "г"),
+            ("Мед липовый", "г"),
+            ("Молоко", "мл"),
+            ("Морковь", "г"),
+            ("Яблоко", "шт"),
+        ):
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def search(self, query):
+        response = self.client.get("/api/ingredients/", {"name": query})
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.json()]
+
+    def test_prefix_is_case_insensitive(self):
+        self.assertEqual(self.search("МО"), ["Молоко", "Морковь"])
+        self.assertEqual(self.search("мол"), ["Молоко"])
+
+    def test_yo_matches_ye(self):
+        self.assertCountEqual(self.search("мед"), ["Мед липовый", "Мёд"])
+        self.assertCountEqual(
+            self.search("Ёл"),
+            ["Елочка", "Ёлочные игрушки"],
+        )
+
+    def test_search_name_follows_renames(self):
+        ingredient = Ingredient.objects.get(name="Яблоко")
+        ingredient.name = "Ёжевика"
+        ingredient.save(update_fields=["name"])
+        self.assertEqual(self.search("еж"), ["Ёжевика"])
+
+    def test_prefix_matches_ignore_collation(self):
+        for name in (
+            "Сок яблочный",
+            "Соки-фреш",
+            "Сок, томатный",
+            "Сокол",
+            "Сок-яблоко",
+            "Сок  ягодный",
+        ):
+            Ingredient.objects.create(name=name, measurement_unit="мл")
+        keys = list(get_ingredient_catalog()._keys)
+        self.assertEqual(keys, sorted(keys))
+        for query in ("сок я", "сок", "сок,", "сок-", "соки", "сок  "):
+            self.assertCountEqual(
+                self.search(query),
+                Ingredient.objects.filter(
+                    search_name__startswith=normalize_search_name(query)
+                ).values_list("name", flat=True),
+                query,
+            )
+
+    def test_prefix_search_uses_index(self):
+        queryset = Ingredient.objects.search_prefix("мол")
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        self.assertIn("search_name", plan)
+        self.assertRegex(plan, r"(?i)index")
+
+    def test_catalog_etag(self):
+        response = self.client.get("/api/ingredients/")
+        etag = response["ETag"]
+        self.assertEqual(len(response.json()), 7)
+
+        response = self.client.get(
+            "/api/ingredients/",
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 304)
+
+        Ingredient.objects.create(name="Мята", measurement_unit="г")
+        response = self.client.get(
+            "/api/ingredients/",
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_catalog_detail(self):
+        ingredient = Ingredient.objects.get(name="Молоко")
+        response = self.client.get(f"/api/ingredients/{ingredient.pk}/")
+        self.assertEqual(
+            response.json(),
+            {"id": ingredient.pk, "name": "Молоко", "measurement_unit": "мл"},
+        )
+        response = self.client.get(f"/api/ingredients/{ingredient.pk + 100}/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_fuzzy_search_tolerates_typos(self):
+        response = self.client.get(
+            "/api/ingredients/",
+            {"name": "малоко", "fuzzy": 1},
+        )
+        self.assertEqual(response.json()[0]["name"], "Молоко")
+        self.assertEqual(self.search("малоко"), [])
+
+    def test_fuzzy_search_ranks_prefix_matches_first(self):
+        response = self.client.get(
+            "/api/ingredients/",
+            {"name": "мед", "fuzzy": "true"},
+        )
+        names = [item["name"] for item in response.json()]
+        self.assertCountEqual(names[:2], ["Мед липовый", "Мёд"])
+        self.assertEqual(len(names), len(set(names)))
@@ -0,0 +1,262 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from menu.bulk_load import RecipeLoader, iter_json_array
+from menu.ingredient_index import recipe_ids_for
+from menu.models import (
+    FeedEntry,
+    Ingredient,
+    MediaFile,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+)
+from users.models import Subscription, User
+
+from .utils import MediaTestCase, png_base64
+
+
+@override_settings(IMAGE_VARIANTS_IN_BACKGROUND=False)
+class LoadDataTestCase(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cook = User.objects.create_user(
+            email="cook@example.com",
+            username="cook",
+            password="cook12345",
+        )
+        cls.reader = User.objects.create_user(
+            email="reader@example.com",
+            username="reader",
+            password="reader12345",
+        )
+        Subscription.objects.create(user=cls.reader, author=cls.cook)
+        cls.egg = Ingredient.objects.create(name="Яйцо", measurement_unit="шт")
+        cls.milk = Ingredient.objects.create(
+            name="Молоко",
+            measurement_unit="мл",
+        )
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def write(self, name, items):
+        (self.dir / name).write_text(
+            json.dumps(items, ensure_ascii=False),
+            encoding="utf-8",
+        )
+
+    def recipe(self, number, **extra):
+        return {
+            "author_username": "cook",
+            "name": f"Рецепт {number}",
+            "text": "Описание",
+            "cooking_time": 10,
+            "ingredients": [
+                {"name": "Яйцо", "amount": 2},
+                {"id": self.milk.pk, "amount": 100},
+            ],
+            **extra,
+        }
+
+    def load(self, *args):
+        output = StringIO()
+        call_command(
+            "load_data",
+            "--dir",
+            str(self.dir),
+            *args,
+            stdout=output,
+        )
+        return output.getvalue()
+
+    def test_iter_json_array(self):
+        items = [{"name": "ё" * 10, "items": [1, 2]}, 12345, "a", None]
+        text = json.dumps(items, ensure_ascii=False, indent=2)
+        self.assertEqual(
+            list(iter_json_array(io.StringIO(text), chunk_size=3)),
+            items,
+        )
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[{"a": 1}'), chunk_size=3))
+
+    def test_load(self):
+        self.write(
+            "ingredients.json",
+            [
+                {"name": "Соль", "measurement_unit": "г"},
+                {"name": "Яйцо", "measurement_unit": "шт"},
+            ],
+        )
+        image = png_base64(2, 2)
+        self.write(
+            "recipes.json",
+            [
+                self.recipe(1, image_base64=image),
+                self.recipe(2, image_base64=image),
+                self.recipe(3, author_username="nobody"),
+                self.recipe(4),
+            ],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            output = self.load("--batch-size", "2")
+        self.assertIn("Recipes: 3 created, 0 updated, 1 skipped", output)
+        self.assertIn("rows/s", output)
+        self.assertFalse((self.dir / "recipes.json.progress").exists())
+
+        self.assertTrue(Ingredient.objects.filter(name="Соль").exists())
+        recipes = Recipe.objects.filter(author=self.cook)
+        self.assertEqual(recipes.count(), 3)
+        first, second = recipes.filter(name__in=["Рецепт 1", "Рецепт 2"])
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image_variants, second.image_variants)
+        self.assertTrue(first.image_variants["webp"])
+        self.assertEqual(
+            MediaFile.objects.get(pk=first.image.name).references,
+            2,
+        )
+
+        recipe_ids = set(recipes.values_list("pk", flat=True))
+        self.assertEqual(
+            recipe_ids_for([self.egg.pk, self.milk.pk]),
+            recipe_ids,
+        )
+        self.cook.refresh_from_db()
+        self.assertEqual(self.cook.recipes_count, 3)
+        self.assertEqual(
+            set(
+                FeedEntry.objects.filter(user=self.reader).values_list(
+                    "recipe_id",
+                    flat=True,
+                )
+            ),
+            recipe_ids,
+        )
+
+    def test_loaded_recipes_are_searchable(self):
+        self.write(
+            "recipes.json",
+            [self.recipe(1, text="Тонкие блины на молоке"), self.recipe(2)],
+        )
+        self.load("--batch-size", "1")
+        response = APIClient().get("/api/recipes/", {"search": "блины"})
+        self.assertEqual(
+            [item["name"] for item in response.data["results"]],
+            ["Рецепт 1"],
+        )
+
+    def test_reload_replaces_ingredients(self):
+        self.write("recipes.json", [self.recipe(1)])
+        self.load()
+        recipe = Recipe.objects.get(name="Рецепт 1")
+        ShoppingCart.objects.create(user=self.reader, recipe=recipe)
+
+        changed = self.recipe(1)
+        changed["ingredients"] = [{"name": "Яйцо", "amount": 5}]
+        self.write("recipes.json", [changed])
+        self.assertIn("0 created, 1 updated", self.load())
+        self.assertEqual(
+            list(
+                ShoppingListItem.objects.filter(user=self.reader).values_list(
+                    "ingredient_id",
+                    "amount",
+                )
+            ),
+            [(self.egg.pk, 5)],
+        )
+        self.assertEqual(recipe_ids_for([self.milk.pk]), set())
+        self.assertEqual(recipe_ids_for([self.egg.pk]), {recipe.pk})
+
+    def test_resume(self):
+        self.write(
+            "recipes.json",
+            [self.recipe(number) for number in range(5)],
+        )
+        stat = (self.dir / "recipes.json").stat()
+        (self.dir / "recipes.json.progress").write_text(
+            json.dumps(
+                {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "done": 3,
+                }
+            )
+        )
+        output = self.load()
+        self.assertIn("Resuming after 3 recipes", output)
+        self.assertEqual(
+            set(Recipe.objects.values_list("name", flat=True)),
+            {"Рецепт 3", "Рецепт 4"},
+        )
+        self.assertIn(
+            "Recipes: 3 created, 2 updated",
+            self.load("--restart"),
+        )
+
+    def test_query_count_does_not_depend_on_size(self):
+        self.load()
+        counts = []
+        for size in (5, 20):
+            Recipe.objects.all().delete()
+            self.write(
+                "recipes.json",
+                [self.recipe(number) for number in range(size)],
+            )
+            with CaptureQueriesContext(connection) as queries:
+                self.load()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_reload_query_count_does_not_depend_on_size(self):
+        counts = []
+        for size in (5, 20):
+            Recipe.objects.all().delete()
+            recipes = [self.recipe(number) for number in range(size)]
+            self.write("recipes.json", recipes)
+            self.load()
+            ShoppingCart.objects.bulk_create(
+                [
+                    ShoppingCart(user=self.reader, recipe=recipe)
+                    for recipe in Recipe.objects.all()
+                ]
+            )
+            for recipe in recipes:
+                recipe["ingredients"] = [{"name": "Яйцо", "amount": 5}]
+            self.write("recipes.json", recipes)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertIn(f"0 created, {size} updated", self.load())
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_failed_chunk_removes_its_image_files(self):
+        self.write(
+            "recipes.json",
+            [self.recipe(1, image_base64=png_base64(noise=True))],
+        )
+        with mock.patch.object(
+            RecipeLoader,
+            "_update_indexes",
+            side_effect=RuntimeError,
+        ):
+            with self.assertRaises(RuntimeError):
+                self.load()
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(MediaFile.objects.exists())
+        self.assertEqual(
+            [files for _, _, files in os.walk(settings.MEDIA_ROOT) if files],
+            [],
+        )
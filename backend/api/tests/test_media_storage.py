@@ -0,0 +1,128 @@
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import override_settings
+
+from menu.models import MediaFile, Recipe
+from menu.storage import media_storage
+from users.models import Profile
+
+from .utils import AuthorTestCase, png_bytes, png_data_uri
+
+
+def references(name):
+    return (
+        MediaFile.objects.filter(pk=name)
+        .values_list("references", flat=True)
+        .first()
+    )
+
+
+@override_settings(
+    IMAGE_VARIANTS_IN_BACKGROUND=False,
+    FEED_FAN_OUT_IN_BACKGROUND=False,
+)
+class ContentAddressedStorageTestCase(AuthorTestCase):
+    def create_recipe(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/recipes/",
+                {
+                    "name": "Омлет",
+                    "text": "Описание",
+                    "cooking_time": 10,
+                    "image": image,
+                    "ingredients": [{"id": self.egg.pk, "amount": 2}],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(pk=response.data["id"])
+
+    def test_same_content_is_stored_once(self):
+        first = media_storage.save("recipes/a.PNG", ContentFile(b"content"))
+        second = media_storage.save("users/b.png", ContentFile(b"content"))
+        self.assertEqual(first, second)
+        self.assertRegex(first, r"^blobs/([0-9a-f]{2})/\1[0-9a-f]{62}\.png$")
+        self.assertEqual(references(first), 2)
+
+        media_storage.delete(first)
+        self.assertTrue(media_storage.exists(first))
+        media_storage.delete(first)
+        self.assertFalse(media_storage.exists(first))
+        self.assertIsNone(references(first))
+
+    def test_temporary_upload_is_moved(self):
+        upload = TemporaryUploadedFile("photo.png", "image/png", 7, None)
+        upload.write(b"content")
+        upload.seek(0)
+        name = media_storage.save("recipes/photo.png", upload)
+        with media_storage.open(name) as file:
+            self.assertEqual(file.read(), b"content")
+        upload.close()
+
+    def test_recipes_share_image_until_both_are_deleted(self):
+        image = png_data_uri(4, 4, "orange")
+        first = self.create_recipe(image)
+        second = self.create_recipe(image)
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(references(name), 2)
+        variant = first.image_variants["webp"][0][0]
+        self.assertEqual(references(variant), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/recipes/{first.pk}/")
+        self.assertTrue(media_storage.exists(name))
+        self.assertTrue(media_storage.exists(variant))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/recipes/{second.pk}/")
+        self.assertFalse(media_storage.exists(name))
+        self.assertFalse(media_storage.exists(variant))
+
+    def test_reuploading_same_image_does_not_leak(self):
+        recipe = self.create_recipe(png_data_uri(4, 4, "orange"))
+        name = recipe.image.name
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(
+                    f"/api/recipes/{recipe.pk}/",
+                    {
+                        "image": png_data_uri(4, 4, "orange"),
+                        "ingredients": [{"id": self.egg.pk, "amount": 2}],
+                    },
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(references(name), 1)
+        recipe.refresh_from_db()
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe.image.save(
+                    "photo.png",
+                    ContentFile(png_bytes(4, 4, "orange")),
+                )
+            self.assertEqual(recipe.image.name, name)
+            self.assertEqual(references(name), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/recipes/{recipe.pk}/")
+        self.assertFalse(media_storage.exists(name))
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_replaced_avatar_is_released(self):
+        names = []
+        for color in ("orange", "green"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.put(
+                    "/api/users/me/avatar/",
+                    {"avatar": png_data_uri(4, 4, color)},
+                    format="json",
+                )
+            names.append(Profile.objects.get(user=self.author).avatar.name)
+        self.assertFalse(media_storage.exists(names[0]))
+        self.assertTrue(media_storage.exists(names[1]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete("/api/users/me/avatar/")
+        self.assertFalse(media_storage.exists(names[1]))
+        self.assertFalse(MediaFile.objects.exists())
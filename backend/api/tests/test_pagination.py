@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from menu.models import Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+
+class RecipePaginationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+        )
+        for number in range(7):
+            Recipe.objects.create(
+                author=cls.author,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=5,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def count_queries(self, sql):
+        return sum("COUNT(" in query["sql"] for query in sql)
+
+    def test_count_is_cached_until_recipe_created(self):
+        response = self.client.get("/api/recipes/")
+        self.assertEqual(response.data["count"], 7)
+        self.assertTrue(response.data["count_exact"])
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/recipes/")
+        self.assertEqual(response.data["count"], 7)
+        self.assertEqual(self.count_queries(context.captured_queries), 0)
+
+        Recipe.objects.create(
+            author=self.author,
+            name="Новый",
+            text="Описание",
+            cooking_time=5,
+        )
+        response = self.client.get("/api/recipes/")
+        self.assertEqual(response.data["count"], 8)
+
+        Recipe.objects.filter(name="Новый").delete()
+        response = self.client.get("/api/recipes/")
+        self.assertEqual(response.data["count"], 7)
+
+    def test_filtered_counts_are_not_cached(self):
+        url = "/api/recipes/?search=рецепт"
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.data["count"], 7)
+            self.assertEqual(self.count_queries(context.captured_queries), 1)
+
+    def test_search_count_follows_recipe_updates(self):
+        url = "/api/recipes/?search=блины"
+        self.assertEqual(self.client.get(url).data["count"], 0)
+        recipe = Recipe.objects.get(name="Рецепт 0")
+        recipe.name = "Блины"
+        recipe.save()
+        self.assertEqual(self.client.get(url).data["count"], 1)
+
+    def test_ingredient_filter_count_follows_index(self):
+        egg = Ingredient.objects.create(name="Яйцо", measurement_unit="шт")
+        url = f"/api/recipes/?ingredients={egg.pk}"
+        recipes = list(Recipe.objects.all()[:2])
+        RecipeIngredient.objects.create(
+            recipe=recipes[0],
+            ingredient=egg,
+            amount=1,
+        )
+        self.assertEqual(self.client.get(url).data["count"], 1)
+        RecipeIngredient.objects.create(
+            recipe=recipes[1],
+            ingredient=egg,
+            amount=1,
+        )
+        self.assertEqual(self.client.get(url).data["count"], 2)
+
+    def test_cursor_mode_walks_all_recipes_without_count(self):
+        expected = list(Recipe.objects.values_list("id", flat=True))
+        seen = []
+        url = "/api/recipes/?cursor=&limit=3"
+        with CaptureQueriesContext(connection) as context:
+            while url:
+                response = self.client.get(url)
+                self.assertNotIn("count", response.data)
+                seen.extend(item["id"] for item in response.data["results"])
+                url = response.data["next"]
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.count_queries(context.captured_queries), 0)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/recipes/?cursor=broken")
+        self.assertEqual(response.status_code, 404)
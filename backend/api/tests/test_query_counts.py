@@ -0,0 +1,268 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.catalog import invalidate_ingredient_catalog
+from api.click_analytics import click_buffer
+from menu.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShortLinkRecipe,
+)
+from users.models import Profile, Subscription, User
+
+from .utils import CatalogTestCase
+
+PAGE_SIZES = (6, 50, 200)
+AUTHORS_COUNT = 210
+INGREDIENTS_COUNT = 40
+INGREDIENTS_PER_RECIPE = 5
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+class QueryBudgetTestCase(CatalogTestCase):
+    """Each endpoint must stay within a fixed SQL budget.
+
+    The budget does not depend on the page size: a serializer that starts
+    querying per row makes the larger pages blow through it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user(
+            email="viewer@example.com",
+            username="viewer",
+            password="viewer12345",
+            is_staff=True,
+        )
+        cls.token = Token.objects.create(user=cls.viewer)
+
+        User.objects.bulk_create(
+            [
+                User(
+                    email=f"author{index}@example.com",
+                    username=f"author{index}",
+                    first_name="Автор",
+                    last_name=str(index),
+                )
+                for index in range(AUTHORS_COUNT)
+            ]
+        )
+        authors = list(User.objects.exclude(pk=cls.viewer.pk))
+        Profile.objects.bulk_create(
+            [
+                Profile(user=author, avatar=f"users/{author.username}.png")
+                for author in authors[::2]
+            ]
+        )
+        Subscription.objects.bulk_create(
+            [
+                Subscription(user=cls.viewer, author=author)
+                for author in authors
+            ]
+        )
+
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=f"Ингредиент {index}", measurement_unit="г")
+                for index in range(INGREDIENTS_COUNT)
+            ]
+        )
+        ingredients = list(Ingredient.objects.all())
+
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author=author,
+                    name=f"Рецепт {author.username}-{number}",
+                    image="recipes/recipe.png",
+                    text="Описание",
+                    cooking_time=10 + number,
+                )
+                for author in authors
+                for number in range(2)
+            ]
+        )
+        recipes = list(Recipe.objects.all())
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredients[
+                        (recipe.pk + offset) % INGREDIENTS_COUNT
+                    ],
+                    amount=offset + 1,
+                )
+                for recipe in recipes
+                for offset in range(INGREDIENTS_PER_RECIPE)
+            ]
+        )
+        Favorite.objects.bulk_create(
+            [
+                Favorite(user=cls.viewer, recipe=recipe)
+                for recipe in recipes[::3]
+            ]
+        )
+        ShoppingCart.objects.bulk_create(
+            [
+                ShoppingCart(user=cls.viewer, recipe=recipe)
+                for recipe in recipes[::2]
+            ]
+        )
+        call_command("reconcile_shopping_lists", stdout=StringIO())
+        call_command("recount_counters", stdout=StringIO())
+        cls.recipe = recipes[0]
+        cls.short_link = ShortLinkRecipe.objects.create(
+            recipe=cls.recipe,
+            code="budget01",
+        )
+
+    def setUp(self):
+        self.addCleanup(click_buffer.take)
+        cache.clear()
+        invalidate_ingredient_catalog()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def assert_query_budget(self, url, budget, status_code=200):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status_code, url)
+        self.assertLessEqual(
+            len(context.captured_queries),
+            budget,
+            "\n".join(query["sql"] for query in context.captured_queries),
+        )
+        return response
+
+    def assert_paginated_budget(self, url, budget):
+        for page_size in PAGE_SIZES:
+            with self.subTest(page_size=page_size):
+                separator = "&" if "?" in url else "?"
+                response = self.assert_query_budget(
+                    f"{url}{separator}limit={page_size}",
+                    budget,
+                )
+                self.assertEqual(len(response.data["results"]), page_size)
+
+    def test_recipes_list(self):
+        self.assert_paginated_budget("/api/recipes/", 6)
+
+    def test_recipes_list_anonymous(self):
+        self.client.credentials()
+        self.assert_paginated_budget("/api/recipes/", 4)
+
+    def test_recipes_list_cursor(self):
+        self.assert_paginated_budget("/api/recipes/?cursor=", 5)
+
+    def test_recipes_list_filtered(self):
+        self.assert_paginated_budget("/api/recipes/?is_in_shopping_cart=1", 6)
+
+    def test_recipe_detail(self):
+        url = f"/api/recipes/{self.recipe.pk}/"
+        self.assert_query_budget(url, 5)
+        self.assert_query_budget(url, 2)
+        self.client.credentials()
+        self.assert_query_budget(url, 0)
+
+    def test_subscriptions(self):
+        self.assert_paginated_budget(
+            "/api/users/subscriptions/?recipes_limit=1",
+            6,
+        )
+
+    def test_subscriptions_recipes_limit(self):
+        for recipes_limit in ("", "0", "1", "2", "50", "-1", "abc"):
+            with self.subTest(recipes_limit=recipes_limit):
+                response = self.assert_query_budget(
+                    "/api/users/subscriptions/?limit=200"
+                    f"&recipes_limit={recipes_limit}",
+                    6,
+                )
+                expected = 2
+                if recipes_limit.isdigit():
+                    expected = min(int(recipes_limit), 2)
+                for author in response.data["results"]:
+                    self.assertEqual(len(author["recipes"]), expected)
+                    self.assertEqual(author["recipes_count"], 2)
+
+    def test_subscriptions_previews_are_latest_recipes(self):
+        response = self.client.get(
+            "/api/users/subscriptions/?limit=6&recipes_limit=1"
+        )
+        for author in response.data["results"]:
+            latest = Recipe.objects.filter(author_id=author["id"]).first()
+            self.assertEqual(
+                [recipe["id"] for recipe in author["recipes"]],
+                [latest.pk],
+            )
+
+    def test_users_list(self):
+        self.assert_paginated_budget("/api/users/", 5)
+
+    def test_ingredients(self):
+        self.assert_query_budget("/api/ingredients/", 2)
+        self.assert_query_budget("/api/ingredients/?name=Ингр", 2)
+
+    def test_download_shopping_cart(self):
+        for export_format in ("txt", "csv", "json", "pdf"):
+            with self.subTest(export_format=export_format):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(
+                        "/api/recipes/download_shopping_cart/",
+                        {"format": export_format},
+                    )
+                    b"".join(response.streaming_content)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(context.captured_queries), 2)
+
+    def test_short_redirect(self):
+        self.client.credentials()
+        self.assert_query_budget(
+            f"/s/{self.short_link.code}/",
+            1,
+            status_code=302,
+        )
+
+    def test_recipe_get_link(self):
+        self.assert_query_budget(
+            f"/api/recipes/{self.recipe.pk}/get-link/",
+            2,
+        )
+
+    def test_recipe_update_writes(self):
+        author_token = Token.objects.create(user=self.recipe.author)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {author_token.key}"
+        )
+        ingredients = list(Ingredient.objects.all())
+        for first, count in ((0, 2), (10, 20)):
+            with self.subTest(count=count):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.patch(
+                        f"/api/recipes/{self.recipe.pk}/",
+                        {
+                            "ingredients": [
+                                {"id": ingredient.pk, "amount": 2}
+                                for ingredient in ingredients[
+                                    first:first + count
+                                ]
+                            ]
+                        },
+                        format="json",
+                    )
+                self.assertEqual(response.status_code, 200)
+                writes = [
+                    query["sql"]
+                    for query in context.captured_queries
+                    if query["sql"].startswith(WRITE_STATEMENTS)
+                ]
+                self.assertLessEqual(len(writes), 10, "\n".join(writes))
@@ -0,0 +1,129 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from menu.models import Favorite, Ingredient, Recipe, RecipeIngredient
+from users.models import Subscription, User
+
+from .utils import (
+    MediaTestCase,
+    png_data_uri,
+    run_in_other_process,
+    shared_cache,
+)
+
+
+class RecipeCacheTestCase(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+            first_name="Автор",
+        )
+        cls.viewer = User.objects.create_user(
+            email="viewer@example.com",
+            username="viewer",
+            password="viewer12345",
+        )
+        cls.author_token = Token.objects.create(user=cls.author)
+        cls.viewer_token = Token.objects.create(user=cls.viewer)
+        cls.egg = Ingredient.objects.create(name="Яйцо", measurement_unit="шт")
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Омлет",
+            text="Описание",
+            cooking_time=10,
+        )
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe,
+            ingredient=cls.egg,
+            amount=3,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = f"/api/recipes/{self.recipe.pk}/"
+
+    def client_for(self, token=None):
+        client = APIClient()
+        if token:
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return client
+
+    def get(self, token=None):
+        response = self.client_for(token).get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_viewer_flags_are_overlaid(self):
+        Favorite.objects.create(user=self.viewer, recipe=self.recipe)
+        Subscription.objects.create(user=self.viewer, author=self.author)
+        self.assertFalse(self.get(self.author_token)["is_favorited"])
+
+        data = self.get(self.viewer_token)
+        self.assertTrue(data["is_favorited"])
+        self.assertFalse(data["is_in_shopping_cart"])
+        self.assertTrue(data["author"]["is_subscribed"])
+
+        data = self.get()
+        self.assertFalse(data["is_favorited"])
+        self.assertFalse(data["author"]["is_subscribed"])
+
+    def test_recipe_changes_invalidate_payload(self):
+        self.get()
+        author_client = self.client_for(self.author_token)
+        response = author_client.patch(
+            self.url,
+            {
+                "name": "Омлет с молоком",
+                "ingredients": [{"id": self.egg.pk, "amount": 4}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = self.get()
+        self.assertEqual(data["name"], "Омлет с молоком")
+        self.assertEqual(data["ingredients"][0]["amount"], 4)
+
+        line = RecipeIngredient.objects.get(recipe=self.recipe)
+        line.amount = 5
+        line.save()
+        self.assertEqual(self.get()["ingredients"][0]["amount"], 5)
+
+    def test_author_changes_invalidate_payload(self):
+        self.get()
+        self.author.first_name = "Повар"
+        self.author.save()
+        self.assertEqual(self.get()["author"]["first_name"], "Повар")
+
+        response = self.client_for(self.author_token).put(
+            "/api/users/me/avatar/",
+            {"avatar": png_data_uri()},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(self.get()["author"]["avatar"])
+
+    def test_version_bumped_by_another_process(self):
+        with shared_cache():
+            self.get()
+            Recipe.objects.filter(pk=self.recipe.pk).update(name="Блины")
+            self.assertEqual(self.get()["name"], "Омлет")
+            run_in_other_process(
+                "from api.recipe_cache import bump_recipe_version; "
+                f"bump_recipe_version({self.recipe.pk})"
+            )
+            self.assertEqual(self.get()["name"], "Блины")
+
+    def test_deleted_recipe_is_not_served(self):
+        self.get()
+        Recipe.objects.filter(pk=self.recipe.pk).delete()
+        response = self.client_for().get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_unknown_recipe(self):
+        client = self.client_for()
+        self.assertEqual(client.get("/api/recipes/0/").status_code, 404)
+        self.assertEqual(client.get("/api/recipes/abc/").status_code, 404)
@@ -0,0 +1,175 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.ingredient_postings import decoded_postings
+from menu.ingredient_index import bucket_of, decode_ids
+from menu.models import (
+    Ingredient,
+    IngredientRecipes,
+    Recipe,
+    RecipeIngredient,
+)
+from users.models import User
+
+
+class RecipeIngredientsFilterTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+        )
+        cls.token = Token.objects.create(user=cls.author)
+        cls.flour, cls.egg, cls.milk, cls.sugar = (
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (
+                ("Мука", "г"),
+                ("Яйцо", "шт"),
+                ("Молоко", "мл"),
+                ("Сахар", "г"),
+            )
+        )
+        cls.pancakes = cls.create_recipe(
+            "Блинчики",
+            cls.flour,
+            cls.egg,
+            cls.milk,
+        )
+        cls.omelette = cls.create_recipe("Омлет", cls.egg, cls.milk)
+        cls.syrup = cls.create_recipe("Сироп", cls.sugar)
+
+    @classmethod
+    def create_recipe(cls, name, *ingredients, pk=None):
+        recipe = Recipe.objects.create(
+            pk=pk,
+            author=cls.author,
+            name=name,
+            text="Описание",
+            cooking_time=10,
+        )
+        for ingredient in ingredients:
+            RecipeIngredient.objects.create(
+                recipe=recipe,
+                ingredient=ingredient,
+                amount=1,
+            )
+        return recipe
+
+    def setUp(self):
+        cache.clear()
+        decoded_postings.clear()
+        self.client = APIClient()
+
+    def filter(self, *ingredients, match=None):
+        ids = ",".join(str(ingredient.pk) for ingredient in ingredients)
+        params = {"ingredients": ids}
+        if match:
+            params["match"] = match
+        response = self.client.get("/api/recipes/", params)
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.data["results"]]
+
+    def test_match_all(self):
+        self.assertCountEqual(
+            self.filter(self.egg, self.milk),
+            ["Блинчики", "Омлет"],
+        )
+        self.assertEqual(self.filter(self.flour, self.egg), ["Блинчики"])
+        self.assertEqual(self.filter(self.flour, self.sugar), [])
+
+    def test_match_any(self):
+        self.assertCountEqual(
+            self.filter(self.flour, self.sugar, match="any"),
+            ["Блинчики", "Сироп"],
+        )
+
+    def test_decoded_rows_are_memoized(self):
+        table = IngredientRecipes._meta.db_table
+        for reads in (1, 0):
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(
+                    self.filter(self.flour, self.egg),
+                    ["Блинчики"],
+                )
+            queries = context.captured_queries
+            self.assertEqual(
+                sum(table in query["sql"] for query in queries),
+                reads,
+            )
+
+        self.create_recipe("Шарлотка", self.flour, self.egg)
+        self.assertCountEqual(
+            self.filter(self.flour, self.egg),
+            ["Блинчики", "Шарлотка"],
+        )
+
+    def test_invalid_match(self):
+        response = self.client.get(
+            "/api/recipes/",
+            {"ingredients": self.egg.pk, "match": "some"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_index_follows_recipe_updates(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        response = self.client.patch(
+            f"/api/recipes/{self.omelette.pk}/",
+            {
+                "ingredients": [
+                    {"id": self.egg.pk, "amount": 3},
+                    {"id": self.sugar.pk, "amount": 5},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.filter(self.milk), ["Блинчики"])
+        self.assertCountEqual(self.filter(self.sugar), ["Омлет", "Сироп"])
+
+        self.pancakes.delete()
+        self.assertEqual(self.filter(self.flour), [])
+
+    def test_index_rows_hold_one_bucket_each(self):
+        far = self.create_recipe(
+            "Шарлотка",
+            self.flour,
+            self.egg,
+            pk=self.pancakes.pk + 10_000,
+        )
+        rows = {
+            row.bucket: list(decode_ids(row.recipe_ids))
+            for row in IngredientRecipes.objects.filter(ingredient=self.egg)
+        }
+        self.assertEqual(
+            rows,
+            {
+                bucket_of(self.pancakes.pk): [
+                    self.pancakes.pk,
+                    self.omelette.pk,
+                ],
+                bucket_of(far.pk): [far.pk],
+            },
+        )
+        self.assertCountEqual(
+            self.filter(self.flour, self.egg),
+            ["Блинчики", "Шарлотка"],
+        )
+        self.assertCountEqual(
+            self.filter(self.milk, self.flour, match="any"),
+            ["Блинчики", "Омлет", "Шарлотка"],
+        )
+
+        far.delete()
+        self.assertEqual(
+            set(
+                IngredientRecipes.objects.filter(
+                    ingredient=self.egg
+                ).values_list("bucket", flat=True)
+            ),
+            {bucket_of(self.pancakes.pk)},
+        )
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from menu.models import Recipe
+from users.models import User
+
+
+class RecipeSearchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+        )
+        for name, text in (
+            ("Блинчики с мёдом", "Тонкие блины на молоке."),
+            ("Омлет", "Взбить яйца с молоком и обжарить."),
+            ("Медовик", "Коржи на меду с кремом."),
+            ("Салат", "Нарезать овощи."),
+        ):
+            Recipe.objects.create(
+                author=cls.author,
+                name=name,
+                text=text,
+                cooking_time=10,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def search(self, query):
+        response = self.client.get("/api/recipes/", {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.data["results"]]
+
+    def test_search_matches_name_and_text(self):
+        self.assertCountEqual(
+            self.search("молоко"),
+            ["Блинчики с мёдом", "Омлет"],
+        )
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search("блины")[0], "Блинчики с мёдом")
+
+    def test_index_follows_updates_and_deletes(self):
+        recipe = Recipe.objects.get(name="Салат")
+        recipe.text = "Заправить сметаной."
+        recipe.save()
+        self.assertEqual(self.search("сметана"), ["Салат"])
+        self.assertEqual(self.search("овощи"), [])
+
+        recipe.delete()
+        self.assertEqual(self.search("сметана"), [])
+
+    def test_empty_search_returns_everything(self):
+        self.assertEqual(len(self.search("  ")), 4)
+
+    def test_rebuild_search_index_command(self):
+        Recipe.objects.filter(name="Салат").update(text="Заправить сметаной.")
+        self.assertEqual(self.search("сметана"), [])
+
+        output = StringIO()
+        call_command("rebuild_search_index", stdout=output)
+        self.assertIn("Indexed 4 recipes", output.getvalue())
+        self.assertEqual(self.search("сметана"), ["Салат"])
+        self.assertEqual(self.search("овощи"), [])
@@ -0,0 +1,210 @@
+import csv
+import io
+import json
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.checks import check_pdf_font
+from api.exports import export_pdf
+from menu.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+)
+from users.models import User
+
+
+class ShoppingListTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com",
+            username="user",
+            password="user12345",
+        )
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+        )
+        cls.user_token = Token.objects.create(user=cls.user)
+        cls.author_token = Token.objects.create(user=cls.author)
+        cls.flour, cls.egg, cls.milk = (
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (("Мука", "г"), ("Яйцо", "шт"), ("Молоко", "мл"))
+        )
+        cls.pancakes = cls.create_recipe(
+            "Блинчики",
+            (cls.flour, 200),
+            (cls.egg, 2),
+            (cls.milk, 300),
+        )
+        cls.omelette = cls.create_recipe(
+            "Омлет",
+            (cls.egg, 3),
+            (cls.milk, 50),
+        )
+
+    @classmethod
+    def create_recipe(cls, name, *ingredients):
+        recipe = Recipe.objects.create(
+            author=cls.author,
+            name=name,
+            text="Описание",
+            cooking_time=10,
+        )
+        for ingredient, amount in ingredients:
+            RecipeIngredient.objects.create(
+                recipe=recipe,
+                ingredient=ingredient,
+                amount=amount,
+            )
+        return recipe
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {self.user_token.key}"
+        )
+
+    def shopping_list(self):
+        return {
+            item.ingredient.name: item.amount
+            for item in ShoppingListItem.objects.filter(
+                user=self.user
+            ).select_related("ingredient")
+        }
+
+    def download(self, export_format=None):
+        params = {"format": export_format} if export_format else {}
+        response = self.client.get(
+            "/api/recipes/download_shopping_cart/",
+            params,
+        )
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def test_cart_changes_update_totals(self):
+        self.client.post(f"/api/recipes/{self.pancakes.pk}/shopping_cart/")
+        self.client.post(f"/api/recipes/{self.omelette.pk}/shopping_cart/")
+        self.assertEqual(
+            self.shopping_list(),
+            {"Мука": 200, "Яйцо": 5, "Молоко": 350},
+        )
+        _, content = self.download()
+        self.assertEqual(
+            content.decode(),
+            "Молоко — 350 мл\nМука — 200 г\nЯйцо — 5 шт",
+        )
+
+        self.client.delete(f"/api/recipes/{self.pancakes.pk}/shopping_cart/")
+        self.assertEqual(self.shopping_list(), {"Яйцо": 3, "Молоко": 50})
+
+    def test_export_formats(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.omelette)
+
+        response, content = self.download("csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("shopping_list.csv", response["Content-Disposition"])
+        self.assertEqual(
+            list(csv.reader(io.StringIO(content.decode()))),
+            [
+                ["Ингредиент", "Количество", "Единица измерения"],
+                ["Молоко", "50", "мл"],
+                ["Яйцо", "3", "шт"],
+            ],
+        )
+
+        _, content = self.download("json")
+        self.assertEqual(
+            json.loads(content),
+            [
+                {"name": "Молоко", "amount": 50, "measurement_unit": "мл"},
+                {"name": "Яйцо", "amount": 3, "measurement_unit": "шт"},
+            ],
+        )
+
+        response, content = self.download("pdf")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(content.startswith(b"%PDF-"))
+        self.assertTrue(content.endswith(b"%%EOF\n"))
+        self.assertIn(b"/Count 1", content)
+
+        response = self.client.get(
+            "/api/recipes/download_shopping_cart/",
+            {"format": "xml"},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_empty_list_exports(self):
+        self.assertEqual(self.download()[1].decode(), "Список пуст")
+        self.assertEqual(json.loads(self.download("json")[1]), [])
+
+    def test_pdf_export_spans_pages(self):
+        rows = [(f"Ингредиент {index}", index, "г") for index in range(100)]
+        content = b"".join(export_pdf(iter(rows)))
+        self.assertIn(b"/Count 3", content)
+        offset = int(content.rsplit(b"startxref\n", 1)[1].split()[0])
+        self.assertTrue(content[offset:].startswith(b"xref"))
+
+    def test_pdf_export_text_is_searchable(self):
+        content = b"".join(export_pdf(iter([("Молоко", 50, "мл")])))
+        self.assertIn(b"/ToUnicode", content)
+        text = "Молоко — 50 мл".encode("utf-16-be").hex().upper()
+        self.assertIn(b"<%s> Tj" % text.encode(), content)
+
+    def test_missing_pdf_font_is_reported(self):
+        self.assertEqual(check_pdf_font(None), [])
+        with override_settings(SHOPPING_LIST_PDF_FONT="/missing/font.ttf"):
+            errors = check_pdf_font(None)
+            with self.assertRaises(OSError):
+                export_pdf(iter([]))
+        self.assertEqual([error.id for error in errors], ["api.E001"])
+
+    def test_recipe_edits_propagate_to_carts(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.omelette)
+        author_client = APIClient()
+        author_client.credentials(
+            HTTP_AUTHORIZATION=f"Token {self.author_token.key}"
+        )
+        response = author_client.patch(
+            f"/api/recipes/{self.omelette.pk}/",
+            {
+                "ingredients": [
+                    {"id": self.egg.pk, "amount": 4},
+                    {"id": self.flour.pk, "amount": 10},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.shopping_list(), {"Яйцо": 4, "Мука": 10})
+
+        line = self.omelette.recipe_ingredients.get(ingredient=self.egg)
+        line.amount = 6
+        line.save()
+        self.assertEqual(self.shopping_list(), {"Яйцо": 6, "Мука": 10})
+
+        self.omelette.delete()
+        self.assertEqual(self.shopping_list(), {})
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.pancakes)
+        ShoppingListItem.objects.filter(ingredient=self.egg).update(amount=99)
+        ShoppingListItem.objects.filter(ingredient=self.milk).delete()
+
+        out = io.StringIO()
+        call_command("reconcile_shopping_lists", "--dry-run", stdout=out)
+        self.assertIn("Found 2 drifted rows", out.getvalue())
+        self.assertEqual(self.shopping_list(), {"Мука": 200, "Яйцо": 99})
+
+        call_command("reconcile_shopping_lists", stdout=io.StringIO())
+        self.assertEqual(
+            self.shopping_list(),
+            {"Мука": 200, "Яйцо": 2, "Молоко": 300},
+        )
@@ -0,0 +1,134 @@
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from menu.models import Ingredient, Recipe, RecipeIngredient
+from menu.units import merge_shopping_rows, merge_units
+from users.models import User
+
+LARGE_CART_NAMES = 1500
+
+
+class MergeUnitsTestCase(TestCase):
+    def merge(self, *rows):
+        return list(merge_units(rows))
+
+    def test_compatible_units_are_merged(self):
+        self.assertEqual(
+            self.merge(("Мука", 500, "г"), ("Мука", 2, "кг")),
+            [("Мука", 2.5, "кг")],
+        )
+        self.assertEqual(
+            self.merge(("Молоко", 200, "мл"), ("Молоко", 1, "ст. л.")),
+            [("Молоко", 215, "мл")],
+        )
+        self.assertEqual(
+            self.merge(("Яйцо", 2, "шт"), ("Яйцо", 3, "шт.")),
+            [("Яйцо", 5, "шт.")],
+        )
+
+    def test_single_units_are_kept(self):
+        self.assertEqual(
+            self.merge(("Соль", 2, "ч. л."), ("Соль", 10, "г")),
+            [("Соль", 2, "ч. л."), ("Соль", 10, "г")],
+        )
+        self.assertEqual(
+            self.merge(("Перец", 1, "щепотка"), ("Перец", 2, "Щепотка")),
+            [("Перец", 3, "щепотка")],
+        )
+
+    def test_rows_are_grouped_by_key(self):
+        rows = [
+            ("мука", "Мука", 300, "г"),
+            ("мука", "Мука", 1, "кг"),
+            ("сахар", "Сахар", 50, "г"),
+        ]
+        self.assertEqual(
+            list(merge_shopping_rows(iter(rows))),
+            [("Мука", 1.3, "кг"), ("Сахар", 50, "г")],
+        )
+
+
+class LargeCartUnitsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com",
+            username="user",
+            password="user12345",
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        Ingredient.objects.bulk_create(
+            Ingredient(
+                name=f"Ингредиент {index:04}",
+                measurement_unit=unit,
+                search_name=f"ингредиент {index:04}",
+            )
+            for index in range(LARGE_CART_NAMES)
+            for unit in ("г", "кг")
+        )
+        cls.grams = Recipe.objects.create(
+            author=cls.user,
+            name="Граммы",
+            text="Описание",
+            cooking_time=10,
+        )
+        cls.kilograms = Recipe.objects.create(
+            author=cls.user,
+            name="Килограммы",
+            text="Описание",
+            cooking_time=10,
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=(
+                    cls.grams
+                    if ingredient.measurement_unit == "г"
+                    else cls.kilograms
+                ),
+                ingredient=ingredient,
+                amount=(
+                    250
+                    if ingredient.measurement_unit == "г"
+                    else 1
+                ),
+            )
+            for ingredient in Ingredient.objects.all()
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        for recipe in (self.grams, self.kilograms):
+            response = self.client.post(
+                f"/api/recipes/{recipe.pk}/shopping_cart/"
+            )
+            self.assertEqual(response.status_code, 201)
+
+    def test_thousands_of_lines_are_merged_in_one_pass(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                "/api/recipes/download_shopping_cart/",
+                {"format": "json"},
+            )
+            items = json.loads(b"".join(response.streaming_content))
+        self.assertLessEqual(len(context.captured_queries), 2)
+        self.assertEqual(len(items), LARGE_CART_NAMES)
+        self.assertEqual(
+            items[0],
+            {
+                "name": "Ингредиент 0000",
+                "amount": 1.25,
+                "measurement_unit": "кг",
+            },
+        )
+        self.assertTrue(
+            all(
+                (item["amount"], item["measurement_unit"]) == (1.25, "кг")
+                for item in items
+            )
+        )
@@ -0,0 +1,85 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.click_analytics import click_buffer
+from api.short_links import (
+    decode_short_code,
+    encode_recipe_id,
+    stored_codes,
+)
+from menu.models import Recipe, ShortLinkRecipe
+from users.models import User
+
+
+class ShortCodeTestCase(TestCase):
+    def test_codes_round_trip(self):
+        codes = {encode_recipe_id(recipe_id) for recipe_id in range(1, 2001)}
+        self.assertEqual(len(codes), 2000)
+        for recipe_id in (1, 42, 10**6, 2**40 - 1):
+            code = encode_recipe_id(recipe_id)
+            self.assertEqual(len(code), 7)
+            self.assertEqual(decode_short_code(code), recipe_id)
+
+    def test_foreign_codes_are_not_decoded(self):
+        for code in ("abc", "legacy01", "abc-def", "zzzzzzz"):
+            self.assertIsNone(decode_short_code(code))
+
+
+class ShortRedirectTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Омлет",
+            text="Описание",
+            cooking_time=10,
+        )
+
+    def setUp(self):
+        self.addCleanup(click_buffer.take)
+        stored_codes.clear()
+        self.client = APIClient()
+
+    def test_get_link_redirects_to_recipe_page(self):
+        response = self.client.get(f"/api/recipes/{self.recipe.pk}/get-link/")
+        self.assertEqual(response.status_code, 200)
+        short_url = response.data["short-link"]
+        self.assertTrue(
+            short_url.endswith(f"/s/{encode_recipe_id(self.recipe.pk)}")
+        )
+        with self.assertNumQueries(0):
+            response = self.client.get(short_url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], f"/recipes/{self.recipe.pk}")
+
+    def test_stored_codes_are_cached(self):
+        ShortLinkRecipe.objects.create(recipe=self.recipe, code="legacy01")
+        with self.assertNumQueries(1):
+            response = self.client.get("/s/legacy01/")
+        self.assertEqual(response["Location"], f"/recipes/{self.recipe.pk}")
+        with self.assertNumQueries(0):
+            self.client.get("/s/legacy01/")
+
+    def test_unknown_codes_are_cached(self):
+        for queries in (1, 0):
+            with self.assertNumQueries(queries):
+                response = self.client.get("/s/unknown01/")
+            self.assertEqual(response.status_code, 404)
+
+        ShortLinkRecipe.objects.create(recipe=self.recipe, code="unknown01")
+        self.assertEqual(self.client.get("/s/unknown01/").status_code, 302)
+
+    def test_codes_of_missing_recipes_are_not_redirected(self):
+        missing_id = self.recipe.pk + 1000
+        code = encode_recipe_id(missing_id)
+        self.assertEqual(decode_short_code(code), missing_id)
+        for queries in (1, 0):
+            with self.assertNumQueries(queries):
+                response = self.client.get(f"/s/{code}/")
+            self.assertEqual(response.status_code, 404)
+        self.assertNotIn(missing_id, click_buffer.take())
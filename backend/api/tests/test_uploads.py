@@ -0,0 +1,157 @@
+import json
+import tracemalloc
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework.test import APIRequestFactory
+
+from api.views import RecipeViewSet
+from menu.models import Recipe
+from users.models import Profile
+
+from .utils import AuthorTestCase, data_uri, png_bytes
+
+
+class MultipartUploadTestCase(AuthorTestCase):
+    def recipe_form(self, image, amount=2):
+        return {
+            "name": "Омлет",
+            "text": "Описание",
+            "cooking_time": "10",
+            "image": image,
+            "ingredients": json.dumps([{"id": self.egg.pk, "amount": amount}]),
+        }
+
+    def test_create_and_update_recipe(self):
+        response = self.client.post(
+            "/api/recipes/",
+            self.recipe_form(
+                SimpleUploadedFile("photo.png", png_bytes(20, 10))
+            ),
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["ingredients"][0]["amount"], 2)
+        recipe = Recipe.objects.get(pk=response.data["id"])
+        self.assertTrue(recipe.image.name.endswith(".png"))
+        self.assertNotIn("photo", recipe.image.name)
+        with recipe.image.open() as file, Image.open(file) as image:
+            self.assertEqual(image.size, (20, 10))
+
+        response = self.client.patch(
+            f"/api/recipes/{recipe.pk}/",
+            self.recipe_form(
+                SimpleUploadedFile("photo.png", png_bytes(30, 10)),
+                amount=5,
+            ),
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["ingredients"][0]["amount"], 5)
+
+    def test_rejects_invalid_uploads(self):
+        response = self.client.post(
+            "/api/recipes/",
+            self.recipe_form(SimpleUploadedFile("photo.png", b"not an image")),
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("image", response.data)
+
+        form = self.recipe_form(
+            SimpleUploadedFile("photo.png", png_bytes())
+        )
+        form["ingredients"] = "[{"
+        response = self.client.post("/api/recipes/", form, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ingredients", response.data)
+
+    def test_avatar(self):
+        response = self.client.put(
+            "/api/users/me/avatar/",
+            {"avatar": SimpleUploadedFile("me.png", png_bytes(8, 8))},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(Profile.objects.get(user=self.author).avatar)
+
+    def test_base64_still_accepted(self):
+        response = self.client.post(
+            "/api/recipes/",
+            {
+                **self.recipe_form(data_uri(png_bytes())),
+                "ingredients": [{"id": self.egg.pk, "amount": 2}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+
+class UploadMemoryBenchmark(AuthorTestCase):
+    """Peak Python memory of one recipe upload through each path.
+
+    The request body is built before measuring, so the peak covers only
+    parsing, decoding, validation and saving of a ~1.5 MB image; larger
+    base64 bodies hit DATA_UPLOAD_MAX_MEMORY_SIZE, file parts do not.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.image = png_bytes(700, 700, noise=True)
+
+    def peak_memory(self, request):
+        view = RecipeViewSet.as_view({"post": "create"})
+        tracemalloc.start()
+        try:
+            response = view(request)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            request.close()
+        self.assertEqual(response.status_code, 201, response.data)
+        return peak
+
+    def request(self, body, content_type):
+        factory = APIRequestFactory()
+        request = factory.generic(
+            "POST",
+            "/api/recipes/",
+            body,
+            content_type=content_type,
+        )
+        request.user = self.author
+        request._force_auth_user = self.author
+        return request
+
+    def test_multipart_uses_less_memory_than_base64(self):
+        fields = {
+            "name": "Омлет",
+            "text": "Описание",
+            "cooking_time": "10",
+        }
+        json_body = json.dumps(
+            {
+                **fields,
+                "image": data_uri(self.image),
+                "ingredients": [{"id": self.egg.pk, "amount": 2}],
+            }
+        ).encode()
+        multipart_body = encode_multipart(
+            BOUNDARY,
+            {
+                **fields,
+                "image": SimpleUploadedFile("photo.png", self.image),
+                "ingredients": json.dumps([{"id": self.egg.pk, "amount": 2}]),
+            },
+        )
+
+        base64_peak = self.peak_memory(
+            self.request(json_body, "application/json")
+        )
+        multipart_peak = self.peak_memory(
+            self.request(multipart_body, MULTIPART_CONTENT)
+        )
+        self.assertGreater(base64_peak, 2 * len(self.image))
+        self.assertLess(multipart_peak, len(self.image) / 4)
@@ -0,0 +1,126 @@
+import base64
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from menu.models import Ingredient
+from users.models import User
+
+
+def png_bytes(width=1, height=1, color="orange", mode="RGB", noise=False):
+    if noise:
+        image = Image.frombytes(
+            mode,
+            (width, height),
+            os.urandom(width * height * len(mode)),
+        )
+    else:
+        image = Image.new(mode, (width, height), color)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def png_base64(*args, **kwargs):
+    return base64.b64encode(png_bytes(*args, **kwargs)).decode()
+
+
+def data_uri(content):
+    return "data:image/png;base64," + base64.b64encode(content).decode()
+
+
+def png_data_uri(*args, **kwargs):
+    return data_uri(png_bytes(*args, **kwargs))
+
+
+@contextmanager
+def shared_cache():
+    """Switch to a file cache that other processes can open."""
+    location = tempfile.mkdtemp()
+    try:
+        with override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": (
+                        "django.core.cache.backends.filebased.FileBasedCache"
+                    ),
+                    "LOCATION": location,
+                }
+            }
+        ):
+            yield
+    finally:
+        shutil.rmtree(location, ignore_errors=True)
+
+
+def run_in_other_process(code):
+    """Run ``code`` in ``manage.py shell`` with the current file cache."""
+    subprocess.run(
+        [sys.executable, "manage.py", "shell", "-c", code],
+        cwd=settings.BASE_DIR,
+        env={
+            **os.environ,
+            "CACHE_DIR": settings.CACHES["default"]["LOCATION"],
+            "DJANGO_USE_SQLITE": "true",
+        },
+        check=True,
+        capture_output=True,
+    )
+
+
+class CatalogTestCase(TestCase):
+    """Test case with its own ingredient catalog snapshot file."""
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory, ignore_errors=True)
+        cls.enterClassContext(
+            override_settings(
+                INGREDIENT_CATALOG_PATH=Path(directory) / "catalog.bin"
+            )
+        )
+        super().setUpClass()
+
+
+class MediaTestCase(TestCase):
+    """Test case writing uploaded files to its own temporary MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+
+class AuthorTestCase(MediaTestCase):
+    """Media test case with an author, their token and an ingredient.
+
+    ``self.client`` is authenticated as the author.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="author12345",
+        )
+        cls.token = Token.objects.create(user=cls.author)
+        cls.egg = Ingredient.objects.create(name="Яйцо", measurement_unit="шт")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
@@ -0,0 +1,56 @@
+"""Version tokens kept in the cache for invalidation and validators.
+
+A token is the creation time in nanoseconds followed by a random suffix.
+Random suffixes mean a token that was evicted never comes back with a
+value some stale cache entry or ETag was derived from; the timestamp
+gives a ``Last-Modified`` that is never earlier than the change it
+stands for. Every bump is repeated after the surrounding transaction
+commits, discarding anything derived from not yet committed data.
+
+Tokens are only ever bumped by the process that made the change, so the
+cache has to be shared by every worker and management command
+(``REDIS_URL`` or ``CACHE_DIR``); with a per-process cache the others
+would keep answering 304 with stale validators.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import get_random_string
+
+CONTENT_VERSION_KEY = "content-version"
+VIEWER_VERSION_KEY = "viewer-version:{pk}"
+
+
+def new_version():
+    return f"{time.time_ns()}-{get_random_string(8)}"
+
+
+def version_timestamp(version):
+    return int(version.partition("-")[0]) // 1_000_000_000
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = new_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(key):
+    cache.set(key, new_version(), timeout=None)
+    transaction.on_commit(
+        lambda: cache.set(key, new_version(), timeout=None)
+    )
+
+
+def bump_content_version():
+    """Invalidate everything derived from recipes, authors or ingredients."""
+    bump_version(CONTENT_VERSION_KEY)
+
+
+def bump_viewer_version(user_id):
+    """Invalidate what depends on a user's favorites, cart or follows."""
+    bump_version(VIEWER_VERSION_KEY.format(pk=user_id))
@@ -1,14 +1,21 @@
-import io
+from functools import partial
 
-from django.db.models import F, Sum
-from django.http import FileResponse, Http404, HttpResponseRedirect
+from django.db.models import Exists, F, OuterRef, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.utils.crypto import get_random_string
+from django.utils.http import content_disposition_header
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status, viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import (
     AllowAny,
     IsAuthenticated,
@@ -16,19 +23,43 @@ from rest_framework.permissions import (
 )
 from rest_framework.response import Response
 
+from core.constants import (
+    INGREDIENT_FUZZY_SEARCH_LIMIT,
+    INGREDIENT_FUZZY_SEARCH_THRESHOLD,
+    RECIPE_FRONTEND_PATH,
+    SHOPPING_LIST_EXPORT_CHUNK_SIZE,
+)
 from menu.models import (
     Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
-    ShortLinkRecipe,
+    ShoppingListItem,
 )
+from menu.feed import latest_keys
+from menu.units import merge_shopping_rows
 from users.models import Profile, Subscription, User
 
+from .authentication import CachedTokenAuthentication
+from .catalog import get_ingredient_catalog
+from .click_analytics import click_buffer
+from .conditional import not_modified, set_validators, viewer_validators
 from .filters import RecipeFilter
-from .pagination import LimitPageNumberPagination
+from .image_variants import delete_variants
+from .pagination import (
+    FeedPagination,
+    LimitCursorPagination,
+    LimitPageNumberPagination,
+)
 from .permissions import IsAuthorOrAdmin
+from .recipe_cache import get_recipe_payload
+from .renderers import (
+    CSVShoppingListRenderer,
+    JSONShoppingListRenderer,
+    PDFShoppingListRenderer,
+    TextShoppingListRenderer,
+)
 from .serializers import (
     FavoriteActionSerializer,
     IngredientSerializer,
@@ -40,7 +71,42 @@ from .serializers import (
     SubscriptionActionSerializer,
     UserSerializer,
     UserWithRecipesSerializer,
+    recipes_limit,
 )
+from .short_links import resolve_short_code, short_code_for
+from .versions import CONTENT_VERSION_KEY, get_version, version_timestamp
+
+
+VIEWER_VARY = ("Accept", "Authorization")
+
+
+def viewer_subscriptions_prefetch(user, lookup="subscribers"):
+    return Prefetch(
+        lookup,
+        queryset=Subscription.objects.filter(user=user),
+        to_attr="viewer_subscriptions",
+    )
+
+
+def recipe_previews_prefetch(limit=None):
+    """Latest recipes of every author on a page in a single query.
+
+    ``ROW_NUMBER() OVER (PARTITION BY author_id)`` numbers each author's
+    recipes newest first, so the limit is applied per author inside the
+    database instead of slicing one queryset per author.
+    """
+    queryset = Recipe.objects.only(
+        "id", "author_id", "name", "image", "cooking_time"
+    )
+    if limit is not None:
+        queryset = queryset.annotate(
+            preview_position=Window(
+                RowNumber(),
+                partition_by=F("author_id"),
+                order_by=(F("created_at").desc(), F("id").desc()),
+            )
+        ).filter(preview_position__lte=limit)
+    return Prefetch("recipes", queryset=queryset, to_attr="recipe_previews")
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -52,24 +118,92 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
         query = self.request.query_params.get("name")
         queryset = Ingredient.objects.all()
         if query:
-            queryset = queryset.filter(name__istartswith=query)
+            queryset = queryset.search_prefix(query)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        catalog = get_ingredient_catalog()
+        query = request.query_params.get("name") or ""
+        fuzzy = request.query_params.get("fuzzy") in ("1", "true")
+        if query and fuzzy:
+            search = partial(
+                catalog.search_fuzzy,
+                query,
+                INGREDIENT_FUZZY_SEARCH_LIMIT,
+                INGREDIENT_FUZZY_SEARCH_THRESHOLD,
+            )
+        else:
+            search = partial(catalog.search_prefix, query)
+        return self._catalog_response(
+            request,
+            catalog,
+            lambda: catalog.render(search()),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        catalog = get_ingredient_catalog()
+        try:
+            position = catalog.find(int(kwargs["pk"]))
+        except (TypeError, ValueError):
+            position = None
+        if position is None:
+            raise Http404
+        return self._catalog_response(
+            request,
+            catalog,
+            lambda: catalog.render_one(position),
+        )
+
+    @staticmethod
+    def _catalog_response(request, catalog, render):
+        validators = (catalog.etag, catalog.last_modified)
+        response = not_modified(request, *validators)
+        if response is None:
+            response = set_validators(
+                HttpResponse(render(), content_type="application/json"),
+                *validators,
+            )
+        return response
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.select_related("author").prefetch_related(
-        "ingredients"
+    queryset = Recipe.objects.select_related(
+        "author",
+        "author__profiles",
+    ).prefetch_related(
+        Prefetch(
+            "recipe_ingredients",
+            queryset=RecipeIngredient.objects.select_related("ingredient"),
+        )
     )
     filterset_class = RecipeFilter
-    pagination_class = LimitPageNumberPagination
-    authentication_classes = [TokenAuthentication]
+    pagination_class = LimitCursorPagination
+    authentication_classes = [CachedTokenAuthentication]
+    parser_classes = [JSONParser, MultiPartParser]
     filter_backends = [DjangoFilterBackend]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        return queryset.prefetch_related(
+            viewer_subscriptions_prefetch(user, "author__subscribers")
+        ).annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+
     def get_permissions(self):
         if self.action in ("list", "retrieve", "get_link"):
             return [AllowAny()]
         if self.action in (
             "create",
+            "feed",
             "favorite",
             "shopping_cart",
             "download_shopping_cart",
@@ -78,18 +212,130 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return [IsAuthorOrAdmin()]
 
     def get_serializer_class(self):
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "feed"):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def list(self, request, *args, **kwargs):
+        content_version = get_version(CONTENT_VERSION_KEY)
+        validators = viewer_validators(
+            request,
+            ["recipes", request.get_full_path(), content_version],
+            [version_timestamp(content_version)],
+        )
+        response = not_modified(request, *validators, VIEWER_VARY)
+        if response is not None:
+            return response
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            set_validators(response, *validators, VIEWER_VARY)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe_id = self._parse_recipe_id(kwargs[self.lookup_field])
+        payload = get_recipe_payload(
+            recipe_id,
+            f"{request.scheme}://{request.get_host()}",
+            partial(self._build_recipe_payload, recipe_id),
+        )
+        validators = viewer_validators(
+            request,
+            [
+                "recipe",
+                recipe_id,
+                payload.recipe_version,
+                payload.author_version,
+            ],
+            [
+                int(payload.updated_at.timestamp()),
+                version_timestamp(payload.author_version),
+            ],
+        )
+        response = not_modified(request, *validators, VIEWER_VARY)
+        if response is not None:
+            return response
+        flags = self._viewer_flags(recipe_id, payload.author_id)
+        if flags is None:
+            raise Http404
+        is_favorited, is_in_shopping_cart, is_subscribed = flags
+        data = {
+            **payload.data,
+            "author": {
+                **payload.data["author"],
+                "is_subscribed": is_subscribed,
+            },
+            "is_favorited": is_favorited,
+            "is_in_shopping_cart": is_in_shopping_cart,
+        }
+        return set_validators(Response(data), *validators, VIEWER_VARY)
+
+    @staticmethod
+    def _parse_recipe_id(value):
+        try:
+            return int(value)
+        except ValueError:
+            raise Http404
+
+    def _build_recipe_payload(self, recipe_id):
+        recipe = get_object_or_404(self.queryset, pk=recipe_id)
+        recipe.is_favorited = recipe.is_in_shopping_cart = False
+        recipe.author.viewer_subscriptions = []
+        data = RecipeReadSerializer(
+            recipe,
+            context=self.get_serializer_context(),
+        ).data
+        return recipe.author_id, recipe.updated_at, data
+
+    def _viewer_flags(self, recipe_id, author_id):
+        user = self.request.user
+        if not user.is_authenticated:
+            return False, False, False
+        return (
+            Recipe.objects.filter(pk=recipe_id)
+            .values_list(
+                Exists(
+                    Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+                ),
+                Exists(
+                    ShoppingCart.objects.filter(
+                        user=user,
+                        recipe=OuterRef("pk"),
+                    )
+                ),
+                Exists(
+                    Subscription.objects.filter(user=user, author=author_id)
+                ),
+            )
+            .first()
+        )
+
     @action(
         detail=False,
         methods=["get"],
         permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            TextShoppingListRenderer,
+            CSVShoppingListRenderer,
+            JSONShoppingListRenderer,
+            PDFShoppingListRenderer,
+        ],
     )
     def download_shopping_cart(self, request):
-        lines = self._build_shopping_lines(request.user)
-        return self._file_response(lines, "shopping_list.txt")
+        renderer = request.accepted_renderer
+        if "format" not in request.query_params:
+            renderer = TextShoppingListRenderer()
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f"; charset={renderer.charset}"
+        response = StreamingHttpResponse(
+            renderer.exporter(self._shopping_list_rows(request.user)),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True,
+            f"shopping_list.{renderer.format}",
+        )
+        return response
 
     @staticmethod
     def _handle_post_action(request, recipe, serializer_class):
@@ -118,34 +364,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def _aggregate_shopping_items(self, user):
-        base_queryset = RecipeIngredient.objects.filter(
-            recipe__shopping_carts__user=user
-        )
-        return (
-            base_queryset.values(
-                name=F("ingredient__name"),
-                unit=F("ingredient__measurement_unit"),
+    @staticmethod
+    def _shopping_list_rows(user):
+        rows = (
+            ShoppingListItem.objects.filter(user=user)
+            .values_list(
+                "ingredient__search_name",
+                "ingredient__name",
+                "amount",
+                "ingredient__measurement_unit",
             )
-            .annotate(total=Sum("amount"))
-            .order_by("name")
+            .order_by(
+                "ingredient__search_name",
+                "ingredient__name",
+                "ingredient__measurement_unit",
+            )
+            .iterator(chunk_size=SHOPPING_LIST_EXPORT_CHUNK_SIZE)
         )
-
-    def _build_shopping_lines(self, user):
-        items = self._aggregate_shopping_items(user)
-        lines = []
-        for item in items:
-            line = f"{item['name']} — {item['total']} {item['unit']}"
-            lines.append(line)
-        return lines or ["Список пуст"]
-
-    @staticmethod
-    def _file_response(lines, filename):
-        content = "\n".join(lines)
-        buffer = io.BytesIO(content.encode("utf-8"))
-        response = FileResponse(buffer, as_attachment=True, filename=filename)
-        response["Content-Type"] = "text/plain; charset=utf-8"
-        return response
+        return merge_shopping_rows(rows)
 
     @action(
         detail=True,
@@ -190,6 +426,21 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        recipes = self.paginator.paginate_keys(
+            partial(latest_keys, request.user.pk),
+            self.get_queryset(),
+            request,
+        )
+        serializer = self.get_serializer(recipes, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         methods=["get"],
@@ -197,13 +448,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path="get-link",
     )
     def get_link(self, request, pk=None):
-        recipe = self.get_object()
-        link, _ = ShortLinkRecipe.objects.get_or_create(
-            recipe=recipe,
-            defaults={"code": get_random_string(8)},
-        )
+        code = short_code_for(self._parse_recipe_id(pk))
+        if code is None:
+            raise Http404
         short_url = request.build_absolute_uri(
-            reverse("short-redirect", kwargs={"code": link.code})
+            reverse("short-redirect", kwargs={"code": code})
         )
         return Response({"short-link": short_url})
 
@@ -214,6 +463,15 @@ class UserViewSet(DjoserUserViewSet):
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related("profiles")
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.prefetch_related(
+                viewer_subscriptions_prefetch(user)
+            )
+        return queryset
+
     def get_permissions(self):
         if self.action in ("me", "subscriptions", "subscribe", "avatar"):
             return [IsAuthenticated()]
@@ -230,9 +488,15 @@ class UserViewSet(DjoserUserViewSet):
         permission_classes=[IsAuthenticated],
     )
     def subscriptions(self, request, *args, **kwargs):
-        authors = User.objects.filter(
-            subscribers__user=request.user,
-        ).order_by("email")
+        authors = (
+            User.objects.filter(subscribers__user=request.user)
+            .select_related("profiles")
+            .prefetch_related(
+                recipe_previews_prefetch(recipes_limit(request)),
+                viewer_subscriptions_prefetch(request.user),
+            )
+            .order_by("email")
+        )
         page = self.paginate_queryset(authors)
         serializer = self.get_serializer(page or authors, many=True)
         if page is not None:
@@ -273,13 +537,17 @@ class UserViewSet(DjoserUserViewSet):
         detail=False,
         methods=["put", "delete"],
         permission_classes=[IsAuthenticated],
+        parser_classes=[JSONParser, MultiPartParser],
         url_path="me/avatar",
     )
     def avatar(self, request, *args, **kwargs):
         profile, _ = Profile.objects.get_or_create(user=request.user)
         if request.method.lower() == "delete":
             if profile.avatar:
-                profile.avatar.delete(save=True)
+                delete_variants(Profile, profile.avatar_variants)
+                profile.avatar = None
+                profile.avatar_variants = {}
+                profile.save(update_fields=["avatar", "avatar_variants"])
             return Response(status=status.HTTP_204_NO_CONTENT)
         serializer = SetAvatarSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -290,14 +558,8 @@ class UserViewSet(DjoserUserViewSet):
 
 
 def short_redirect(request, code):
-    try:
-        queryset = ShortLinkRecipe.objects.select_related("recipe")
-        short_link = queryset.get(code=code)
-    except ShortLinkRecipe.DoesNotExist as exc:
-        raise Http404 from exc
-    return HttpResponseRedirect(
-        reverse(
-            "recipes-detail",
-            kwargs={"pk": short_link.recipe.id},
-        )
-    )
\ No newline at end of file
+    recipe_id = resolve_short_code(code)
+    if recipe_id is None:
+        raise Http404
+    click_buffer.record(recipe_id)
+    return HttpResponseRedirect(RECIPE_FRONTEND_PATH.format(pk=recipe_id))
@@ -1,13 +1,36 @@
 DEFAULT_ALLOWED_HOSTS = "localhost,127.0.0.1"
 DEFAULT_CSRF_TRUSTED_ORIGINS = "http://localhost,http://127.0.0.1"
 DEFAULT_PAGE_SIZE = 6
+COUNT_CACHE_TIMEOUT = 30
+APPROXIMATE_COUNT_THRESHOLD = 100_000
+SHOPPING_LIST_EXPORT_CHUNK_SIZE = 1000
+RECIPE_CACHE_TIMEOUT = 60 * 60
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+AUTH_TOKEN_CACHE_SIZE = 10_000
+FEED_FAN_OUT_BATCH_SIZE = 1000
+# Thumbnail, card and full-size widths of image variants, px.
+IMAGE_VARIANT_WIDTHS = (160, 480, 1280)
+IMAGE_VARIANT_QUALITY = 80
+# Directory of content-addressed media files under MEDIA_ROOT.
+MEDIA_BLOB_DIR = "blobs"
+IMPORT_IMAGES_WORKERS = 8
+LOAD_DATA_BATCH_SIZE = 1000
+JSON_READ_CHUNK_SIZE = 1 << 20
+# Recipe ids per ingredient index row: id >> bits is the row's bucket.
+INGREDIENT_INDEX_BUCKET_BITS = 12
+# Ingredients whose decoded index rows a worker keeps in memory.
+INGREDIENT_POSTINGS_CACHE_SIZE = 1000
 DEFAULT_SQLITE_DB_NAME = "db.sqlite3"
 
 INGREDIENT_NAME_MAX_LENGTH = 128
 INGREDIENT_UNIT_MAX_LENGTH = 64
+INGREDIENT_FUZZY_SEARCH_LIMIT = 20
+INGREDIENT_FUZZY_SEARCH_THRESHOLD = 0.3
 
 RECIPE_NAME_MAX_LENGTH = 256
 SHORT_LINK_CODE_MAX_LENGTH = 16
+SHORT_LINK_CACHE_SIZE = 10_000
+RECIPE_FRONTEND_PATH = "/recipes/{pk}"
 
 COOKING_TIME_MIN = 1
 COOKING_TIME_MAX = 1440
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "django_filters",
@@ -100,6 +101,35 @@ else:
         }
     }
 
+# Version tokens, recipe payloads and cached counts must be seen by every
+# gunicorn worker and management command: Redis when REDIS_URL is set, a
+# directory shared by the processes of one host when CACHE_DIR is set.
+# The per-process fallback only suits runserver and tests (see api.checks).
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_DIR = os.getenv("CACHE_DIR")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "foodgram",
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_DIR,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "foodgram",
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"
@@ -119,13 +149,48 @@ STATIC_ROOT = BASE_DIR / "static"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Multipart uploads are streamed to a temporary file, never held in memory.
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+INGREDIENT_CATALOG_PATH = Path(
+    os.getenv(
+        "INGREDIENT_CATALOG_PATH",
+        BASE_DIR / "var" / "ingredient_catalog.bin",
+    )
+)
+
+SHORT_LINK_CLICKS_FLUSH_INTERVAL = float(
+    os.getenv("SHORT_LINK_CLICKS_FLUSH_INTERVAL", 10)
+)
+SHORT_LINK_CLICKS_FLUSH_THRESHOLD = int(
+    os.getenv("SHORT_LINK_CLICKS_FLUSH_THRESHOLD", 1000)
+)
+
+FEED_FAN_OUT_MAX_FOLLOWERS = int(
+    os.getenv("FEED_FAN_OUT_MAX_FOLLOWERS", 10_000)
+)
+FEED_FAN_OUT_IN_BACKGROUND = (
+    os.getenv("FEED_FAN_OUT_IN_BACKGROUND", "true").lower() == "true"
+)
+
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", 2))
+IMAGE_VARIANTS_IN_BACKGROUND = (
+    os.getenv("IMAGE_VARIANTS_IN_BACKGROUND", "true").lower() == "true"
+)
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    "SHOPPING_LIST_PDF_FONT",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
 
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": DEFAULT_PAGE_SIZE,
@@ -3,9 +3,11 @@ from django.contrib import admin
 from .models import (
     Favorite,
     Ingredient,
+    MediaFile,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShortLinkClicks,
     ShortLinkRecipe,
 )
 
@@ -25,13 +27,24 @@ class RecipeIngredientInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "author", "favorites_count")
+    list_display = (
+        "id",
+        "name",
+        "author",
+        "favorites_count",
+        "in_carts_count",
+        "clicks",
+    )
+    list_select_related = ("author", "short_link_clicks")
     search_fields = ("name", "author__username", "author__email")
     inlines = [RecipeIngredientInline]
 
-    @admin.display(description="В избранном (шт.)")
-    def favorites_count(self, obj):
-        return obj.favorites.count()
+    @admin.display(description="Переходов по ссылке")
+    def clicks(self, obj):
+        try:
+            return obj.short_link_clicks.clicks
+        except ShortLinkClicks.DoesNotExist:
+            return 0
 
 
 @admin.register(Favorite)
@@ -49,3 +62,18 @@ class ShoppingCartAdmin(admin.ModelAdmin):
 
 
 admin.site.register(ShortLinkRecipe)
+
+
+@admin.register(ShortLinkClicks)
+class ShortLinkClicksAdmin(admin.ModelAdmin):
+    list_display = ("recipe", "clicks", "updated_at")
+    list_select_related = ("recipe",)
+    search_fields = ("recipe__name",)
+    readonly_fields = ("recipe", "clicks", "updated_at")
+
+
+@admin.register(MediaFile)
+class MediaFileAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "references", "created_at")
+    search_fields = ("name",)
+    readonly_fields = ("name", "size", "references", "created_at")
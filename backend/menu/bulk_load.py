@@ -0,0 +1,332 @@
+"""Batched loading of large recipe dumps for ``load_data``.
+
+``iter_json_array`` yields the items of a top-level JSON array while
+reading the file piece by piece, so a dump never has to fit in memory.
+``RecipeLoader`` writes a chunk of new recipes with a number of queries
+that does not depend on its size: authors and existing recipes are looked
+up for the whole chunk, rows go in with ``bulk_create``, and the search
+index, ingredient index, shopping lists, counters and feeds that
+``menu.signals`` keeps up to date for single saves are updated once per
+chunk. The old ingredients of reloaded recipes are deleted without
+signals, and the index and shopping lists get the difference between the
+old and new amounts. Images are written before the chunk commits, so
+files whose references roll back with a failed chunk are removed again.
+Cache versions and image variants live in ``api`` and are handled by the
+command.
+"""
+import base64
+import binascii
+import json
+import re
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from core.constants import JSON_READ_CHUNK_SIZE
+
+from . import counters, feed, ingredient_index, shopping_list
+from .models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    normalize_search_name,
+)
+from .search import index_recipes
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def _get(obj, *keys, default=None):
+    for key in keys:
+        if key in obj:
+            return obj[key]
+    return default
+
+
+def iter_json_array(file, chunk_size=JSON_READ_CHUNK_SIZE):
+    """Yield the items of the JSON array in a text file one by one."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    position = 1
+    eof = False
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            if position == len(buffer):
+                raise json.JSONDecodeError("No item", buffer, position)
+            item, end = decoder.raw_decode(buffer, position)
+            # A number or literal at the end of the buffer may go on.
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            more = file.read(chunk_size)
+            eof = not more
+            buffer = buffer[position:] + more
+            position = 0
+            continue
+        yield item
+        position = end
+
+
+def load_ingredients(items, batch_size):
+    """Insert new ingredients in batches; returns the number of items."""
+    total = 0
+    batch = []
+    for item in items:
+        total += 1
+        name = _get(item, "name", "title")
+        unit = _get(item, "measurement_unit", "dimension", default="")
+        if name and unit:
+            batch.append(
+                Ingredient(
+                    name=name,
+                    measurement_unit=unit,
+                    search_name=normalize_search_name(name),
+                )
+            )
+        if len(batch) == batch_size:
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+    return total
+
+
+class LoadedChunk(NamedTuple):
+    created: list
+    updated: list
+    imaged: list
+    author_ids: set
+    rows: int
+    skipped: int
+
+
+class RecipeLoader:
+    """Load chunks of ``recipes.json`` items.
+
+    A recipe is identified by author and name: an existing one keeps its
+    fields, gets the image if it has none, and has its ingredients
+    replaced.
+    """
+
+    def __init__(self, batch_size, default_author="demo1"):
+        self.batch_size = batch_size
+        self.default_author = default_author
+        self.storage = Recipe._meta.get_field("image").storage
+        self.author_ids = {}
+        self.ingredient_ids = set()
+        self.ingredient_by_name = {}
+        for pk, name in Ingredient.objects.order_by("name", "pk").values_list(
+            "pk",
+            "name",
+        ):
+            self.ingredient_ids.add(pk)
+            self.ingredient_by_name.setdefault(name, pk)
+
+    def _resolve_authors(self, items):
+        missing = {
+            _get(item, "author_username", default=self.default_author)
+            for item in items
+        } - self.author_ids.keys()
+        if not missing:
+            return
+        self.author_ids.update(dict.fromkeys(missing))
+        self.author_ids.update(
+            get_user_model()
+            .objects.filter(username__in=missing)
+            .values_list("username", "pk")
+        )
+
+    def _ingredient_id(self, data):
+        name = _get(data, "name")
+        if name:
+            return self.ingredient_by_name.get(name)
+        ingredient_id = _get(data, "id")
+        if ingredient_id in self.ingredient_ids:
+            return ingredient_id
+        return None
+
+    def _parse(self, item):
+        author_id = self.author_ids.get(
+            _get(item, "author_username", default=self.default_author)
+        )
+        try:
+            cooking_time = int(_get(item, "cooking_time", "time", default=10))
+        except (TypeError, ValueError):
+            return None
+        if author_id is None:
+            return None
+        lines = {}
+        for data in _get(item, "ingredients", default=[]):
+            ingredient_id = self._ingredient_id(data)
+            try:
+                amount = int(_get(data, "amount", default=1))
+            except (TypeError, ValueError):
+                continue
+            if ingredient_id is not None:
+                lines[ingredient_id] = amount
+        key = (author_id, _get(item, "name", "title", default="Рецепт"))
+        fields = {
+            "text": _get(item, "text", "description", default=""),
+            "cooking_time": cooking_time,
+        }
+        return key, fields, _get(item, "image_base64"), lines
+
+    def _save_image(self, encoded):
+        if not encoded:
+            return None
+        try:
+            content = base64.b64decode(encoded)
+        except (TypeError, ValueError, binascii.Error):
+            return None
+        name = self.storage.save("recipes/img.png", ContentFile(content))
+        self.saved_images.append(name)
+        return name
+
+    def _existing(self, keys):
+        rows = Recipe.objects.filter(
+            author_id__in={author_id for author_id, _ in keys},
+            name__in={name for _, name in keys},
+        ).values_list("author_id", "name", "pk", "image")
+        existing = {}
+        for author_id, name, pk, image in rows:
+            existing.setdefault((author_id, name), (pk, image))
+        return existing
+
+    def load(self, items):
+        self.saved_images = []
+        try:
+            return self._load(items)
+        except BaseException:
+            # The references went with the rolled back chunk.
+            self.storage.discard_unreferenced(self.saved_images)
+            raise
+
+    @transaction.atomic
+    def _load(self, items):
+        self._resolve_authors(items)
+        entries = {}
+        skipped = 0
+        for item in items:
+            entry = self._parse(item)
+            if entry is None:
+                skipped += 1
+                continue
+            key, fields, image, lines = entry
+            if key in entries:
+                fields, image = entries[key][0], entries[key][1] or image
+            entries[key] = (fields, image, lines)
+        existing = self._existing(entries)
+        now = timezone.now()
+
+        created = []
+        new_keys = []
+        imaged = []
+        for key, (fields, image, _) in entries.items():
+            if key in existing:
+                pk, current = existing[key]
+                if not current and image:
+                    name = self._save_image(image)
+                    if name:
+                        imaged.append(
+                            Recipe(pk=pk, image=name, updated_at=now)
+                        )
+                continue
+            author_id, name = key
+            recipe = Recipe(author_id=author_id, name=name, **fields)
+            recipe.image = self._save_image(image)
+            created.append(recipe)
+            new_keys.append(key)
+        Recipe.objects.bulk_create(created, batch_size=self.batch_size)
+        Recipe.objects.bulk_update(
+            imaged,
+            ["image", "updated_at"],
+            batch_size=self.batch_size,
+        )
+        recipe_ids = {
+            key: recipe.pk for key, recipe in zip(new_keys, created)
+        }
+        updated = [pk for pk, _ in existing.values()]
+        recipe_ids.update((key, pk) for key, (pk, _) in existing.items())
+
+        previous = defaultdict(dict)
+        old_lines = RecipeIngredient.objects.filter(recipe_id__in=updated)
+        for recipe_id, ingredient_id, amount in old_lines.values_list(
+            "recipe_id",
+            "ingredient_id",
+            "amount",
+        ):
+            previous[recipe_id][ingredient_id] = amount
+        old_lines._raw_delete(old_lines.db)
+        lines = [
+            RecipeIngredient(
+                recipe_id=recipe_ids[key],
+                ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for key, (_, _, recipe_lines) in entries.items()
+            for ingredient_id, amount in recipe_lines.items()
+        ]
+        RecipeIngredient.objects.bulk_create(
+            lines,
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+
+        self._update_indexes(created, updated, previous, lines, now)
+        return LoadedChunk(
+            created=[recipe.pk for recipe in created],
+            updated=updated,
+            imaged=[
+                recipe.pk for recipe in created + imaged if recipe.image
+            ],
+            author_ids={recipe.author_id for recipe in created},
+            rows=len(created) + len(imaged) + len(lines),
+            skipped=skipped,
+        )
+
+    def _update_indexes(self, created, updated, previous, lines, now):
+        current = defaultdict(dict)
+        for line in lines:
+            current[line.recipe_id][line.ingredient_id] = line.amount
+        added = defaultdict(list)
+        removed = defaultdict(list)
+        for recipe_id in current.keys() | previous.keys():
+            new, old = current[recipe_id], previous[recipe_id]
+            for ingredient_id in new.keys() - old.keys():
+                added[ingredient_id].append(recipe_id)
+            for ingredient_id in old.keys() - new.keys():
+                removed[ingredient_id].append(recipe_id)
+        ingredient_index.remove_recipes(removed)
+        ingredient_index.add_recipes(added)
+
+        index_recipes(
+            Recipe.objects.db,
+            [recipe.pk for recipe in created],
+        )
+        Recipe.objects.filter(pk__in=updated).update(updated_at=now)
+        deltas = {}
+        for recipe_id in updated:
+            new, old = current[recipe_id], previous[recipe_id]
+            deltas[recipe_id] = {
+                ingredient_id: (
+                    new.get(ingredient_id, 0) - old.get(ingredient_id, 0)
+                )
+                for ingredient_id in new.keys() | old.keys()
+            }
+        shopping_list.apply_recipe_changes(deltas)
+
+        author_ids = {recipe.author_id for recipe in created}
+        if author_ids:
+            counters.recount({get_user_model(): author_ids})
+        feed.fan_out_recipes([recipe.pk for recipe in created])
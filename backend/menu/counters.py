@@ -0,0 +1,75 @@
+"""Stored popularity counters of recipes and users.
+
+Each counter is kept in step with its rows by single-row ``F()`` updates
+from ``menu.signals``. Queryset and cascade deletes send the same
+signals, so they are covered as well; ``bulk_create`` and raw SQL are
+not, and paths that use them finish with ``recount``.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from users.models import Subscription, User
+
+from .models import Favorite, Recipe, ShoppingCart
+
+# (counted model, lookup to the owner, owner model, counter field)
+COUNTERS = (
+    (Favorite, "recipe", Recipe, "favorites_count"),
+    (ShoppingCart, "recipe", Recipe, "in_carts_count"),
+    (Recipe, "author", User, "recipes_count"),
+    (Subscription, "author", User, "subscribers_count"),
+)
+COUNTERS_BY_SENDER = {
+    source: (link, owner, field) for source, link, owner, field in COUNTERS
+}
+
+
+def adjust(sender, instance, delta):
+    link, owner, field = COUNTERS_BY_SENDER[sender]
+    rows = owner.objects.filter(pk=getattr(instance, f"{link}_id"))
+    if delta < 0:
+        # Never drive a drifted counter below zero.
+        rows = rows.filter(**{f"{field}__gte": -delta})
+    rows.update(**{field: F(field) + delta})
+
+
+def expected_count(source, link):
+    return Coalesce(
+        Subquery(
+            source.objects.filter(**{link: OuterRef("pk")})
+            .order_by()
+            .values(link)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def drift():
+    """Yield ``(field, pk, stored, expected)`` for every wrong counter."""
+    for source, link, owner, field in COUNTERS:
+        rows = (
+            owner.objects.annotate(expected=expected_count(source, link))
+            .exclude(**{field: F("expected")})
+            .order_by("pk")
+            .values_list("pk", field, "expected")
+        )
+        for pk, stored, expected in rows.iterator():
+            yield field, pk, stored, expected
+
+
+def recount(owner_ids=None):
+    """Recompute the counters, optionally only of the given owners.
+
+    ``owner_ids`` maps an owner model to the primary keys to fix.
+    """
+    with transaction.atomic():
+        for source, link, owner, field in COUNTERS:
+            rows = owner.objects.all()
+            if owner_ids is not None:
+                if not owner_ids.get(owner):
+                    continue
+                rows = rows.filter(pk__in=owner_ids[owner])
+            rows.update(**{field: expected_count(source, link)})
@@ -0,0 +1,183 @@
+"""Subscription feeds: fan-out on write with a fan-out-on-read fallback.
+
+A new recipe is copied into ``FeedEntry`` rows of every subscriber of
+its author once the transaction commits, in a background thread, so
+publishing does not wait for followers. Subscribing backfills the
+author's recipes and unsubscribing trims them.
+
+Authors followed by more than ``FEED_FAN_OUT_MAX_FOLLOWERS`` users are
+neither fanned out nor backfilled. Their recipes are read from
+``Recipe`` directly and merged with the timeline, and any timeline rows
+they already have are skipped, so an author may cross the limit in
+either direction. Recipes published and followers gained while an author
+was above the limit reach timelines only through ``rebuild_feeds``.
+"""
+import heapq
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core.constants import FEED_FAN_OUT_BATCH_SIZE
+from users.models import Subscription
+
+from .models import FeedEntry, Recipe
+
+logger = logging.getLogger(__name__)
+
+
+def fan_out(recipe_id):
+    """Add a published recipe to the timelines of its author's followers."""
+    fan_out_recipes([recipe_id])
+
+
+def fan_out_recipes(recipe_ids):
+    """``fan_out`` for many recipes, one follower query for all authors."""
+    recipes = defaultdict(list)
+    for recipe_id, author_id, created_at in Recipe.objects.filter(
+        pk__in=recipe_ids,
+        author__subscribers_count__lte=settings.FEED_FAN_OUT_MAX_FOLLOWERS,
+    ).values_list("pk", "author_id", "created_at"):
+        recipes[author_id].append((recipe_id, created_at))
+    if not recipes:
+        return
+    entries = (
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            created_at=created_at,
+        )
+        for user_id, author_id in Subscription.objects.filter(
+            author_id__in=recipes
+        )
+        .values_list("user_id", "author_id")
+        .iterator(chunk_size=FEED_FAN_OUT_BATCH_SIZE)
+        for recipe_id, created_at in recipes[author_id]
+    )
+    while batch := list(islice(entries, FEED_FAN_OUT_BATCH_SIZE)):
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Add every recipe of a newly followed author to a timeline."""
+    limit_followers = settings.FEED_FAN_OUT_MAX_FOLLOWERS
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                created_at=created_at,
+            )
+            for recipe_id, created_at in Recipe.objects.filter(
+                author_id=author_id,
+                author__subscribers_count__lte=limit_followers,
+            ).values_list("pk", "created_at")
+        ],
+        batch_size=FEED_FAN_OUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def _keyset(created_field, pk_field, position):
+    if position is None:
+        return Q()
+    created_at, pk = position
+    return Q(**{f"{created_field}__lt": created_at}) | Q(
+        **{created_field: created_at, f"{pk_field}__lt": pk}
+    )
+
+
+def latest_keys(user_id, position, limit):
+    """Newest ``(created_at, recipe_id)`` pairs of a feed before a position.
+
+    One indexed range read of the timeline and one of the recipes by
+    authors that are read on demand, merged in Python.
+    """
+    limit_followers = settings.FEED_FAN_OUT_MAX_FOLLOWERS
+    timeline = (
+        FeedEntry.objects.filter(
+            _keyset("created_at", "recipe_id", position),
+            user_id=user_id,
+        )
+        .exclude(author__subscribers_count__gt=limit_followers)
+        .order_by("-created_at", "-recipe_id")
+        .values_list("created_at", "recipe_id")[:limit]
+    )
+    on_read = (
+        Recipe.objects.filter(
+            _keyset("created_at", "pk", position),
+            author__subscribers__user_id=user_id,
+            author__subscribers_count__gt=limit_followers,
+        )
+        .order_by("-created_at", "-pk")
+        .values_list("created_at", "pk")[:limit]
+    )
+    return list(
+        islice(heapq.merge(timeline, on_read, reverse=True), limit)
+    )
+
+
+def rebuild(user_ids=None):
+    """Rewrite timelines from subscriptions; returns the number of rows."""
+    subscriptions = Subscription.objects.all()
+    if user_ids is not None:
+        subscriptions = subscriptions.filter(user_id__in=user_ids)
+    with transaction.atomic():
+        entries = FeedEntry.objects.all()
+        if user_ids is not None:
+            entries = entries.filter(user_id__in=user_ids)
+        entries.delete()
+        for user_id, author_id in subscriptions.values_list(
+            "user_id", "author_id"
+        ).iterator():
+            backfill(user_id, author_id)
+        return entries.count()
+
+
+class FanOutQueue:
+    """A single background thread per worker process running fan-outs."""
+
+    def __init__(self):
+        self._pid = None
+        self._executor = None
+
+    def submit(self, recipe_id):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="feed-fan-out",
+            )
+        self._executor.submit(self._run, recipe_id)
+
+    @staticmethod
+    def _run(recipe_id):
+        try:
+            fan_out(recipe_id)
+        except Exception:
+            logger.exception("Could not fan out recipe %s", recipe_id)
+        finally:
+            connection.close()
+
+
+fan_out_queue = FanOutQueue()
+
+
+def schedule_fan_out(recipe_id):
+    if settings.FEED_FAN_OUT_IN_BACKGROUND:
+        run = partial(fan_out_queue.submit, recipe_id)
+    else:
+        run = partial(fan_out, recipe_id)
+    transaction.on_commit(run)
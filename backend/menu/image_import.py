@@ -0,0 +1,132 @@
+"""Copying of image directories into media for ``import_images``.
+
+A file is copied only when the target is missing or differs: same size
+and modification time, or same size and content, count as unchanged.
+Copies are made by the kernel (``copy_file_range``, then ``sendfile``)
+without passing the data through Python, or are hard links when asked
+for and both directories share a file system. Targets are replaced
+atomically and get the source's modification time, so the next run can
+skip them from ``stat`` alone.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+
+COPIED = "copied"
+LINKED = "linked"
+SKIPPED = "skipped"
+
+_TRANSLIT = dict(
+    zip(
+        "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+        (
+            "a b v g d e e zh z i y k l m n o p r s t u f h ts ch sh sch"
+            " _ y _ e yu ya"
+        ).split(" "),
+    )
+)
+
+
+def name_key(name):
+    """Lowercase latin key of a recipe name: "Блинчики" -> "blinchiki"."""
+    letters = (
+        _TRANSLIT.get(char, char).replace("_", "")
+        for char in name.lower()
+    )
+    words = "".join(
+        char if char.isalnum() else " " for char in "".join(letters)
+    )
+    return "_".join(words.split())
+
+
+def file_digest(path):
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").digest()
+
+
+def unchanged(source, source_stat, target):
+    try:
+        target_stat = os.stat(target)
+    except FileNotFoundError:
+        return False
+    if os.path.samestat(source_stat, target_stat):
+        return True
+    if target_stat.st_size != source_stat.st_size:
+        return False
+    if target_stat.st_mtime_ns == source_stat.st_mtime_ns:
+        return True
+    if file_digest(source) != file_digest(target):
+        return False
+    os.utime(target, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    return True
+
+
+def _copy_file_range(source_fd, target_fd, size):
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(source_fd, target_fd, size - copied)
+        if not sent:
+            raise OSError("copy_file_range stopped early")
+        copied += sent
+
+
+def _sendfile(source_fd, target_fd, size):
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(target_fd, source_fd, copied, size - copied)
+        if not sent:
+            raise OSError("sendfile stopped early")
+        copied += sent
+
+
+def _kernel_copy(source, target, size):
+    for method in (_copy_file_range, _sendfile):
+        try:
+            method(source.fileno(), target.fileno(), size)
+        except (AttributeError, OSError):
+            source.seek(0)
+            target.seek(0)
+            target.truncate()
+        else:
+            return
+    shutil.copyfileobj(source, target)
+
+
+def _link(source, staged):
+    try:
+        os.link(source, staged)
+    except OSError:
+        return False
+    return True
+
+
+def _copy(source, source_stat, staged):
+    with open(source, "rb") as source_file, open(staged, "xb") as target:
+        _kernel_copy(source_file, target, source_stat.st_size)
+    os.chmod(staged, 0o644)
+    os.utime(staged, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+
+
+def copy_file(source, target, link=False):
+    """Bring ``target`` up to date with ``source``.
+
+    Returns ``(status, bytes written)``; a hard link writes nothing.
+    """
+    source_stat = os.stat(source)
+    if unchanged(source, source_stat, target):
+        return SKIPPED, 0
+    directory, filename = os.path.split(target)
+    staged = os.path.join(directory, f".{filename}.{uuid.uuid4().hex}")
+    try:
+        if link and _link(source, staged):
+            status, written = LINKED, 0
+        else:
+            _copy(source, source_stat, staged)
+            status, written = COPIED, source_stat.st_size
+        os.replace(staged, target)
+    except BaseException:
+        if os.path.lexists(staged):
+            os.unlink(staged)
+        raise
+    return status, written
@@ -0,0 +1,195 @@
+"""Maintenance and lookups for the ingredient → recipes inverted index.
+
+Every ``IngredientRecipes`` row keeps the ids of the recipes that use the
+ingredient as a sorted packed array, so "recipes with all/any of these
+ingredients" is one indexed read plus a set operation in Python instead of
+a self-join per ingredient on ``RecipeIngredient``. The ids of an
+ingredient are split into buckets of ``2 ** INGREDIENT_INDEX_BUCKET_BITS``
+consecutive recipe ids, one row each: saving a recipe locks and rewrites
+only its own bucket, however many recipes use the ingredient.
+
+Recipe ids of deleted recipes are dropped through ``menu.signals``; ids
+that slip through anyway are harmless because results are always joined
+back against ``Recipe``. Rewriting rows sends ``index_changed``, so that
+``api`` can drop the decoded rows it memoizes.
+"""
+import json
+import sys
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.db import connections, transaction
+from django.db.models.expressions import RawSQL
+from django.dispatch import Signal
+
+from core.constants import INGREDIENT_INDEX_BUCKET_BITS
+
+from .models import IngredientRecipes
+
+MATCH_ALL = "all"
+MATCH_ANY = "any"
+
+# Sent with the ``ingredient_ids`` whose rows were rewritten.
+index_changed = Signal()
+
+
+def decode_ids(blob):
+    ids = array("Q")
+    ids.frombytes(bytes(blob))
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids
+
+
+def encode_ids(ids):
+    if sys.byteorder == "big":
+        ids = array("Q", ids)
+        ids.byteswap()
+    return ids.tobytes()
+
+
+def bucket_of(recipe_id):
+    return recipe_id >> INGREDIENT_INDEX_BUCKET_BITS
+
+
+def _update(recipe_ids_by_ingredient, apply, create):
+    changes = defaultdict(list)
+    for ingredient_id, recipe_ids in recipe_ids_by_ingredient.items():
+        for recipe_id in recipe_ids:
+            changes[ingredient_id, bucket_of(recipe_id)].append(recipe_id)
+    if not changes:
+        return
+    with transaction.atomic():
+        if create:
+            IngredientRecipes.objects.bulk_create(
+                [
+                    IngredientRecipes(
+                        ingredient_id=ingredient_id,
+                        bucket=bucket,
+                    )
+                    for ingredient_id, bucket in sorted(changes)
+                ],
+                ignore_conflicts=True,
+            )
+        rows = [
+            row
+            for row in IngredientRecipes.objects.select_for_update()
+            .filter(
+                ingredient_id__in={key[0] for key in changes},
+                bucket__in={key[1] for key in changes},
+            )
+            .order_by("ingredient_id", "bucket")
+            if (row.ingredient_id, row.bucket) in changes
+        ]
+        for row in rows:
+            ids = decode_ids(row.recipe_ids)
+            for recipe_id in sorted(changes[row.ingredient_id, row.bucket]):
+                apply(ids, recipe_id)
+            row.recipe_ids = encode_ids(ids)
+        IngredientRecipes.objects.bulk_update(
+            [row for row in rows if row.recipe_ids],
+            ["recipe_ids"],
+        )
+        empty = [row.pk for row in rows if not row.recipe_ids]
+        if empty:
+            IngredientRecipes.objects.filter(pk__in=empty).delete()
+        index_changed.send(
+            sender=IngredientRecipes,
+            ingredient_ids={row.ingredient_id for row in rows},
+        )
+
+
+def _insert(ids, recipe_id):
+    index = bisect_left(ids, recipe_id)
+    if index == len(ids) or ids[index] != recipe_id:
+        insort(ids, recipe_id)
+
+
+def _remove(ids, recipe_id):
+    index = bisect_left(ids, recipe_id)
+    if index < len(ids) and ids[index] == recipe_id:
+        del ids[index]
+
+
+def add_recipe(recipe_id, ingredient_ids):
+    add_recipes(
+        {ingredient_id: [recipe_id] for ingredient_id in ingredient_ids}
+    )
+
+
+def remove_recipe(recipe_id, ingredient_ids):
+    remove_recipes(
+        {ingredient_id: [recipe_id] for ingredient_id in ingredient_ids}
+    )
+
+
+def add_recipes(recipe_ids_by_ingredient):
+    """Index many recipes at once: ``{ingredient_id: recipe_ids}``."""
+    _update(recipe_ids_by_ingredient, _insert, create=True)
+
+
+def remove_recipes(recipe_ids_by_ingredient):
+    _update(recipe_ids_by_ingredient, _remove, create=False)
+
+
+def load_postings(ingredient_ids):
+    """Decoded ``{ingredient_id: {bucket: recipe_ids}}`` of the rows."""
+    postings = {ingredient_id: {} for ingredient_id in ingredient_ids}
+    for ingredient_id, bucket, blob in IngredientRecipes.objects.filter(
+        ingredient_id__in=postings
+    ).values_list("ingredient_id", "bucket", "recipe_ids"):
+        postings[ingredient_id][bucket] = decode_ids(blob)
+    return postings
+
+
+def recipe_ids_for(ingredient_ids, match=MATCH_ALL, load=load_postings):
+    """Ids of recipes with all or any of the ingredients.
+
+    ``load`` returns the rows like ``load_postings``; the arrays it
+    returns are only read.
+    """
+    ingredient_ids = set(ingredient_ids)
+    arrays_by_bucket = defaultdict(list)
+    for buckets in load(ingredient_ids).values():
+        for bucket, ids in buckets.items():
+            arrays_by_bucket[bucket].append(ids)
+    if match == MATCH_ANY:
+        return set().union(
+            *(ids for arrays in arrays_by_bucket.values() for ids in arrays)
+        )
+    recipe_ids = set()
+    for arrays in arrays_by_bucket.values():
+        # A bucket lacking a row of some ingredient has no full match.
+        if len(arrays) < len(ingredient_ids):
+            continue
+        arrays.sort(key=len)
+        recipe_ids.update(set(arrays[0]).intersection(*arrays[1:]))
+    return recipe_ids
+
+
+def filter_by_ingredients(
+    queryset,
+    ingredient_ids,
+    match=MATCH_ALL,
+    load=load_postings,
+):
+    """Restrict ``queryset`` to recipes matching the ingredient set.
+
+    The matching ids are passed as a single array parameter, so the size
+    of the result does not run into bound-parameter limits.
+    """
+    recipe_ids = sorted(recipe_ids_for(ingredient_ids, match, load))
+    if not recipe_ids:
+        return queryset.none()
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        subquery = RawSQL("SELECT unnest(%s::bigint[])", [recipe_ids])
+    elif connection.vendor == "sqlite":
+        subquery = RawSQL(
+            "SELECT value FROM json_each(%s)",
+            [json.dumps(recipe_ids)],
+        )
+    else:
+        subquery = recipe_ids
+    return queryset.filter(pk__in=subquery)
@@ -1,14 +1,23 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from core.constants import IMPORT_IMAGES_WORKERS
+from menu.image_import import COPIED, LINKED, SKIPPED, copy_file, name_key
+from menu.models import Recipe
 
 
 class Command(BaseCommand):
     help = " ".join(
         [
-            "Import all files from data/images to MEDIA/recipes",
-            "(raw copy, no binding)",
+            "Import all files from data/images to MEDIA/recipes,",
+            "skipping unchanged ones, and optionally bind them to recipes",
         ]
     )
 
@@ -18,15 +27,102 @@ class Command(BaseCommand):
             default="data/images",
             help="Path to images directory",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=IMPORT_IMAGES_WORKERS,
+            help="Number of copying threads",
+        )
+        parser.add_argument(
+            "--link",
+            action="store_true",
+            help="Hard link files when media is on the same file system",
+        )
+        parser.add_argument(
+            "--bind",
+            action="store_true",
+            help=" ".join(
+                [
+                    "Set the image of recipes without one to the file named",
+                    "after the recipe id or transliterated name",
+                ]
+            ),
+        )
 
     def handle(self, *args, **opts):
         base = Path(opts["dir"])
         media = Path(settings.MEDIA_ROOT) / "recipes"
         media.mkdir(parents=True, exist_ok=True)
-        count = 0
-        for fp in base.glob("*.*"):
-            if fp.is_file():
-                (media / fp.name).write_bytes(fp.read_bytes())
-                count += 1
-        message = f"Copied {count} images to {media}"
-        self.stdout.write(self.style.SUCCESS(message))
+        sources = [
+            path
+            for path in sorted(base.glob("*.*"))
+            if path.is_file() and not path.name.startswith(".")
+        ]
+        statuses = Counter()
+        written = 0
+        imported = []
+        started = time.monotonic()
+        with ThreadPoolExecutor(
+            max_workers=opts["workers"],
+            thread_name_prefix="import-images",
+        ) as pool:
+            futures = [
+                (
+                    source.name,
+                    pool.submit(
+                        copy_file,
+                        source,
+                        media / source.name,
+                        link=opts["link"],
+                    ),
+                )
+                for source in sources
+            ]
+            for filename, future in futures:
+                try:
+                    status, size = future.result()
+                except OSError as error:
+                    statuses["failed"] += 1
+                    self.stderr.write(f"{filename}: {error}")
+                    continue
+                statuses[status] += 1
+                written += size
+                imported.append(filename)
+        elapsed = max(time.monotonic() - started, 1e-6)
+
+        message = (
+            f"Copied {statuses[COPIED]}, linked {statuses[LINKED]}, "
+            f"skipped {statuses[SKIPPED]} images to {media} "
+            f"in {elapsed:.2f} s ({len(sources) / elapsed:.0f} files/s, "
+            f"{written / elapsed / 2**20:.1f} MB/s written)"
+        )
+        if opts["bind"]:
+            message += f", bound {self._bind(imported)} recipes"
+        failed = statuses["failed"]
+        if failed:
+            message += f", {failed} failed"
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(message))
+
+    @transaction.atomic
+    def _bind(self, filenames):
+        files = {}
+        for filename in filenames:
+            files.setdefault(Path(filename).stem.lower(), filename)
+        storage = Recipe._meta.get_field("image").storage
+        bound = Counter()
+        recipes = Recipe.objects.filter(
+            Q(image="") | Q(image__isnull=True)
+        ).only("pk", "name")
+        for recipe in recipes.iterator():
+            filename = files.get(str(recipe.pk)) or files.get(
+                name_key(recipe.name)
+            )
+            if filename is None:
+                continue
+            recipe.image = f"recipes/{filename}"
+            recipe.save(update_fields=["image", "updated_at"])
+            bound[recipe.image.name] += 1
+        for name, count in bound.items():
+            storage.add_references(name, storage.size(name), count)
+        return sum(bound.values())
@@ -3,7 +3,8 @@ import json
 from pathlib import Path
 from django.core.management.base import BaseCommand
 
-from menu.models import Ingredient
+from api.catalog import invalidate_ingredient_catalog
+from menu.models import Ingredient, normalize_search_name
 
 
 class Command(BaseCommand):
@@ -41,7 +42,14 @@ class Command(BaseCommand):
                         items.add((name, unit))
         objs = []
         for name, unit in items:
-            objs.append(Ingredient(name=name, measurement_unit=unit))
+            objs.append(
+                Ingredient(
+                    name=name,
+                    measurement_unit=unit,
+                    search_name=normalize_search_name(name),
+                )
+            )
         Ingredient.objects.bulk_create(objs, ignore_conflicts=True)
+        invalidate_ingredient_catalog()
         message = f"Imported {len(items)} ingredients"
         self.stdout.write(self.style.SUCCESS(message))
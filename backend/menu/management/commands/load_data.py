@@ -1,27 +1,29 @@
-import base64
-import binascii
 import json
+import os
+import time
+from itertools import islice
 from pathlib import Path
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
-from django.db import transaction
 
-from menu.models import Ingredient, Recipe, RecipeIngredient
-
-
-def _get(obj, *keys, default=None):
-    for key in keys:
-        if key in obj:
-            return obj[key]
-    return default
+from api.catalog import invalidate_ingredient_catalog
+from api.image_variants import schedule_variants
+from api.pagination import bump_count_version
+from api.recipe_cache import bump_author_version, bump_recipe_version
+from api.versions import bump_content_version
+from core.constants import LOAD_DATA_BATCH_SIZE
+from menu.bulk_load import RecipeLoader, iter_json_array, load_ingredients
+from menu.models import Recipe
 
 
 class Command(BaseCommand):
-    help = (
-        "Load ingredients and recipes from data/*.json "
-        "(supports multiple schemas)"
+    help = " ".join(
+        [
+            "Load ingredients and recipes from data/*.json",
+            "(supports multiple schemas) in committed batches,",
+            "resuming an interrupted load of recipes.json",
+        ]
     )
 
     def add_arguments(self, parser):
@@ -30,10 +32,25 @@ class Command(BaseCommand):
             default="data",
             help="Path to data directory",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=LOAD_DATA_BATCH_SIZE,
+            help="Recipes written and committed together",
+        )
+        parser.add_argument(
+            "--progress-file",
+            help="Where to keep progress, <dir>/recipes.json.progress",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore saved progress and start from the first recipe",
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
         base_dir = Path(options["dir"])
+        batch_size = options["batch_size"]
         user_model = get_user_model()
 
         demo_users = (
@@ -49,78 +66,88 @@ class Command(BaseCommand):
                 user.set_password("demo12345")
                 user.save()
 
-        self._load_ingredients(base_dir)
-        self._load_recipes(base_dir, user_model)
-        self.stdout.write(self.style.SUCCESS(f"Loaded data from {base_dir}"))
+        self.started = time.monotonic()
+        self.rows = 0
+        self._load_ingredients(base_dir, batch_size)
+        self._load_recipes(base_dir, batch_size, options)
+        bump_count_version(Recipe._meta.db_table)
+        bump_content_version()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded data from {base_dir}: {self.rows} rows "
+                f"in {self._elapsed():.1f} s ({self._rate():.0f} rows/s)"
+            )
+        )
+
+    def _elapsed(self):
+        return max(time.monotonic() - self.started, 1e-6)
 
-    def _load_ingredients(self, base_dir: Path):
+    def _rate(self):
+        return self.rows / self._elapsed()
+
+    def _load_ingredients(self, base_dir: Path, batch_size):
         path = base_dir / "ingredients.json"
         if not path.exists():
             return
-        items = json.loads(path.read_text(encoding="utf-8"))
-        for item in items:
-            name = _get(item, "name", "title")
-            unit = _get(item, "measurement_unit", "dimension", default="")
-            if name and unit:
-                Ingredient.objects.get_or_create(
-                    name=name,
-                    measurement_unit=unit,
-                )
+        with path.open(encoding="utf-8") as file:
+            self.rows += load_ingredients(iter_json_array(file), batch_size)
+        invalidate_ingredient_catalog()
 
-    def _load_recipes(self, base_dir: Path, user_model):
+    def _load_recipes(self, base_dir: Path, batch_size, options):
         path = base_dir / "recipes.json"
         if not path.exists():
             return
-        items = json.loads(path.read_text(encoding="utf-8"))
-        for item in items:
-            username = _get(item, "author_username", default="demo1")
-            author = user_model.objects.get(username=username)
-            cooking_time_source = _get(
-                item,
-                "cooking_time",
-                "time",
-                default=10,
-            )
-            cooking_time_value = int(cooking_time_source)
-            recipe, _ = Recipe.objects.get_or_create(
-                author=author,
-                name=_get(item, "name", "title", default="Рецепт"),
-                defaults={
-                    "text": _get(item, "text", "description", default=""),
-                    "cooking_time": cooking_time_value,
-                },
-            )
-            self._load_recipe_image(recipe, item)
-            self._load_recipe_ingredients(recipe, item)
+        progress_path = Path(
+            options["progress_file"] or f"{path}.progress"
+        )
+        stat = path.stat()
+        source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        done = 0
+        if not options["restart"]:
+            done = self._read_progress(progress_path, source)
+        if done:
+            self.stdout.write(f"Resuming after {done} recipes")
+        loader = RecipeLoader(batch_size)
+        created = updated = skipped = 0
+        with path.open(encoding="utf-8") as file:
+            items = islice(iter_json_array(file), done, None)
+            while chunk := list(islice(items, batch_size)):
+                loaded = loader.load(chunk)
+                for recipe_id in loaded.updated:
+                    bump_recipe_version(recipe_id)
+                for author_id in loaded.author_ids:
+                    bump_author_version(author_id)
+                for recipe in Recipe.objects.filter(
+                    pk__in=loaded.imaged
+                ).only("pk", "image", "image_variants"):
+                    schedule_variants(recipe)
+                done += len(chunk)
+                self._write_progress(progress_path, {**source, "done": done})
+                created += len(loaded.created)
+                updated += len(loaded.updated)
+                skipped += loaded.skipped
+                self.rows += loaded.rows
+                self.stdout.write(
+                    f"Committed {done} recipes ({self._rate():.0f} rows/s)"
+                )
+        progress_path.unlink(missing_ok=True)
+        self.stdout.write(
+            f"Recipes: {created} created, {updated} updated, "
+            f"{skipped} skipped"
+        )
 
-    def _load_recipe_image(self, recipe, item):
-        encoded = _get(item, "image_base64")
-        if not encoded or recipe.image:
-            return
+    @staticmethod
+    def _read_progress(path, source):
         try:
-            content = base64.b64decode(encoded)
-        except (TypeError, ValueError, binascii.Error):
-            return
-        recipe.image.save("img.png", ContentFile(content), save=True)
-
-    def _load_recipe_ingredients(self, recipe, item):
-        ingredients = _get(item, "ingredients", default=[])
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
-        for ingredient_data in ingredients:
-            ingredient = self._resolve_ingredient(ingredient_data)
-            amount = int(_get(ingredient_data, "amount", default=1))
-            if ingredient:
-                RecipeIngredient.objects.create(
-                    recipe=recipe,
-                    ingredient=ingredient,
-                    amount=amount,
-                )
+            progress = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return 0
+        if {key: progress.get(key) for key in source} != source:
+            return 0
+        return progress.get("done", 0)
 
-    def _resolve_ingredient(self, data):
-        name = _get(data, "name")
-        if name:
-            return Ingredient.objects.filter(name=name).first()
-        ingredient_id = _get(data, "id")
-        if ingredient_id is not None:
-            return Ingredient.objects.filter(id=ingredient_id).first()
-        return None
+    @staticmethod
+    def _write_progress(path, progress):
+        staged = path.with_name(f".{path.name}.tmp")
+        staged.write_text(json.dumps(progress), encoding="utf-8")
+        os.replace(staged, path)
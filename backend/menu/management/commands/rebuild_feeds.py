@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from menu.feed import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild subscription feed timelines from subscriptions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Only rebuild the feed of this user id (repeatable)",
+        )
+
+    def handle(self, *args, **opts):
+        total = rebuild(opts["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} feed entries"))
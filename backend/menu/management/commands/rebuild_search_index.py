@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.pagination import bump_count_version
+from menu.models import Recipe
+from menu.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = " ".join(
+        [
+            "Rebuild the full-text index of recipe names and descriptions",
+            "after writes that bypassed signals",
+        ]
+    )
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            total = rebuild_search_index()
+        bump_count_version(Recipe._meta.db_table)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} recipes"))
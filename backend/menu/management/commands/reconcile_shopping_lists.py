@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from menu.models import ShoppingListItem
+from menu.shopping_list import expected_totals
+
+
+class Command(BaseCommand):
+    help = " ".join(
+        [
+            "Rebuild shopping list totals from carts",
+            "and report drift from the stored values",
+        ]
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drift, do not rewrite the table",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **opts):
+        expected = expected_totals()
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in (
+                ShoppingListItem.objects.values_list(
+                    "user_id",
+                    "ingredient_id",
+                    "amount",
+                ).iterator()
+            )
+        }
+        drift = sorted(
+            key
+            for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        )
+        for user_id, ingredient_id in drift:
+            self.stdout.write(
+                f"user={user_id} ingredient={ingredient_id}: "
+                f"stored={stored.get((user_id, ingredient_id), 0)} "
+                f"expected={expected.get((user_id, ingredient_id), 0)}"
+            )
+        if not opts["dry_run"]:
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                [
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    )
+                    for (user_id, ingredient_id), amount in expected.items()
+                ],
+                batch_size=1000,
+            )
+        message = (
+            f"Found {len(drift)} drifted rows out of {len(expected)}"
+            + ("" if opts["dry_run"] else ", rebuilt")
+        )
+        style = self.style.WARNING if drift else self.style.SUCCESS
+        self.stdout.write(style(message))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from menu.counters import drift, recount
+
+
+class Command(BaseCommand):
+    help = " ".join(
+        [
+            "Recompute stored favorites, cart, recipe and subscriber",
+            "counters and report drift from the stored values",
+        ]
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drift, do not rewrite the counters",
+        )
+
+    def handle(self, *args, **opts):
+        drifted = list(drift())
+        for field, pk, stored, expected in drifted:
+            self.stdout.write(
+                f"{field} pk={pk}: stored={stored} expected={expected}"
+            )
+        if not opts["dry_run"]:
+            recount()
+        message = f"Found {len(drifted)} drifted counters" + (
+            "" if opts["dry_run"] else ", recomputed"
+        )
+        style = self.style.WARNING if drifted else self.style.SUCCESS
+        self.stdout.write(style(message))
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0003_alter_shoppingcart_options_remove_recipe_tags_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="recipe",
+            options={
+                "ordering": ("-created_at", "-id"),
+                "verbose_name": "Рецепт",
+                "verbose_name_plural": "Рецепты",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-created_at", "-id"],
+                name="recipe_created_at_id_idx",
+            ),
+        ),
+    ]
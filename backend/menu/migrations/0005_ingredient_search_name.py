@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+def fill_search_name(apps, schema_editor):
+    Ingredient = apps.get_model("menu", "Ingredient")
+    ingredients = list(Ingredient.objects.only("id", "name"))
+    for ingredient in ingredients:
+        ingredient.search_name = (
+            ingredient.name.strip().lower().replace("ё", "е")
+        )
+    Ingredient.objects.bulk_update(
+        ingredients,
+        ["search_name"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0004_recipe_created_at_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingredient",
+            name="search_name",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                max_length=128,
+                verbose_name="Название для поиска",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+FTS_TABLE = "menu_recipe_fts"
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute(
+            "UPDATE menu_recipe SET search_vector = "
+            "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(text, '')), 'B')"
+        )
+        schema_editor.execute(
+            "CREATE INDEX menu_recipe_search_vector_gin "
+            "ON menu_recipe USING gin (search_vector)"
+        )
+    elif connection.vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "name, text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        Recipe = apps.get_model("menu", "Recipe")
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+                "VALUES (%s, %s, %s)",
+                [
+                    (
+                        recipe_id,
+                        name.lower().replace("ё", "е"),
+                        text.lower().replace("ё", "е"),
+                    )
+                    for recipe_id, name, text in Recipe.objects.values_list(
+                        "id", "name", "text"
+                    )
+                ],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute(
+            "DROP INDEX IF EXISTS menu_recipe_search_vector_gin"
+        )
+    elif connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0005_ingredient_search_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False,
+                null=True,
+                verbose_name="Поисковый вектор",
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
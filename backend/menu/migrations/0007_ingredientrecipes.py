@@ -0,0 +1,66 @@
+import sys
+from array import array
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_ingredient_index(apps, schema_editor):
+    RecipeIngredient = apps.get_model("menu", "RecipeIngredient")
+    IngredientRecipes = apps.get_model("menu", "IngredientRecipes")
+    recipes_by_ingredient = defaultdict(lambda: array("Q"))
+    pairs = RecipeIngredient.objects.order_by("recipe_id").values_list(
+        "ingredient_id", "recipe_id"
+    )
+    for ingredient_id, recipe_id in pairs.iterator():
+        recipes_by_ingredient[ingredient_id].append(recipe_id)
+    rows = []
+    for ingredient_id, recipe_ids in recipes_by_ingredient.items():
+        if sys.byteorder == "big":
+            recipe_ids.byteswap()
+        rows.append(
+            IngredientRecipes(
+                ingredient_id=ingredient_id,
+                recipe_ids=recipe_ids.tobytes(),
+            )
+        )
+    IngredientRecipes.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0006_recipe_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngredientRecipes",
+            fields=[
+                (
+                    "ingredient",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="recipe_index",
+                        serialize=False,
+                        to="menu.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "recipe_ids",
+                    models.BinaryField(default=bytes, verbose_name="Рецепты"),
+                ),
+            ],
+            options={
+                "verbose_name": "Рецепты ингредиента",
+                "verbose_name_plural": "Индекс рецептов по ингредиентам",
+            },
+        ),
+        migrations.RunPython(
+            build_ingredient_index,
+            migrations.RunPython.noop,
+        ),
+    ]
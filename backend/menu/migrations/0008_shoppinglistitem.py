@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_shopping_lists(apps, schema_editor):
+    ShoppingCart = apps.get_model("menu", "ShoppingCart")
+    RecipeIngredient = apps.get_model("menu", "RecipeIngredient")
+    ShoppingListItem = apps.get_model("menu", "ShoppingListItem")
+    amounts_by_recipe = defaultdict(list)
+    for recipe_id, ingredient_id, amount in (
+        RecipeIngredient.objects.filter(
+            recipe_id__in=ShoppingCart.objects.values("recipe_id")
+        ).values_list("recipe_id", "ingredient_id", "amount")
+    ):
+        amounts_by_recipe[recipe_id].append((ingredient_id, amount))
+    totals = defaultdict(int)
+    for user_id, recipe_id in ShoppingCart.objects.values_list(
+        "user_id", "recipe_id"
+    ):
+        for ingredient_id, amount in amounts_by_recipe[recipe_id]:
+            totals[(user_id, ingredient_id)] += amount
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for (user_id, ingredient_id), amount in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("menu", "0007_ingredientrecipes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingListItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.BigIntegerField(
+                        default=0,
+                        verbose_name="Количество",
+                    ),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="menu.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Позиция списка покупок",
+                "verbose_name_plural": "Позиции списков покупок",
+                "ordering": ("user", "ingredient"),
+                "default_related_name": "shopping_list_items",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="shoppinglistitem",
+            constraint=models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_shopping_list_user_ingredient",
+            ),
+        ),
+        migrations.RunPython(
+            fill_shopping_lists,
+            migrations.RunPython.noop,
+        ),
+    ]
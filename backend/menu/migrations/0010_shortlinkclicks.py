@@ -0,0 +1,47 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0009_recipe_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShortLinkClicks",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="short_link_clicks",
+                        serialize=False,
+                        to="menu.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "clicks",
+                    models.PositiveBigIntegerField(
+                        default=0,
+                        verbose_name="Переходов",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        verbose_name="Обновлено",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Переходы по короткой ссылке",
+                "verbose_name_plural": "Переходы по коротким ссылкам",
+                "ordering": ("-clicks",),
+            },
+        ),
+    ]
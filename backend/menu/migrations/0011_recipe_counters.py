@@ -0,0 +1,55 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, link):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{link: OuterRef("pk")})
+            .order_by()
+            .values(link)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("menu", "Recipe")
+    Favorite = apps.get_model("menu", "Favorite")
+    ShoppingCart = apps.get_model("menu", "ShoppingCart")
+    Recipe.objects.update(
+        favorites_count=count_of(Favorite, "recipe"),
+        in_carts_count=count_of(ShoppingCart, "recipe"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0010_shortlinkclicks"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="В избранном",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="in_carts_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="В списках покупок",
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations, models
+
+import menu.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0013_recipe_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaFile",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=255,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Имя файла",
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(
+                        verbose_name="Размер, байт"
+                    ),
+                ),
+                (
+                    "references",
+                    models.PositiveIntegerField(
+                        default=1,
+                        verbose_name="Ссылок",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        verbose_name="Дата создания",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Медиафайл",
+                "verbose_name_plural": "Медиафайлы",
+                "ordering": ("name",),
+            },
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=menu.storage.ContentAddressedStorage(),
+                upload_to="recipes/",
+                verbose_name="Изображение",
+            ),
+        ),
+    ]
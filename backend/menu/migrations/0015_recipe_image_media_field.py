@@ -0,0 +1,24 @@
+from django.db import migrations
+
+import menu.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0014_mediafile"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=menu.storage.MediaImageField(
+                blank=True,
+                null=True,
+                storage=menu.storage.ContentAddressedStorage(),
+                upload_to="recipes/",
+                verbose_name="Изображение",
+            ),
+        ),
+    ]
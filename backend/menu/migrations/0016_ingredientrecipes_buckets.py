@@ -0,0 +1,92 @@
+import sys
+from array import array
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Must match core.constants.INGREDIENT_INDEX_BUCKET_BITS at this point.
+BUCKET_BITS = 12
+
+
+def build_ingredient_index(apps, schema_editor):
+    RecipeIngredient = apps.get_model("menu", "RecipeIngredient")
+    IngredientRecipes = apps.get_model("menu", "IngredientRecipes")
+    recipes_by_bucket = defaultdict(lambda: array("Q"))
+    pairs = RecipeIngredient.objects.order_by("recipe_id").values_list(
+        "ingredient_id", "recipe_id"
+    )
+    for ingredient_id, recipe_id in pairs.iterator():
+        key = (ingredient_id, recipe_id >> BUCKET_BITS)
+        recipes_by_bucket[key].append(recipe_id)
+    rows = []
+    for (ingredient_id, bucket), recipe_ids in recipes_by_bucket.items():
+        if sys.byteorder == "big":
+            recipe_ids.byteswap()
+        rows.append(
+            IngredientRecipes(
+                ingredient_id=ingredient_id,
+                bucket=bucket,
+                recipe_ids=recipe_ids.tobytes(),
+            )
+        )
+    IngredientRecipes.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0015_recipe_image_media_field"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="IngredientRecipes",
+        ),
+        migrations.CreateModel(
+            name="IngredientRecipes",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "bucket",
+                    models.PositiveIntegerField(verbose_name="Блок"),
+                ),
+                (
+                    "recipe_ids",
+                    models.BinaryField(default=bytes, verbose_name="Рецепты"),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recipe_index",
+                        to="menu.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Рецепты ингредиента",
+                "verbose_name_plural": "Индекс рецептов по ингредиентам",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="ingredientrecipes",
+            constraint=models.UniqueConstraint(
+                fields=("ingredient", "bucket"),
+                name="unique_ingredient_recipes_bucket",
+            ),
+        ),
+        migrations.RunPython(
+            build_ingredient_index,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models
 
 from core.constants import (
     COOKING_TIME_MAX,
@@ -16,6 +17,9 @@ from core.constants import (
     RECIPE_NAME_MAX_LENGTH,
     SHORT_LINK_CODE_MAX_LENGTH,
 )
+from core.mixins import StoredCountersMixin
+
+from .storage import MediaImageField, media_storage
 
 CTIME_MIN_ERROR = COOKING_TIME_MIN_MESSAGE.format(value=COOKING_TIME_MIN)
 CTIME_MAX_ERROR = COOKING_TIME_MAX_MESSAGE.format(value=COOKING_TIME_MAX)
@@ -23,6 +27,26 @@ ING_MIN_ERROR = INGREDIENT_MIN_MESSAGE.format(value=INGREDIENT_AMOUNT_MIN)
 ING_MAX_ERROR = INGREDIENT_MAX_MESSAGE.format(value=INGREDIENT_AMOUNT_MAX)
 
 
+def normalize_search_name(value):
+    return value.strip().lower().replace("ё", "е")
+
+
+class IngredientQuerySet(models.QuerySet):
+    def search_prefix(self, query):
+        prefix = normalize_search_name(query)
+        if not prefix:
+            return self
+        if connections[self.db].vendor == "sqlite":
+            # SQLite only uses an index for LIKE on NOCASE columns, so the
+            # prefix is expressed as a range over the binary-ordered index.
+            upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            return self.filter(
+                search_name__gte=prefix,
+                search_name__lt=upper_bound,
+            )
+        return self.filter(search_name__startswith=prefix)
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         max_length=INGREDIENT_NAME_MAX_LENGTH,
@@ -32,6 +56,14 @@ class Ingredient(models.Model):
         max_length=INGREDIENT_UNIT_MAX_LENGTH,
         verbose_name="Единица измерения",
     )
+    search_name = models.CharField(
+        max_length=INGREDIENT_NAME_MAX_LENGTH,
+        db_index=True,
+        editable=False,
+        verbose_name="Название для поиска",
+    )
+
+    objects = IngredientQuerySet.as_manager()
 
     class Meta:
         ordering = ("name",)
@@ -47,8 +79,17 @@ class Ingredient(models.Model):
     def __str__(self):
         return f"{self.name}, {self.measurement_unit}"
 
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_search_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        super().save(*args, **kwargs)
+
+
+class Recipe(StoredCountersMixin, models.Model):
+    counter_fields = ("favorites_count", "in_carts_count")
 
-class Recipe(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -59,8 +100,9 @@ class Recipe(models.Model):
         max_length=RECIPE_NAME_MAX_LENGTH,
         verbose_name="Название",
     )
-    image = models.ImageField(
+    image = MediaImageField(
         upload_to="recipes/",
+        storage=media_storage,
         blank=True,
         null=True,
         verbose_name="Изображение",
@@ -89,11 +131,41 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name="Дата создания",
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Поисковый вектор",
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name="Варианты изображения",
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В избранном",
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В списках покупок",
+    )
 
     class Meta:
-        ordering = ("-created_at",)
+        ordering = ("-created_at", "-id")
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(
+                fields=("-created_at", "-id"),
+                name="recipe_created_at_id_idx",
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -140,6 +212,40 @@ class RecipeIngredient(models.Model):
         return f"{self.ingredient} для {self.recipe}"
 
 
+class IngredientRecipes(models.Model):
+    """Inverted index: sorted ids of the recipes that use an ingredient.
+
+    Every row holds one bucket of ids (see ``menu.ingredient_index``), so
+    a write never rewrites more than a bounded number of ids. Ids are
+    packed as little-endian uint64.
+    """
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="recipe_index",
+        verbose_name="Ингредиент",
+    )
+    bucket = models.PositiveIntegerField(verbose_name="Блок")
+    recipe_ids = models.BinaryField(
+        default=bytes,
+        verbose_name="Рецепты",
+    )
+
+    class Meta:
+        verbose_name = "Рецепты ингредиента"
+        verbose_name_plural = "Индекс рецептов по ингредиентам"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("ingredient", "bucket"),
+                name="unique_ingredient_recipes_bucket",
+            )
+        ]
+
+    def __str__(self):
+        return f"Рецепты с {self.ingredient} (блок {self.bucket})"
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -194,6 +300,96 @@ class ShoppingCart(models.Model):
         return f"{self.user} — {self.recipe}"
 
 
+class ShoppingListItem(models.Model):
+    """Running ingredient totals of a user's cart.
+
+    Maintained incrementally by ``menu.shopping_list`` so that downloading
+    the list is a single indexed read.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name="Ингредиент",
+    )
+    amount = models.BigIntegerField(
+        default=0,
+        verbose_name="Количество",
+    )
+
+    class Meta:
+        default_related_name = "shopping_list_items"
+        ordering = ("user", "ingredient")
+        verbose_name = "Позиция списка покупок"
+        verbose_name_plural = "Позиции списков покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_shopping_list_user_ingredient",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} — {self.ingredient}: {self.amount}"
+
+
+class FeedEntry(models.Model):
+    """A recipe in the feed of one of its author's subscribers.
+
+    Written by ``menu.feed`` when a recipe is published (fan-out on
+    write) and when a subscription is created. ``created_at`` repeats the
+    recipe's so that a feed page is read from this table's index alone.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    created_at = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Ленты подписок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "recipe"),
+                name="unique_feed_entry_user_recipe",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "-created_at", "-recipe"),
+                name="feed_entry_user_created_idx",
+            ),
+            models.Index(
+                fields=("user", "author"),
+                name="feed_entry_user_author_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} в ленте {self.user}"
+
+
 class ShortLinkRecipe(models.Model):
     recipe = models.OneToOneField(
         Recipe,
@@ -218,3 +414,61 @@ class ShortLinkRecipe(models.Model):
 
     def __str__(self):
         return f"Ссылка {self.code} для {self.recipe}"
+
+
+class ShortLinkClicks(models.Model):
+    """Number of short link redirects to a recipe.
+
+    Written in batches by ``api.click_analytics``.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="short_link_clicks",
+        verbose_name="Рецепт",
+    )
+    clicks = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Переходов",
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Обновлено",
+    )
+
+    class Meta:
+        ordering = ("-clicks",)
+        verbose_name = "Переходы по короткой ссылке"
+        verbose_name_plural = "Переходы по коротким ссылкам"
+
+    def __str__(self):
+        return f"{self.recipe}: {self.clicks}"
+
+
+class MediaFile(models.Model):
+    """Reference counter of a file in ``menu.storage``."""
+
+    name = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name="Имя файла",
+    )
+    size = models.PositiveBigIntegerField(verbose_name="Размер, байт")
+    references = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Ссылок",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата создания",
+    )
+
+    class Meta:
+        ordering = ("name",)
+        verbose_name = "Медиафайл"
+        verbose_name_plural = "Медиафайлы"
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,151 @@
+"""Full-text index over recipe names and descriptions.
+
+PostgreSQL keeps a weighted ``tsvector`` in ``Recipe.search_vector`` with
+a GIN index and the ``russian`` text search configuration. SQLite has no
+tsvector, so single-node deployments keep a copy of the normalized text in
+the FTS5 table ``menu_recipe_fts`` (rowid = recipe id) instead.
+
+Both are refreshed from ``menu.signals`` on every save and delete, and
+``menu.bulk_load`` indexes the recipes it creates. Writes that bypass
+both, such as ``QuerySet.update()`` or a restored dump, are covered by the
+``rebuild_search_index`` management command.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import normalize_search_name
+
+FTS_TABLE = "menu_recipe_fts"
+SEARCH_CONFIG = "russian"
+
+_WORD_RE = re.compile(r"\w+")
+_RUSSIAN_ENDING_CHARS = "аеиоуыэюяйь"
+
+_PG_VECTOR_SQL = (
+    "setweight(to_tsvector(%s, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector(%s, coalesce(text, '')), 'B')"
+)
+
+
+def _stem(word):
+    """Crude Russian stemmer for SQLite: strip up to two ending letters."""
+    for _ in range(2):
+        if len(word) > 4 and word[-1] in _RUSSIAN_ENDING_CHARS:
+            word = word[:-1]
+    return word
+
+
+def fts_match_expression(query):
+    words = _WORD_RE.findall(normalize_search_name(query))
+    return " ".join(f'"{_stem(word)}"*' for word in words)
+
+
+def search_recipes(queryset, query):
+    """Filter recipes matching ``query`` and annotate ``search_rank``.
+
+    Higher ranks are better on every backend.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        search_query = SearchQuery(
+            query,
+            config=SEARCH_CONFIG,
+            search_type="websearch",
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F("search_vector"), search_query)
+        )
+    if connection.vendor == "sqlite":
+        expression = fts_match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [expression],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, 2.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = menu_recipe.id",
+                [expression],
+            )
+        )
+    return queryset.filter(
+        Q(name__icontains=query) | Q(text__icontains=query)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def index_recipes(using, recipe_ids):
+    connection = connections[using]
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                f"UPDATE menu_recipe SET search_vector = {_PG_VECTOR_SQL} "
+                "WHERE id = ANY(%s)",
+                [SEARCH_CONFIG, SEARCH_CONFIG, recipe_ids],
+            )
+        elif connection.vendor == "sqlite":
+            placeholders = ", ".join("%s" for _ in recipe_ids)
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+                recipe_ids,
+            )
+            cursor.execute(
+                "SELECT id, name, text FROM menu_recipe "
+                f"WHERE id IN ({placeholders})",
+                recipe_ids,
+            )
+            rows = [
+                (
+                    recipe_id,
+                    normalize_search_name(name),
+                    normalize_search_name(text),
+                )
+                for recipe_id, name, text in cursor.fetchall()
+            ]
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+                "VALUES (%s, %s, %s)",
+                rows,
+            )
+
+
+def remove_recipes(using, recipe_ids):
+    connection = connections[using]
+    recipe_ids = list(recipe_ids)
+    if connection.vendor != "sqlite" or not recipe_ids:
+        return
+    placeholders = ", ".join("%s" for _ in recipe_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+            recipe_ids,
+        )
+
+
+def rebuild_search_index(using="default", batch_size=500):
+    """Reindex every recipe; returns the number of recipes indexed."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                f"UPDATE menu_recipe SET search_vector = {_PG_VECTOR_SQL}",
+                [SEARCH_CONFIG, SEARCH_CONFIG],
+            )
+            return cursor.rowcount
+        if connection.vendor != "sqlite":
+            return 0
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute("SELECT id FROM menu_recipe")
+        recipe_ids = [row[0] for row in cursor.fetchall()]
+    for start in range(0, len(recipe_ids), batch_size):
+        index_recipes(using, recipe_ids[start:start + batch_size])
+    return len(recipe_ids)
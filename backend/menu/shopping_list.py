@@ -0,0 +1,136 @@
+"""Incremental maintenance of ``ShoppingListItem`` totals.
+
+Every change is expressed as per-ingredient deltas applied to a set of
+users: adding a recipe to a cart adds its amounts for that user, editing
+a carted recipe applies the difference for everyone who has it in the
+cart. Rows whose total drops to zero are removed.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def apply_deltas(user_ids, deltas):
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items()
+        if delta
+    }
+    if not deltas:
+        return
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create(
+            [
+                ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+                for user_id in user_ids
+                for ingredient_id in deltas
+            ],
+            ignore_conflicts=True,
+        )
+        items = ShoppingListItem.objects.filter(
+            user_id__in=user_ids,
+            ingredient_id__in=deltas,
+        )
+        items.update(
+            amount=F("amount")
+            + Case(
+                *(
+                    When(ingredient_id=ingredient_id, then=Value(delta))
+                    for ingredient_id, delta in deltas.items()
+                ),
+                default=Value(0),
+            )
+        )
+        items.filter(amount__lte=0).delete()
+
+
+def recipe_amounts(recipe_id, sign=1):
+    amounts = RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list(
+        "ingredient_id",
+        "amount",
+    )
+    return {ingredient_id: sign * amount for ingredient_id, amount in amounts}
+
+
+def users_with_recipe_in_cart(recipe_id):
+    return ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+        "user_id",
+        flat=True,
+    )
+
+
+def add_recipe_to_list(user_id, recipe_id):
+    apply_deltas([user_id], recipe_amounts(recipe_id))
+
+
+def remove_recipe_from_list(user_id, recipe_id):
+    apply_deltas([user_id], recipe_amounts(recipe_id, sign=-1))
+
+
+def apply_recipe_change(recipe_id, deltas):
+    apply_deltas(users_with_recipe_in_cart(recipe_id), deltas)
+
+
+def apply_recipe_changes(deltas_by_recipe):
+    """Apply ``{recipe_id: deltas}`` of many recipes at once.
+
+    The deltas are summed per user and ingredient first, so the number
+    of queries does not depend on the number of recipes or carts.
+    """
+    changes = defaultdict(int)
+    carts = ShoppingCart.objects.filter(
+        recipe_id__in=deltas_by_recipe
+    ).values_list("user_id", "recipe_id")
+    for user_id, recipe_id in carts.iterator():
+        for ingredient_id, delta in deltas_by_recipe[recipe_id].items():
+            changes[user_id, ingredient_id] += delta
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create(
+            [
+                ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+                for user_id, ingredient_id in changes
+            ],
+            ignore_conflicts=True,
+        )
+        items = ShoppingListItem.objects.filter(
+            user_id__in={user_id for user_id, _ in changes},
+            ingredient_id__in={ingredient_id for _, ingredient_id in changes},
+        )
+        items.update(
+            amount=F("amount")
+            + Case(
+                *(
+                    When(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        then=Value(delta),
+                    )
+                    for (user_id, ingredient_id), delta in changes.items()
+                ),
+                default=Value(0),
+            )
+        )
+        items.filter(amount__lte=0).delete()
+
+
+def expected_totals():
+    """Totals recomputed from scratch, keyed by (user_id, ingredient_id)."""
+    totals = defaultdict(int)
+    rows = (
+        RecipeIngredient.objects.filter(recipe__shopping_carts__isnull=False)
+        .values("recipe__shopping_carts__user_id", "ingredient_id")
+        .annotate(total=Sum("amount"))
+    )
+    for row in rows.iterator():
+        key = (row["recipe__shopping_carts__user_id"], row["ingredient_id"])
+        totals[key] += row["total"]
+    return totals
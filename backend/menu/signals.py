@@ -0,0 +1,142 @@
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import Subscription
+
+from . import counters, feed, ingredient_index, shopping_list
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+)
+from .search import index_recipes, remove_recipes
+
+SEARCHABLE_FIELDS = {"name", "text"}
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_index(
+    sender,
+    instance,
+    using,
+    update_fields=None,
+    **kwargs,
+):
+    if update_fields is not None and not SEARCHABLE_FIELDS & update_fields:
+        return
+    index_recipes(using, [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_search_index(sender, instance, using, **kwargs):
+    remove_recipes(using, [instance.pk])
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_recipe_ingredient(sender, instance, **kwargs):
+    instance.previous_state = None
+    if instance.pk is not None:
+        instance.previous_state = (
+            RecipeIngredient.objects.filter(pk=instance.pk)
+            .values_list("ingredient_id", "amount")
+            .first()
+        )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def add_recipe_to_ingredient_index(sender, instance, **kwargs):
+    previous = getattr(instance, "previous_state", None)
+    if previous is not None:
+        if previous[0] == instance.ingredient_id:
+            return
+        ingredient_index.remove_recipe(instance.recipe_id, [previous[0]])
+    ingredient_index.add_recipe(instance.recipe_id, [instance.ingredient_id])
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def remove_recipe_from_ingredient_index(sender, instance, **kwargs):
+    ingredient_index.remove_recipe(
+        instance.recipe_id,
+        [instance.ingredient_id],
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def touch_recipe_on_ingredient_change(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_on_ingredient_change(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(
+            recipe_ingredients__ingredient_id=instance.pk
+        ).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def update_shopping_lists_on_ingredient_save(sender, instance, **kwargs):
+    deltas = defaultdict(int)
+    deltas[instance.ingredient_id] += instance.amount
+    previous = getattr(instance, "previous_state", None)
+    if previous is not None:
+        deltas[previous[0]] -= previous[1]
+    shopping_list.apply_recipe_change(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def update_shopping_lists_on_ingredient_delete(sender, instance, **kwargs):
+    shopping_list.apply_recipe_change(
+        instance.recipe_id,
+        {instance.ingredient_id: -instance.amount},
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipe_to_list(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+    shopping_list.remove_recipe_from_list(instance.user_id, instance.recipe_id)
+
+
+def increment_counter(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust(sender, instance, 1)
+
+
+def decrement_counter(sender, instance, **kwargs):
+    counters.adjust(sender, instance, -1)
+
+
+for model in (Favorite, ShoppingCart, Recipe, Subscription):
+    post_save.connect(increment_counter, sender=model)
+    post_delete.connect(decrement_counter, sender=model)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    if created:
+        feed.schedule_fan_out(instance.pk)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def trim_feed(sender, instance, **kwargs):
+    feed.trim(instance.user_id, instance.author_id)
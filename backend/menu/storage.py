@@ -0,0 +1,142 @@
+"""Content-addressed storage for recipe images and avatars.
+
+Files are named by the SHA-256 of their content, so the same bytes are
+written once however often they are uploaded and a name never changes
+meaning. ``MediaFile`` counts the references to every file: ``save()``
+adds one and ``delete()`` drops one, removing the file with the last.
+Files saved before this storage keep their names and have no counter;
+deleting them removes them as before. ``MediaImageField`` is the image
+field to use with it.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.fields.files import ImageFieldFile
+
+from core.constants import MEDIA_BLOB_DIR
+
+
+def blob_name(digest, extension):
+    return posixpath.join(MEDIA_BLOB_DIR, digest[:2], digest + extension)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The requested name only provides the extension, see _save().
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        extension = posixpath.splitext(name)[1].lower()
+        name = blob_name(digest.hexdigest(), extension)
+        with transaction.atomic():
+            self.add_references(name, content.size)
+            if not self.exists(name):
+                self._write(name, content)
+        return name
+
+    def add_references(self, name, size, count=1):
+        """Count ``count`` more rows using ``name``.
+
+        Also used for files put in place without ``save()``, such as
+        those copied by ``import_images``.
+        """
+        from .models import MediaFile
+
+        with transaction.atomic():
+            media_file, created = (
+                MediaFile.objects.select_for_update().get_or_create(
+                    name=name,
+                    defaults={"size": size, "references": count},
+                )
+            )
+            if not created:
+                MediaFile.objects.filter(pk=name).update(
+                    references=F("references") + count
+                )
+
+    def _write(self, name, content):
+        """Put the whole file in place at once, never a partial one."""
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(content, "temporary_file_path"):
+            file_move_safe(
+                content.temporary_file_path(),
+                path,
+                allow_overwrite=True,
+            )
+        else:
+            with tempfile.NamedTemporaryFile(
+                dir=directory,
+                delete=False,
+            ) as staged:
+                for chunk in content.chunks():
+                    staged.write(chunk)
+            os.replace(staged.name, path)
+        os.chmod(path, self.file_permissions_mode or 0o644)
+
+    def delete(self, name):
+        from .models import MediaFile
+
+        if not name:
+            return
+        with transaction.atomic():
+            media_file = (
+                MediaFile.objects.select_for_update().filter(pk=name).first()
+            )
+            if media_file is not None and media_file.references > 1:
+                MediaFile.objects.filter(pk=name).update(
+                    references=F("references") - 1
+                )
+                return
+            if media_file is not None:
+                media_file.delete()
+            super().delete(name)
+
+    def discard_unreferenced(self, names):
+        """Remove files of ``names`` that no row references any more.
+
+        For files saved in a transaction that was rolled back: their
+        counters went with it, but the bytes stay on disk.
+        """
+        from .models import MediaFile
+
+        referenced = set(
+            MediaFile.objects.filter(pk__in=names).values_list(
+                "pk",
+                flat=True,
+            )
+        )
+        for name in set(names) - referenced:
+            super().delete(name)
+
+
+class MediaImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        previous = self.name
+        super().save(name, content, save=save)
+        if previous and previous == self.name:
+            # The row already held a reference to the same content.
+            self.storage.delete(self.name)
+
+
+class MediaImageField(models.ImageField):
+    """Image field whose files are counted by ``ContentAddressedStorage``.
+
+    Replacing a file with identical content keeps its name, so the
+    reference that ``save()`` added is dropped right away.
+    """
+
+    attr_class = MediaImageFieldFile
+
+
+media_storage = ContentAddressedStorage()
@@ -0,0 +1,99 @@
+"""Measurement units and merging of shopping list lines.
+
+``UNITS`` maps a normalized ``Ingredient.measurement_unit`` to its
+dimension and the factor to the dimension's base unit (grams,
+millilitres, pieces). Units missing from the table form a dimension of
+their own, so they are only ever merged with themselves.
+"""
+import itertools
+import re
+from decimal import Decimal
+
+MASS = "mass"
+VOLUME = "volume"
+COUNT = "count"
+
+UNITS = {
+    "мг": (MASS, Decimal("0.001")),
+    "г": (MASS, Decimal(1)),
+    "гр": (MASS, Decimal(1)),
+    "кг": (MASS, Decimal(1000)),
+    "мл": (VOLUME, Decimal(1)),
+    "л": (VOLUME, Decimal(1000)),
+    "капля": (VOLUME, Decimal("0.05")),
+    "ч.л": (VOLUME, Decimal(5)),
+    "дес.л": (VOLUME, Decimal(10)),
+    "ст.л": (VOLUME, Decimal(15)),
+    "стакан": (VOLUME, Decimal(250)),
+    "шт": (COUNT, Decimal(1)),
+}
+
+# Display units of merged totals, largest first.
+DISPLAY_UNITS = {
+    MASS: (("кг", Decimal(1000)), ("г", Decimal(1))),
+    VOLUME: (("л", Decimal(1000)), ("мл", Decimal(1))),
+    COUNT: (("шт.", Decimal(1)),),
+}
+
+AMOUNT_PRECISION = Decimal("0.001")
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_unit(unit):
+    return _SPACES_RE.sub("", unit.lower()).rstrip(".")
+
+
+def unit_dimension(unit):
+    """Return ``(dimension, factor)``; unknown units keep their own name."""
+    key = normalize_unit(unit)
+    return UNITS.get(key, (key, Decimal(1)))
+
+
+def format_amount(value):
+    value = value.quantize(AMOUNT_PRECISION).normalize()
+    if value == value.to_integral_value():
+        return int(value)
+    return float(value)
+
+
+def _display(dimension, total):
+    units = DISPLAY_UNITS[dimension]
+    for unit, factor in units:
+        if total >= factor:
+            return format_amount(total / factor), unit
+    unit, factor = units[-1]
+    return format_amount(total / factor), unit
+
+
+def merge_units(rows):
+    """Merge lines of one ingredient name measured in compatible units.
+
+    ``rows`` are ``(name, amount, unit)`` tuples of the same ingredient.
+    A unit that has no compatible counterpart is returned unchanged;
+    otherwise the amounts are summed in the base unit and shown in the
+    largest display unit that keeps the total at or above one.
+    """
+    groups = {}
+    for name, amount, unit in rows:
+        dimension, factor = unit_dimension(unit)
+        groups.setdefault(dimension, []).append((name, amount, unit, factor))
+    for dimension, lines in groups.items():
+        name = lines[0][0]
+        if len(lines) == 1 or dimension not in DISPLAY_UNITS:
+            _, amount, unit, _ = lines[0]
+            total = sum(line[1] for line in lines)
+            yield name, total, unit
+            continue
+        total = sum(Decimal(amount) * factor for _, amount, _, factor in lines)
+        yield (name, *_display(dimension, total))
+
+
+def merge_shopping_rows(rows):
+    """Merge ``(key, name, amount, unit)`` rows sorted by ``key``.
+
+    Rows of one ingredient name share a key, so a single pass over the
+    sorted stream holds no more than one ingredient's units at a time.
+    """
+    for _, group in itertools.groupby(rows, key=lambda row: row[0]):
+        yield from merge_units(row[1:] for row in group)
@@ -1,6 +1,5 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.db.models import Count
 from django.utils.translation import gettext_lazy as _
 
 from .models import Profile, Subscription, User
@@ -57,21 +56,6 @@ class UserAdmin(BaseUserAdmin):
     ordering = ("email",)
     search_fields = ("email", "username", "first_name", "last_name")
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(
-            recipes_total=Count("recipes", distinct=True),
-            subscribers_total=Count("subscribers", distinct=True),
-        )
-
-    @admin.display(description="Рецептов")
-    def recipes_count(self, obj):
-        return obj.recipes_total
-
-    @admin.display(description="Подписчиков")
-    def subscribers_count(self, obj):
-        return obj.subscribers_total
-
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
@@ -0,0 +1,56 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, link):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{link: OuterRef("pk")})
+            .order_by()
+            .values(link)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    Recipe = apps.get_model("menu", "Recipe")
+    Subscription = apps.get_model("users", "Subscription")
+    User.objects.update(
+        recipes_count=count_of(Recipe, "author"),
+        subscribers_count=count_of(Subscription, "author"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_alter_profile_user_alter_user_groups_and_more"),
+        ("menu", "0011_recipe_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="recipes_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Рецептов",
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="subscribers_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Подписчиков",
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="avatar_variants",
+            field=models.JSONField(
+                default=dict,
+                editable=False,
+                verbose_name="Варианты аватара",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+import menu.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0014_mediafile"),
+        ("users", "0004_profile_avatar_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="profile",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=menu.storage.ContentAddressedStorage(),
+                upload_to="users/",
+                verbose_name="Аватар",
+            ),
+        ),
+    ]
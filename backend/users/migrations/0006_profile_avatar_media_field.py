@@ -0,0 +1,25 @@
+from django.db import migrations
+
+import menu.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0015_recipe_image_media_field"),
+        ("users", "0005_profile_avatar_storage"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="profile",
+            name="avatar",
+            field=menu.storage.MediaImageField(
+                blank=True,
+                null=True,
+                storage=menu.storage.ContentAddressedStorage(),
+                upload_to="users/",
+                verbose_name="Аватар",
+            ),
+        ),
+    ]
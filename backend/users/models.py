@@ -11,9 +11,13 @@ from core.constants import (
     USERNAME_HELP_TEXT_TEMPLATE,
     USERNAME_MAX_LENGTH,
 )
+from core.mixins import StoredCountersMixin
+from menu.storage import MediaImageField, media_storage
 
 
-class User(AbstractUser):
+class User(StoredCountersMixin, AbstractUser):
+    counter_fields = ("recipes_count", "subscribers_count")
+
     username = models.CharField(
         _("username"),
         max_length=USERNAME_MAX_LENGTH,
@@ -35,6 +39,16 @@ class User(AbstractUser):
         _("last name"),
         max_length=USER_LAST_NAME_MAX_LENGTH,
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Рецептов",
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Подписчиков",
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
@@ -55,12 +69,18 @@ class Profile(models.Model):
         related_name="profiles",
         verbose_name="Пользователь",
     )
-    avatar = models.ImageField(
+    avatar = MediaImageField(
         upload_to="users/",
+        storage=media_storage,
         blank=True,
         null=True,
         verbose_name="Аватар",
     )
+    avatar_variants = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name="Варианты аватара",
+    )
 
     class Meta:
         ordering = ("user__email",)